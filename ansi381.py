@@ -0,0 +1,137 @@
+"""Parser record gambar jari ANSI/INCITS 381-2004 (format DPFPDD_IMG_FMT_ANSI381).
+
+Struktur record:
+    General record header (36 byte, big-endian)
+        "FIR\\0", versi "010\\0", panjang record (6 byte), CBEFF product id (4),
+        capture device id (2), image acquisition level (2), jumlah jari (1),
+        scale units (1), resolusi scan h/v (2+2), resolusi gambar h/v (2+2),
+        pixel depth (1), kompresi (1), reserved (2)
+    Per jari/view: finger image header (14 byte)
+        panjang blok data (4, termasuk header ini), posisi jari (1), jumlah view (1),
+        nomor view (1), kualitas (1), impression type (1), lebar (2), tinggi (2),
+        reserved (1)
+    diikuti data gambar.
+
+Semua parsing memakai struct.unpack_from dan np.frombuffer di atas buffer asli,
+sehingga gambar adalah view tanpa copy (buffer harus tetap hidup selama dipakai).
+"""
+import struct
+
+import numpy as np
+
+FORMAT_ID = b'FIR\x00'
+VERSION = b'010\x00'
+GENERAL_HEADER_SIZE = 36
+FINGER_HEADER_SIZE = 14
+HEADER_SIZE = GENERAL_HEADER_SIZE + FINGER_HEADER_SIZE
+
+COMPRESSION_UNCOMPRESSED = 0
+COMPRESSION_BIT_PACKED = 1
+COMPRESSION_WSQ = 2
+COMPRESSION_JPEG = 3
+COMPRESSION_JPEG2000 = 4
+COMPRESSION_PNG = 5
+
+SCALE_PPI = 1
+SCALE_PPCM = 2
+
+# Setelah format id + versi (8 byte) dan panjang record 6 byte
+_GENERAL = struct.Struct('>HHHHBBHHHHBBH')
+_FINGER = struct.Struct('>IBBBBBHHB')
+
+
+class FingerView:
+    """Satu view jari di dalam record; `image` adalah view numpy (height, width)."""
+    __slots__ = ('position', 'view_count', 'view_number', 'quality', 'impression',
+                 'width', 'height', 'offset', 'length', 'image')
+
+    def __init__(self, position, view_count, view_number, quality, impression, width, height, offset, length, image):
+        self.position = position
+        self.view_count = view_count
+        self.view_number = view_number
+        self.quality = quality
+        self.impression = impression
+        self.width = width
+        self.height = height
+        self.offset = offset  # offset data gambar di dalam record
+        self.length = length
+        self.image = image
+
+
+class Ansi381Record:
+    __slots__ = ('length', 'product_owner', 'product_type', 'device_id', 'acquisition_level',
+                 'scale_units', 'scan_resolution', 'image_resolution', 'pixel_depth',
+                 'compression', 'views')
+
+    @property
+    def image(self):
+        """Gambar view pertama (kasus reader DigitalPersona: satu jari per record)."""
+        return self.views[0].image if self.views else None
+
+    @property
+    def resolution_ppi(self):
+        """Resolusi gambar horizontal dalam ppi (dikonversi jika unit ppcm)."""
+        horizontal = self.image_resolution[0]
+        return horizontal * 2.54 if self.scale_units == SCALE_PPCM else float(horizontal)
+
+
+def parse(buffer, size=None):
+    """Parse record ANSI 381 dari buffer (bytes, bytearray, memoryview, array ctypes).
+
+    `size` membatasi panjang data valid (mis. result.size dari dpfpdd) jika buffer
+    lebih besar dari record. Melempar ValueError untuk record yang rusak.
+    """
+    view = memoryview(buffer).cast('B')
+    if size is not None:
+        view = view[:size]
+    if len(view) < HEADER_SIZE:
+        raise ValueError(f"Record ANSI 381 terlalu pendek: {len(view)} byte")
+    if view[:4] != FORMAT_ID:
+        raise ValueError("Bukan record ANSI 381 (format id bukan 'FIR')")
+
+    record = Ansi381Record()
+    high, low = struct.unpack_from('>HI', view, 8)
+    record.length = (high << 32) | low
+    if record.length > len(view):
+        raise ValueError(f"Record terpotong: header {record.length} byte, tersedia {len(view)} byte")
+    (record.product_owner, record.product_type, record.device_id, record.acquisition_level,
+     finger_count, record.scale_units, scan_h, scan_v, image_h, image_v,
+     record.pixel_depth, record.compression, _) = _GENERAL.unpack_from(view, 14)
+    record.scan_resolution = (scan_h, scan_v)
+    record.image_resolution = (image_h, image_v)
+
+    record.views = []
+    offset = GENERAL_HEADER_SIZE
+    for _ in range(finger_count):
+        if offset + FINGER_HEADER_SIZE > record.length:
+            raise ValueError("Header finger image melewati akhir record")
+        (block_length, position, view_count, view_number, quality, impression,
+         width, height, _) = _FINGER.unpack_from(view, offset)
+        if block_length < FINGER_HEADER_SIZE or offset + block_length > record.length:
+            raise ValueError(f"Panjang blok finger image tidak valid: {block_length}")
+        data_offset = offset + FINGER_HEADER_SIZE
+        data_length = block_length - FINGER_HEADER_SIZE
+        image = None
+        if record.compression == COMPRESSION_UNCOMPRESSED and record.pixel_depth == 8:
+            if data_length < width * height:
+                raise ValueError(f"Data gambar {data_length} byte, butuh {width * height}")
+            image = np.frombuffer(view, dtype=np.uint8, count=width * height,
+                                  offset=data_offset).reshape((height, width))
+        record.views.append(FingerView(position, view_count, view_number, quality, impression,
+                                       width, height, data_offset, data_length, image))
+        offset += block_length
+    return record
+
+
+def write_header(buffer, width, height, resolution=500, quality=0, position=0):
+    """Tulis header record satu jari 8-bit tanpa kompresi ke awal buffer.
+
+    Dipakai reader simulasi agar record yang dihasilkan sama dengan milik dpfpdd.
+    """
+    length = HEADER_SIZE + width * height
+    struct.pack_into('>4s4sHI', buffer, 0, FORMAT_ID, VERSION, length >> 32, length & 0xFFFFFFFF)
+    _GENERAL.pack_into(buffer, 14, 0, 0, 0, 31, 1, SCALE_PPI, resolution, resolution,
+                       resolution, resolution, 8, COMPRESSION_UNCOMPRESSED, 0)
+    _FINGER.pack_into(buffer, GENERAL_HEADER_SIZE, FINGER_HEADER_SIZE + width * height,
+                      position, 1, 1, quality, 0, width, height, 0)
+    return length
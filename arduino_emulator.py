@@ -0,0 +1,185 @@
+"""Emulator Arduino di pseudo-terminal (POSIX) untuk menguji kanal serial tanpa hardware.
+
+Protokol teks yang diemulasikan (satu perintah per baris):
+    UP / DOWN / STOP       -> "OK <perintah>"
+    POSITION:<n>           -> "OK POSITION:<n>"
+    fingerprint verified   -> "OK fingerprint verified"
+    lainnya                -> "ERR unknown <baris>"
+Gerakan yang dikirim kurang dari `stop_settle` detik setelah STOP, atau arah
+berlawanan tanpa STOP, dicatat sebagai pelanggaran interlock ("ERR interlock").
+
+Dengan protocol="binary" perintah yang sama diterima sebagai frame biner
+(motor_protocol.py) dan dibalas ACK/NACK per nomor urut; batch POSITION
+dieksekusi berurutan dengan satu ACK. `baudrate` (opsional) mensimulasikan waktu
+kirim byte di jalur serial fisik, karena pty sendiri tidak punya batas baud.
+
+Contoh:
+    python arduino_emulator.py          # cetak nama port, lalu jalan sampai Ctrl+C
+    python arduino_emulator.py binary
+"""
+import os
+import select
+import sys
+import threading
+import time
+
+import motor_protocol
+from motor_protocol import FrameDecoder, encode_frame
+
+
+class ArduinoEmulator(threading.Thread):
+    def __init__(self, latency=0.001, stop_settle=0.1, protocol="text", baudrate=None, clock=time.monotonic):
+        super().__init__(name="arduino-emulator", daemon=True)
+        import tty
+        self.latency = latency
+        self.stop_settle = stop_settle
+        self.protocol = protocol
+        self.baudrate = baudrate
+        self.clock = clock
+        self.master, self.slave = os.openpty()
+        # Mode raw: tanpa echo dan tanpa pemrosesan baris oleh terminal
+        tty.setraw(self.slave)
+        self.port_name = os.ttyname(self.slave)
+        self.state = "STOP"
+        self.position = 0
+        self.stopped_at = float('-inf')
+        self.received = []  # (waktu, perintah)
+        self.violations = []
+        self._buffer = bytearray()
+        self._decoder = FrameDecoder()
+        self._wire_free = {"rx": 0.0, "tx": 0.0}  # kapan tiap arah jalur simulasi (full duplex) bebas
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([self.master], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            arrived = time.perf_counter()
+            if self.protocol == "binary":
+                for seq, frame_type, payload in self._decoder.feed(data):
+                    self._wire("rx", motor_protocol.FRAME_OVERHEAD + len(payload), arrived)
+                    self._reply_frame(seq, self.handle_frame(frame_type, payload))
+                continue
+            self._buffer += data
+            while b"\n" in self._buffer:
+                raw, _, rest = self._buffer.partition(b"\n")
+                self._buffer = bytearray(rest)
+                self._wire("rx", len(raw) + 1, arrived)
+                line = raw.decode(errors='replace').strip()
+                if line:
+                    self._reply(self.handle(line))
+
+    def handle(self, line):
+        """Proses satu perintah dan kembalikan baris balasan."""
+        now = self.clock()
+        self.received.append((now, line))
+        if line in ("UP", "DOWN"):
+            if self.state != "STOP" and self.state != line:
+                self.violations.append((now, f"{self.state}->{line} tanpa STOP"))
+                return "ERR interlock"
+            if self.state == "STOP" and now - self.stopped_at < self.stop_settle:
+                self.violations.append((now, f"{line} {(now - self.stopped_at) * 1000:.0f} ms setelah STOP"))
+                return "ERR interlock"
+            self.state = line
+            return f"OK {line}"
+        if line == "STOP":
+            if self.state != "STOP":
+                self.stopped_at = now
+            self.state = "STOP"
+            return "OK STOP"
+        if line.startswith("POSITION:"):
+            try:
+                self.position = int(line.split(":", 1)[1])
+            except ValueError:
+                return f"ERR bad position {line}"
+            return f"OK {line}"
+        if line == "fingerprint verified":
+            return f"OK {line}"
+        return f"ERR unknown {line}"
+
+    def handle_frame(self, frame_type, payload):
+        """Terjemahkan frame biner ke perintah teks lalu proses; kembalikan balasan teks."""
+        if frame_type == motor_protocol.TYPE_MOTOR and len(payload) == 1 and payload[0] in motor_protocol.MOTOR_NAMES:
+            return self.handle(motor_protocol.MOTOR_NAMES[payload[0]])
+        if frame_type == motor_protocol.TYPE_POSITION:
+            if not payload or len(payload) != 1 + 2 * payload[0]:
+                return "ERR bad position"
+            values = memoryview(payload)[1:].cast('H')
+            for value in values:
+                self.handle(f"POSITION:{value}")
+            return f"OK POSITION x{len(values)}"
+        if frame_type == motor_protocol.TYPE_EVENT:
+            return self.handle(payload.decode(errors='replace'))
+        if frame_type == motor_protocol.TYPE_PING:
+            return "OK PING"
+        return f"ERR unknown type {frame_type}"
+
+    def _wire(self, direction, size, start=None):
+        """Tunda sampai `size` byte selesai 'terkirim' pada baud simulasi (8N1 = 10 bit/byte)."""
+        if not self.baudrate:
+            return
+        now = time.perf_counter()
+        done = max(self._wire_free[direction], now if start is None else start) + size * 10.0 / self.baudrate
+        self._wire_free[direction] = done
+        if done > now:
+            time.sleep(done - now)
+
+    def _reply(self, line):
+        if self.latency:
+            time.sleep(self.latency)
+        data = (line + "\n").encode()
+        self._wire("tx", len(data))
+        os.write(self.master, data)
+
+    def _reply_frame(self, seq, line):
+        if self.latency:
+            time.sleep(self.latency)
+        if line.startswith("OK"):
+            data = encode_frame(seq, motor_protocol.TYPE_ACK, bytes([seq]))
+        else:
+            if "interlock" in line:
+                code = motor_protocol.NACK_INTERLOCK
+            elif "bad" in line:
+                code = motor_protocol.NACK_BAD_PAYLOAD
+            else:
+                code = motor_protocol.NACK_UNKNOWN
+            data = encode_frame(seq, motor_protocol.TYPE_NACK, bytes([seq, code]))
+        self._wire("tx", len(data))
+        os.write(self.master, data)
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(1.0)
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def report(self):
+        return (f"{len(self.received)} perintah diterima, state={self.state}, position={self.position}, "
+                f"pelanggaran interlock={len(self.violations)}, frame CRC rusak={self._decoder.crc_errors}")
+
+
+def main():
+    emulator = ArduinoEmulator(protocol=sys.argv[1] if len(sys.argv) > 1 else "text")
+    emulator.start()
+    print(f"[INFO] Emulator Arduino di {emulator.port_name}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    emulator.stop()
+    print(f"[INFO] {emulator.report()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""Replay video (man.mp4 / auto.mp4) melalui logika deteksi dan keputusan motor yang
+sama dengan aplikasi, tanpa kamera, Arduino, maupun fingerprint reader.
+
+Contoh:
+    python benchmark.py man.mp4 auto.mp4
+    python benchmark.py auto.mp4 --frames 300 --json hasil.json
+    python benchmark.py auto.mp4 --baseline hasil.json   # cek regresi performa & keputusan
+    python benchmark.py man.mp4 --controller legacy      # logika ambang per frame lama
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+
+import journal
+import vision
+from fingerprint import FingerprintWorker, SimulatedReader, synthetic_fingerprint
+from face_tracks import FaceTracks, confirmed_faces
+from fingerprint_match import FingerprintIdentifier
+from liveness import LIVENESS_CONFIG, LivenessChecker
+from models import startup_timer
+from motion_gate import MOTION_GATE_CONFIG, MotionGate
+from motor_control import CONTROLLER_CONFIG, MotorController
+from render import DisplayRenderer
+
+
+class FakeSerial:
+    """Pengganti serial.Serial: mencatat setiap perintah yang ditulis."""
+
+    def __init__(self):
+        self.commands = []
+        self.frame_index = 0
+
+    def write(self, data):
+        self.commands.append((self.frame_index, data.decode().strip()))
+        return len(data)
+
+    def close(self):
+        pass
+
+
+class MotorCommandSink:
+    """Logika kirim-perintah milik MainApp.apply_motor_decision (mode Automatic)."""
+
+    def __init__(self, arduino):
+        self.arduino = arduino
+        self.motor_state = "STOP"
+
+    def apply(self, new_motor_state):
+        if new_motor_state != self.motor_state:
+            self.motor_state = new_motor_state
+            self.arduino.write((self.motor_state + "\n").encode())
+            journal.event("motor_command", self.motor_state, "automatic")
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS melaporkan byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentiles(samples):
+    values = np.asarray(samples) * 1000.0
+    return {
+        'count': int(values.size),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max()),
+    }
+
+
+def motor_activity(commands, fps, gap=1.0):
+    """Jumlah perintah motor dan waktu settling: durasi tiap burst perintah motor
+    (perintah berjarak < `gap` detik) sampai keluaran stabil kembali."""
+    frames = [idx for idx, cmd in commands if cmd in ("UP", "DOWN", "STOP") or cmd.startswith("POSITION:")]
+    bursts = []
+    for idx in frames:
+        if bursts and (idx - bursts[-1][1]) / fps < gap:
+            bursts[-1][1] = idx
+        else:
+            bursts.append([idx, idx])
+    durations = np.asarray([(end - start) / fps for start, end in bursts])
+    report = {'motor_commands': len(frames), 'bursts': len(bursts)}
+    if durations.size:
+        report.update(settling_p50_s=float(np.percentile(durations, 50)), settling_max_s=float(durations.max()))
+    return report
+
+
+def replay(path, max_frames=None, use_cascade=True, simulate_fingerprint=True, controller=None,
+           use_gate=MOTION_GATE_CONFIG['enabled']):
+    """Putar satu video frame demi frame dan kumpulkan waktu per tahap serta perintah motor.
+
+    `controller` = MotorController (jam waktu video), atau None untuk logika ambang lama.
+    `use_gate` = MotionGate dengan jam waktu video (frame tanpa gerakan tidak diinferensi)."""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError(f"Video '{path}' tidak dapat dibuka")
+
+    arduino = FakeSerial()
+    motor = MotorCommandSink(arduino)
+    cascade = vision.DetectorCascade() if use_cascade else None
+    tracks = None if use_cascade else FaceTracks()
+    renderer = DisplayRenderer()
+    liveness = LivenessChecker() if LIVENESS_CONFIG['enabled'] else None
+    stage_samples = {}
+    frame_index = 0
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    gate = MotionGate(clock=lambda: frame_index / fps) if use_gate else None
+    fingerprint = None
+    if simulate_fingerprint:
+        # Jalur worker fingerprint yang sama dengan aplikasi, di-poll sekali per frame
+        # dengan jam virtual (waktu video) agar urutan perintah deterministik
+        def on_fingerprint(frame):
+            if (frame.kind == "verified" and frame.matches
+                    and (liveness is None or liveness.allow(now=video_clock()))):
+                arduino.write(b"fingerprint verified\n")
+            frame.release()
+
+        def video_clock():
+            return frame_index / fps
+
+        # Jari simulasi (seed 0) terdaftar, sehingga identifikasi 1:N ikut terukur
+        reader = SimulatedReader(clock=video_clock)
+        identifier = FingerprintIdentifier(path=None)
+        identifier.enroll("simulasi", synthetic_fingerprint(reader.width, reader.height, 0))
+        fingerprint = FingerprintWorker(reader, on_fingerprint, clock=video_clock, identifier=identifier)
+    started = time.perf_counter()
+
+    while max_frames is None or frame_index < max_frames:
+        t0 = time.perf_counter()
+        ret, frame = capture.read()
+        if not ret:
+            break
+        t1 = time.perf_counter()
+        arduino.frame_index = frame_index
+
+        t_liveness = t1
+        if gate is not None and not gate.check(frame, frame_index / fps):
+            analysis = vision.empty_analysis(frame)
+        else:
+            analysis = cascade.analyze(frame) if cascade else vision.analyze_frame(frame, tracks)
+            t_liveness = time.perf_counter()
+            if liveness is not None:
+                liveness.observe(frame, analysis['face_log'], now=frame_index / fps)
+            if gate is not None:
+                gate.observe(analysis, frame_index / fps)
+        t2 = time.perf_counter()
+        if controller is not None:
+            motor.apply(controller.update(analysis, frame_index / fps))
+            position = controller.take_position()
+            if position is not None:
+                arduino.write(f"POSITION:{position}\n".encode())
+        else:
+            motor.apply(vision.decide_motor_state(analysis))
+        journal.event("detection", frame_index, frame_index / fps, analysis['frame_size'][0],
+                      analysis['frame_size'][1], analysis['face_center_y'], confirmed_faces(analysis['face_log']),
+                      bool(analysis['face_detected']), bool(analysis['body_detected']), analysis.get('target_id'),
+                      motor.motor_state)
+        t3 = time.perf_counter()
+
+        renderer.render(frame, analysis)
+        t4 = time.perf_counter()
+
+        if fingerprint is not None:
+            fingerprint.poll_once()
+        t5 = time.perf_counter()
+
+        timings = dict(analysis['timings'])
+        timings.update(capture=t1 - t0, inference=t2 - t1, liveness=t2 - t_liveness, decision=t3 - t2,
+                       render=t4 - t3, fingerprint=t5 - t4, total=t5 - t0)
+        for name, value in timings.items():
+            stage_samples.setdefault(name, []).append(value)
+        frame_index += 1
+
+    elapsed = time.perf_counter() - started
+    capture.release()
+    report = {
+        'video': os.path.basename(path),
+        'frames': frame_index,
+        'fps': frame_index / elapsed if elapsed > 0 else 0.0,
+        'stages': {name: percentiles(samples) for name, samples in stage_samples.items()},
+        'commands': arduino.commands,
+        'controller': 'legacy' if controller is None else 'smooth',
+        'motor': motor_activity(arduino.commands, fps),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if cascade is not None:
+        report['model_calls'] = dict(cascade.stats)
+    report['face_tracks'] = dict((cascade.tracks if cascade is not None else tracks).stats)
+    if liveness is not None:
+        report['liveness'] = liveness.report()
+        liveness.close()
+    if gate is not None:
+        report['motion_gate'] = gate.report()
+        gate.close()
+    return report
+
+
+def compare_with_baseline(reports, baseline, tolerance):
+    """Bandingkan hasil dengan baseline; kembalikan daftar pesan regresi."""
+    problems = []
+    previous = {r['video']: r for r in baseline}
+    for report in reports:
+        base = previous.get(report['video'])
+        if base is None:
+            continue
+        commands = [list(c) for c in report['commands']]
+        if commands != [list(c) for c in base['commands']]:
+            problems.append(f"{report['video']}: urutan perintah motor berubah "
+                            f"({len(base['commands'])} → {len(commands)} perintah)")
+        if report['fps'] < base['fps'] * (1 - tolerance):
+            problems.append(f"{report['video']}: FPS turun {base['fps']:.1f} → {report['fps']:.1f}")
+        base_p95 = base['stages']['total']['p95_ms']
+        p95 = report['stages']['total']['p95_ms']
+        if p95 > base_p95 * (1 + tolerance):
+            problems.append(f"{report['video']}: p95 total naik {base_p95:.1f} → {p95:.1f} ms")
+    return problems
+
+
+def print_report(report):
+    print(f"\n=== {report['video']} — {report['frames']} frame, {report['fps']:.1f} FPS ===")
+    print(f"{'tahap':<16}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}   (ms)")
+    for name, stats in sorted(report['stages'].items(), key=lambda item: -item[1]['p50_ms']):
+        print(f"{name:<16}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['max_ms']:>9.2f}")
+    if report.get('model_calls'):
+        print(f"Pemanggilan model: {report['model_calls']}")
+    if report.get('face_tracks'):
+        print(f"Track wajah: {report['face_tracks']['tracks']} track, "
+              f"{report['face_tracks']['target_switches']} pergantian target motor")
+    if report.get('liveness'):
+        live = report['liveness']
+        cost = f", biaya p50={live['cost_p50_ms']:.1f} ms" if 'cost_p50_ms' in live else ""
+        print(f"Liveness: {live['checks']} cek model untuk {live['new_faces']} wajah baru, "
+              f"cache hit {live['hit_rate'] * 100:.0f}%{cost}")
+    if report.get('motion_gate'):
+        gate = report['motion_gate']
+        wake = f", bangun p50={gate['wake_p50_ms']:.0f} ms" if 'wake_p50_ms' in gate else ""
+        cpu = (f", CPU/detik video idle {gate['idle_cpu_percent']:.0f}% vs aktif {gate['active_cpu_percent']:.0f}%"
+               if 'idle_cpu_percent' in gate and 'active_cpu_percent' in gate else "")
+        print(f"Motion gate: {gate['gated_fraction'] * 100:.0f}% frame dilewati, {gate['wakeups']} bangun{wake}, "
+              f"{gate['arrivals']} kedatangan ({gate['missed_arrivals']} terlewat){cpu}")
+    if report['peak_rss_mb'] is not None:
+        print(f"Peak RSS: {report['peak_rss_mb']:.0f} MB")
+    motor = report['motor']
+    settling = (f", settling p50={motor['settling_p50_s']:.2f} s, max={motor['settling_max_s']:.2f} s"
+                if 'settling_p50_s' in motor else "")
+    print(f"Motor ({report['controller']}): {motor['motor_commands']} perintah dalam {motor['bursts']} burst{settling}")
+    sequence = " ".join(f"{cmd}@{idx}" for idx, cmd in report['commands'])
+    print(f"Perintah ({len(report['commands'])}): {sequence}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark replay pipeline deteksi tanpa hardware.")
+    parser.add_argument('videos', nargs='+', help="File video, mis. man.mp4 auto.mp4")
+    parser.add_argument('--frames', type=int, default=None, help="Batasi jumlah frame per video")
+    parser.add_argument('--no-cascade', action='store_true', help="Jalankan semua model setiap frame (analyze_frame)")
+    parser.add_argument('--inference-mode', choices=['consolidated', 'separate'], default=vision.INFERENCE_MODE)
+    parser.add_argument('--roi', choices=['full', 'detection_area', 'face'], default=vision.INFERENCE_CONFIG['roi'])
+    parser.add_argument('--max-width', type=int, default=vision.INFERENCE_CONFIG['max_width'],
+                        help="Lebar input model, 0 = resolusi penuh")
+    parser.add_argument('--no-fingerprint', action='store_true', help="Matikan simulasi fingerprint")
+    parser.add_argument('--no-motion-gate', action='store_true', help="Inferensi setiap frame tanpa motion gate")
+    parser.add_argument('--controller', choices=['smooth', 'legacy'],
+                        default='smooth' if CONTROLLER_CONFIG['enabled'] else 'legacy',
+                        help="smooth = MotorController (filter + hysteresis), legacy = ambang per frame")
+    parser.add_argument('--position-output', action='store_true', help="Controller juga mengirim POSITION")
+    parser.add_argument('--json', help="Simpan laporan ke file JSON")
+    parser.add_argument('--journal', help="Rekam deteksi dan perintah motor ke folder jurnal (journal.py replay)")
+    parser.add_argument('--baseline', help="Laporan JSON sebelumnya untuk deteksi regresi")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Toleransi regresi performa (default 20%%)")
+    args = parser.parse_args(argv)
+
+    vision.INFERENCE_MODE = args.inference_mode
+    vision.INFERENCE_CONFIG['roi'] = args.roi
+    vision.INFERENCE_CONFIG['max_width'] = args.max_width or None
+
+    # Model dibangun dan di-warm-up dulu agar tidak ikut terukur sebagai latensi frame pertama
+    vision.registry.warm_up(vision.required_models(), background=False)
+    print(startup_timer.report())
+
+    reports = []
+    for path in args.videos:
+        controller = None
+        if args.controller == 'smooth':
+            controller = MotorController(dict(position_output=args.position_output))
+        if args.journal:
+            journal.start(args.journal, prefix=os.path.splitext(os.path.basename(path))[0])
+        report = replay(path, args.frames, not args.no_cascade, not args.no_fingerprint, controller,
+                        MOTION_GATE_CONFIG['enabled'] and not args.no_motion_gate)
+        journal.stop()
+        print_report(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n[INFO] Laporan disimpan ke {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare_with_baseline(reports, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"[REGRESI] {problem}")
+        if problems:
+            return 1
+        print("[INFO] Tidak ada regresi dibanding baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
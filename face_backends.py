@@ -0,0 +1,239 @@
+"""Backend deteksi wajah untuk face_log: YuNet langsung (OpenCV), MediaPipe, DeepFace.
+
+Jalur lama memanggil YuNet lewat DeepFace.extract_faces(detector_backend='yunet'):
+setiap panggilan melewati loader gambar generik DeepFace, crop + normalisasi
+setiap wajah dan pembuatan dict, padahal yang dipakai hanya `facial_area` dan
+`confidence`. YuNetBackend memakai cv2.FaceDetectorYN langsung dengan satu
+instance model per ukuran input (setInputSize mahal karena membuat ulang
+prior box), dan semua backend mengembalikan array NumPy:
+
+    boxes, scores = backend.detect(image)   # boxes int32 (N, 4) x, y, w, h piksel; scores float32 (N,)
+
+Backend dipilih dengan FACE_BACKEND_CONFIG['backend'] dan dibangun/di-warm-up
+lewat vision.registry seperti model lain.
+
+Benchmark ketiga backend pada video yang disertakan:
+    python face_backends.py man.mp4 auto.mp4 --frames 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+FACE_BACKEND_CONFIG = dict(
+    backend="yunet",            # "yunet" | "mediapipe" | "deepface" (jalur lama)
+    yunet_model=None,           # None = bobot yang diunduh DeepFace (~/.deepface/weights)
+    score_threshold=0.9,        # sama dengan default yunet_score_threshold DeepFace
+    nms_threshold=0.3,
+    top_k=5000,
+    max_size=640,               # DeepFace memperkecil input YuNet ke sisi terpanjang 640
+)
+
+YUNET_WEIGHTS = "face_detection_yunet_2023mar.onnx"
+
+_EMPTY = (np.zeros((0, 4), dtype=np.int32), np.zeros((0,), dtype=np.float32))
+
+
+def default_yunet_path():
+    home = os.getenv("DEEPFACE_HOME", os.path.expanduser("~"))
+    return os.path.join(home, ".deepface", "weights", YUNET_WEIGHTS)
+
+
+class YuNetBackend:
+    """cv2.FaceDetectorYN langsung, satu instance persisten per ukuran input."""
+    name = "yunet"
+
+    def __init__(self, config=None):
+        self.config = dict(FACE_BACKEND_CONFIG, **(config or {}))
+        self.model_path = self.config['yunet_model'] or default_yunet_path()
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(
+                f"Model YuNet '{self.model_path}' tidak ditemukan. Jalankan DeepFace sekali dengan "
+                f"detector_backend='yunet' agar bobot terunduh, atau isi FACE_BACKEND_CONFIG['yunet_model']")
+        self._detectors = {}
+
+    def _detector(self, size):
+        detector = self._detectors.get(size)
+        if detector is None:
+            c = self.config
+            detector = cv2.FaceDetectorYN.create(self.model_path, "", size, c['score_threshold'],
+                                                 c['nms_threshold'], c['top_k'])
+            self._detectors[size] = detector
+        return detector
+
+    def detect(self, image, rgb=None):
+        height, width = image.shape[:2]
+        scale = 1.0
+        if max(height, width) > self.config['max_size']:
+            scale = self.config['max_size'] / max(height, width)
+            image = cv2.resize(image, (int(width * scale), int(height * scale)))
+            height, width = image.shape[:2]
+        _, faces = self._detector((width, height)).detect(image)
+        if faces is None:
+            return _EMPTY
+        boxes = faces[:, :4]
+        if scale != 1.0:
+            boxes = boxes / scale
+        # Sama seperti DeepFace: sudut kiri atas tidak negatif
+        boxes = np.maximum(boxes, 0).astype(np.int32)
+        return boxes, faces[:, -1].astype(np.float32)
+
+
+class MediaPipeBackend:
+    """Graph FaceDetection MediaPipe yang sama dengan untuk face_center_y."""
+    name = "mediapipe_face"
+
+    def __init__(self, config=None):
+        import vision
+        self._graph = vision.get_graph('face_detection')
+
+    def detect(self, image, rgb=None):
+        if rgb is None:
+            rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        results = self._graph.process(rgb)
+        if not results.detections:
+            return _EMPTY
+        height, width = image.shape[:2]
+        boxes = np.empty((len(results.detections), 4), dtype=np.int32)
+        scores = np.empty((len(results.detections),), dtype=np.float32)
+        for i, detection in enumerate(results.detections):
+            box = detection.location_data.relative_bounding_box
+            boxes[i] = (int(box.xmin * width), int(box.ymin * height),
+                        int(box.width * width), int(box.height * height))
+            scores[i] = detection.score[0]
+        return boxes, scores
+
+
+class DeepFaceBackend:
+    """Jalur lama: YuNet lewat DeepFace.extract_faces (crop + normalisasi tiap wajah)."""
+    name = "deepface"
+
+    def __init__(self, config=None):
+        import vision
+        self._vision = vision
+        self._deepface = vision.registry.get('deepface')
+
+    def detect(self, image, rgb=None):
+        with self._vision.deepface_lock:
+            faces = self._deepface.extract_faces(img_path=image, detector_backend='yunet',
+                                                 enforce_detection=False, anti_spoofing=False)
+        if not faces:
+            return _EMPTY
+        boxes = np.array([(f['facial_area']['x'], f['facial_area']['y'], f['facial_area']['w'],
+                           f['facial_area']['h']) for f in faces], dtype=np.int32).reshape(-1, 4)
+        return boxes, np.array([f['confidence'] for f in faces], dtype=np.float32)
+
+
+FACE_BACKENDS = {
+    "yunet": YuNetBackend,
+    "mediapipe": MediaPipeBackend,
+    "deepface": DeepFaceBackend,
+}
+
+
+def create_face_backend(name=None, config=None):
+    return FACE_BACKENDS[name or FACE_BACKEND_CONFIG['backend']](config)
+
+
+def warm_face_backend(backend):
+    backend.detect(np.zeros((360, 640, 3), dtype=np.uint8))
+
+
+# =============================================
+# Benchmark backend pada video
+# =============================================
+def match_rate(boxes, reference, threshold=0.5):
+    """Fraksi box referensi yang punya pasangan IoU >= threshold di `boxes`."""
+    if not len(reference):
+        return None
+    if not len(boxes):
+        return 0.0
+    a = boxes[:, None, :].astype(np.float32)
+    b = reference[None, :, :].astype(np.float32)
+    w = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+    h = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+    inter = np.clip(w, 0, None) * np.clip(h, 0, None)
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - inter
+    iou = inter / np.maximum(union, 1e-6)
+    return float((iou.max(axis=0) >= threshold).mean())
+
+
+def benchmark(path, backends, max_frames=None, min_score=0.5):
+    import vision
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError(f"Video '{path}' tidak dapat dibuka")
+    samples = {name: [] for name in backends}
+    faces = {name: 0 for name in backends}
+    agreement = {name: [] for name in backends}
+    reference = next(iter(backends))
+    frames = 0
+    while max_frames is None or frames < max_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames += 1
+        # Input yang sama seperti detect_face_log: view diperkecil ke max_width
+        view = vision.InferenceView(frame, None, vision.INFERENCE_CONFIG['max_width'])
+        results = {}
+        for name, backend in backends.items():
+            started = time.perf_counter()
+            boxes, scores = backend.detect(view.image, view.rgb)
+            samples[name].append(time.perf_counter() - started)
+            results[name] = boxes[scores > min_score]
+            faces[name] += len(results[name])
+        for name in backends:
+            rate = match_rate(results[name], results[reference])
+            if rate is not None:
+                agreement[name].append(rate)
+    capture.release()
+    report = {}
+    for name in backends:
+        values = np.asarray(samples[name]) * 1000.0
+        report[name] = dict(
+            frames=frames,
+            p50_ms=float(np.percentile(values, 50)) if frames else 0.0,
+            p95_ms=float(np.percentile(values, 95)) if frames else 0.0,
+            faces_per_frame=faces[name] / frames if frames else 0.0,
+            agreement=float(np.mean(agreement[name])) if agreement[name] else None,
+        )
+    return reference, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bandingkan backend deteksi wajah pada video.")
+    parser.add_argument('videos', nargs='+', help="File video, mis. man.mp4 auto.mp4")
+    parser.add_argument('--frames', type=int, default=None, help="Batasi jumlah frame per video")
+    parser.add_argument('--backends', nargs='+', default=list(FACE_BACKENDS), choices=list(FACE_BACKENDS),
+                        help="Backend pertama menjadi referensi kecocokan box")
+    args = parser.parse_args(argv)
+
+    backends = {}
+    for name in args.backends:
+        try:
+            backend = create_face_backend(name)
+            warm_face_backend(backend)
+        except Exception as e:
+            print(f"[ERROR] Backend {name} dilewati: {e}")
+            continue
+        backends[name] = backend
+    if not backends:
+        return 1
+
+    for path in args.videos:
+        reference, report = benchmark(path, backends, args.frames)
+        print(f"\n=== {os.path.basename(path)} — {report[reference]['frames']} frame, referensi: {reference} ===")
+        print(f"{'backend':<12}{'p50':>9}{'p95':>9}{'wajah/frame':>13}{'cocok':>8}")
+        for name, stats in report.items():
+            agreement = "-" if stats['agreement'] is None else f"{stats['agreement'] * 100:.0f}%"
+            print(f"{name:<12}{stats['p50_ms']:>7.2f}ms{stats['p95_ms']:>7.2f}ms"
+                  f"{stats['faces_per_frame']:>13.2f}{agreement:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
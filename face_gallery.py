@@ -0,0 +1,270 @@
+"""Galeri wajah referensi: embedding DeepFace dihitung sekali per gambar dan di-cache.
+
+Cache (npz) dikunci per file dengan (path, mtime, size). `refresh()` hanya
+menghitung ulang embedding untuk file baru/berubah dan membuang file yang
+dihapus. Gambar tanpa wajah juga dicatat (entri negatif) agar tidak di-embed
+ulang di setiap refresh. Pencocokan capture live = satu perkalian matriks-vektor terhadap
+matriks embedding (L2-ternormalisasi, jadi hasilnya cosine similarity).
+
+Untuk galeri besar, berikan `index` (face_index.FaceIndex): embedding baru langsung
+ditulis ke store memmap indeks (label = path gambar) dan tidak ditahan di RAM,
+lalu pencocokan memakai `FaceIndex.search`. Direktori indeks khusus untuk satu folder.
+
+Contoh CLI:
+    python face_gallery.py refresh D:\\referensi
+    python face_gallery.py match D:\\referensi wajah.jpg
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+MODEL_NAME = "Facenet512"
+# DeepFace: ambang cosine distance Facenet512 = 0.30, jadi similarity >= 0.70
+MATCH_THRESHOLD = 0.70
+# face_confidence DeepFace.represent di bawah ini = tidak ada wajah (embedding seluruh gambar)
+MIN_FACE_CONFIDENCE = 0.01
+
+
+def deepface_embedder(model_name=MODEL_NAME, detector_backend='yunet'):
+    """Fungsi embed(image BGR) -> vektor float32 atau None, memakai DeepFace.represent.
+
+    Jika ada beberapa wajah, dipakai wajah terbesar. Dengan enforce_detection=False
+    DeepFace mengembalikan embedding seluruh gambar saat tidak ada wajah
+    (face_confidence ~0); hasil seperti itu dianggap tidak ada wajah.
+    """
+    import vision
+
+    def embed(image):
+        with vision.deepface_lock:
+            faces = vision.registry.get('deepface').represent(
+                img_path=image, model_name=model_name, detector_backend=detector_backend,
+                enforce_detection=False)
+        faces = [f for f in faces if f.get('face_confidence', 1.0) > MIN_FACE_CONFIDENCE]
+        if not faces:
+            return None
+        face = max(faces, key=lambda f: f['facial_area']['w'] * f['facial_area']['h'])
+        return np.asarray(face['embedding'], dtype=np.float32)
+
+    return embed
+
+
+class FaceGallery:
+    """Indeks embedding wajah untuk semua gambar di `folder`."""
+
+    def __init__(self, folder, cache_path=None, embed=None, model_name=MODEL_NAME, index=None):
+        self.folder = folder
+        self.index = index
+        if cache_path is None:
+            # Dengan indeks, cache (path, mtime, size) disimpan bersama indeksnya agar tetap sinkron
+            directory = index.store.directory if index is not None else folder
+            cache_path = os.path.join(directory, ".face_gallery.npz")
+        self.cache_path = cache_path
+        self.model_name = model_name
+        self.embed = embed or deepface_embedder(model_name)
+        self.paths = []
+        self.keys = np.zeros((0, 2), dtype=np.int64)  # (mtime_ns, size) per path
+        self.embeddings = np.zeros((0, 0), dtype=np.float32)
+        self.no_face = {}   # path -> (mtime_ns, size) gambar tanpa wajah
+        self.last_refresh = None
+        self._lock = threading.Lock()           # snapshot paths/embeddings untuk match()
+        self._refresh_lock = threading.Lock()   # refresh() + save() berjalan satu per satu
+        if os.path.exists(self.cache_path):
+            try:
+                self.load()
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[ERROR] Cache galeri wajah tidak dapat dibaca, dibuat ulang: {e}")
+
+    def __len__(self):
+        return len(self.paths)
+
+    def scan(self):
+        """Daftar (path, mtime_ns, size) gambar di folder, stat diambil dari scandir."""
+        if not os.path.isdir(self.folder):
+            print(f"Folder '{self.folder}' tidak ditemukan!")
+            return []
+        files = []
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_mtime_ns, stat.st_size))
+        return sorted(files)
+
+    def refresh(self):
+        """Sinkronkan cache dengan isi folder. Mengembalikan (baru/berubah, dihapus, tetap).
+
+        Refresh dari startup dan dari klik verifikasi diserialkan: yang kedua menunggu
+        lalu hanya memakai cache yang sudah diperbarui.
+        """
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self):
+        import cv2
+
+        started = time.perf_counter()
+        with self._lock:
+            cached = {path: (i, tuple(self.keys[i])) for i, path in enumerate(self.paths)}
+            cached_embeddings = self.embeddings
+            no_face = dict(self.no_face)
+        # Label yang sudah ada di indeks; file yang di-embed ulang dihapus dulu dari indeks
+        indexed = self.index.indexed_labels() if self.index is not None else None
+        paths, keys, vectors = [], [], []
+        new_no_face = {}
+        added = kept = 0
+        files = self.scan()
+        for path, mtime_ns, size in files:
+            entry = cached.get(path)
+            if no_face.get(path) == (mtime_ns, size):
+                new_no_face[path] = (mtime_ns, size)
+                continue
+            if entry is not None and entry[1] == (mtime_ns, size) and (indexed is None or path in indexed):
+                vector = cached_embeddings[entry[0]] if indexed is None else None
+                kept += 1
+            else:
+                image = cv2.imread(path)
+                vector = self.embed(image) if image is not None else None
+                if vector is None:
+                    print(f"[INFO] Tidak ada wajah di '{path}', dilewati")
+                    new_no_face[path] = (mtime_ns, size)
+                    continue
+                vector = vector / (np.linalg.norm(vector) + 1e-12)
+                if indexed is not None:
+                    # Streaming ke store memmap: tidak ada matriks embedding di RAM
+                    if path in indexed:
+                        self.index.remove(path)
+                    self.index.add([path], vector)
+                    vector = None
+                added += 1
+            paths.append(path)
+            keys.append((mtime_ns, size))
+            if vector is not None:
+                vectors.append(vector)
+        removed = len(cached.keys() - {f[0] for f in files})
+        if indexed is not None:
+            for path in indexed - set(paths):
+                self.index.remove(path)
+        changed = added or removed or new_no_face != no_face
+
+        with self._lock:
+            self.no_face = new_no_face
+            self.paths = paths
+            self.keys = np.array(keys, dtype=np.int64).reshape(-1, 2)
+            self.embeddings = np.vstack(vectors).astype(np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+            self.last_refresh = time.time()
+        if changed:
+            self.save()
+        print(f"[INFO] Galeri wajah: {added} baru/berubah, {removed} dihapus, {kept} dari cache "
+              f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return added, removed, kept
+
+    def refresh_async(self, on_done=None):
+        """Jalankan refresh di thread background (embedding DeepFace bisa lama)."""
+        def run():
+            try:
+                result = self.refresh()
+            except Exception as e:
+                print(f"[ERROR] Refresh galeri wajah gagal: {e}")
+                result = None
+            if on_done is not None:
+                on_done(result)
+
+        thread = threading.Thread(target=run, name="face-gallery", daemon=True)
+        thread.start()
+        return thread
+
+    def match_async(self, image, on_done, top_k=2):
+        """Refresh inkremental lalu cocokkan `image` di thread background; hasil ke on_done(matches)."""
+        def run():
+            try:
+                self.refresh()
+                matches = self.match(image, top_k)
+            except Exception as e:
+                print(f"[ERROR] Pencocokan wajah gagal: {e}")
+                matches = []
+            on_done(matches)
+
+        thread = threading.Thread(target=run, name="face-match", daemon=True)
+        thread.start()
+        return thread
+
+    def match(self, image, top_k=2):
+        """Cocokkan satu gambar (BGR) ke seluruh galeri.
+
+        Mengembalikan list (path, similarity) terbaik dulu; kosong jika tidak ada
+        wajah pada gambar atau galeri kosong.
+        """
+        if self.index is not None:
+            if not len(self.index):
+                return []
+            query = self.embed(image)
+            return self.index.search(query, top_k) if query is not None else []
+        with self._lock:
+            paths, embeddings = self.paths, self.embeddings
+        if not paths:
+            return []
+        query = self.embed(image)
+        if query is None:
+            return []
+        query = query / (np.linalg.norm(query) + 1e-12)
+        scores = embeddings @ query
+        top_k = min(top_k, len(paths))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(paths[i], float(scores[i])) for i in best]
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.cache_path + ".tmp.npz"
+            no_face_paths = sorted(self.no_face)
+            np.savez(tmp_path, model_name=np.array(self.model_name), paths=np.array(self.paths, dtype=str),
+                     keys=self.keys, embeddings=self.embeddings,
+                     no_face_paths=np.array(no_face_paths, dtype=str),
+                     no_face_keys=np.array([self.no_face[p] for p in no_face_paths], dtype=np.int64).reshape(-1, 2))
+            # Ganti file secara atomik (masih di dalam lock) agar cache tidak rusak jika proses terhenti
+            os.replace(tmp_path, self.cache_path)
+
+    def load(self):
+        data = np.load(self.cache_path)
+        if str(data['model_name']) != self.model_name:
+            raise ValueError(f"cache dibuat dengan model {data['model_name']}, bukan {self.model_name}")
+        with self._lock:
+            self.paths = [str(p) for p in data['paths']]
+            self.keys = data['keys'].astype(np.int64).reshape(-1, 2)
+            self.embeddings = data['embeddings'].astype(np.float32)
+            if 'no_face_paths' in data.files:
+                self.no_face = {str(p): tuple(int(v) for v in key)
+                                for p, key in zip(data['no_face_paths'], data['no_face_keys'].reshape(-1, 2))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cache embedding wajah untuk folder gambar referensi.")
+    parser.add_argument('command', choices=['refresh', 'match'])
+    parser.add_argument('folder')
+    parser.add_argument('image', nargs='?', help="Gambar yang dicocokkan (untuk 'match')")
+    parser.add_argument('--top-k', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    gallery = FaceGallery(args.folder)
+    gallery.refresh()
+    if args.command == 'match':
+        import cv2
+        image = cv2.imread(args.image or "")
+        if image is None:
+            print(f"[ERROR] Gambar '{args.image}' tidak dapat dibaca")
+            return 1
+        started = time.perf_counter()
+        matches = gallery.match(image, args.top_k)
+        print(f"[INFO] Pencocokan {len(gallery)} referensi: {(time.perf_counter() - started) * 1000:.1f} ms")
+        for path, score in matches:
+            print(f"{score:.3f}\t{'COCOK' if score >= MATCH_THRESHOLD else '-'}\t{path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
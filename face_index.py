@@ -0,0 +1,422 @@
+"""Indeks wajah skala besar: penyimpanan embedding memory-mapped + ANN IVF-PQ (numpy).
+
+Semua file di satu direktori dan bersifat append-only:
+    vectors.f32   embedding float32 (baris x dim), dibaca lewat np.memmap
+    labels.txt    satu label pengguna per baris
+    deleted.i64   nomor baris yang dihapus (tombstone)
+    ivf.npz       centroid coarse + codebook PQ (ditulis sekali saat train)
+    codes.u8      kode PQ per baris (baris x m)
+    lists.i32     nomor inverted list per baris
+
+Pencarian: query dibandingkan ke centroid, `nprobe` list terdekat dipindai dengan
+tabel jarak PQ (ADC, tanpa membaca vektor asli), lalu `rerank` kandidat teratas
+dihitung ulang secara eksak dari memmap. Biaya per query tergantung nprobe dan
+ukuran list, bukan total jumlah wajah.
+
+Di aplikasi, indeks diisi lewat `FaceGallery(folder, index=...)`: label = path
+gambar referensi, embedding ditulis langsung ke store saat refresh.
+
+Contoh CLI:
+    python face_index.py bench --size 50000
+    python face_index.py enroll D:\\referensi
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+
+
+def squared_distances(a, b):
+    """Jarak L2 kuadrat semua pasangan baris a x b lewat satu perkalian matriks."""
+    return (np.einsum('ij,ij->i', a, a)[:, None] - 2 * a @ b.T + np.einsum('ij,ij->i', b, b)[None, :])
+
+
+def kmeans(data, k, iterations=10, seed=0, chunk=8192):
+    """K-means sederhana (numpy). Mengembalikan (centroid, assignment)."""
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    assign = np.zeros(len(data), dtype=np.int32)
+    for _ in range(iterations):
+        for start in range(0, len(data), chunk):
+            assign[start:start + chunk] = squared_distances(data[start:start + chunk], centroids).argmin(axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Cluster kosong diisi ulang dengan titik acak
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centroids, assign
+
+
+# =============================================
+# 1. Penyimpanan embedding append-only
+# =============================================
+class EmbeddingStore:
+    """Embedding float32 di file append-only, dibaca lewat memmap (tidak dimuat ke RAM)."""
+
+    def __init__(self, directory, dim):
+        self.directory = directory
+        self.dim = dim
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.labels_path = os.path.join(directory, "labels.txt")
+        self.deleted_path = os.path.join(directory, "deleted.i64")
+        self.labels = []
+        if os.path.exists(self.labels_path):
+            with open(self.labels_path, encoding="utf-8") as f:
+                self.labels = f.read().splitlines()
+        # Baris vektor yang tidak punya label (proses terhenti di tengah append) diabaikan
+        self.count = min(len(self.labels), self._file_rows())
+        self.labels = self.labels[:self.count]
+        self.alive = np.ones(self.count, dtype=bool)
+        if os.path.exists(self.deleted_path):
+            deleted = np.fromfile(self.deleted_path, dtype=np.int64)
+            self.alive[deleted[deleted < self.count]] = False
+        self._memmap = None
+
+    def _file_rows(self):
+        if not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    @property
+    def vectors(self):
+        """View memmap (count x dim); dibuat ulang setelah append."""
+        if self._memmap is None or len(self._memmap) != self.count:
+            if self.count == 0:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            self._memmap = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self.count, self.dim))
+        return self._memmap
+
+    def append(self, labels, vectors):
+        """Tambahkan embedding (sudah dinormalisasi). Mengembalikan nomor baris baru."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(self.count * self.dim * 4)
+            f.write(vectors.tobytes())
+        # Label ditulis setelah vektor: baris dianggap ada jika labelnya sudah tertulis
+        with open(self.labels_path, 'a', encoding="utf-8") as f:
+            f.write("".join(f"{label}\n" for label in labels))
+        rows = np.arange(self.count, self.count + len(vectors))
+        self.labels.extend(labels)
+        self.count += len(vectors)
+        self.alive = np.concatenate([self.alive, np.ones(len(vectors), dtype=bool)])
+        return rows
+
+    def delete(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[self.alive[rows]]
+        if len(rows):
+            with open(self.deleted_path, 'ab') as f:
+                f.write(rows.tobytes())
+            self.alive[rows] = False
+        return len(rows)
+
+
+# =============================================
+# 2. Indeks IVF-PQ
+# =============================================
+class FaceIndex:
+    """Indeks ANN wajah di atas EmbeddingStore.
+
+    Sebelum `train()` (atau selama galeri kecil) pencarian memakai brute force
+    per blok atas memmap. Setelah train, baris baru langsung di-encode saat
+    `add()` sehingga insert bersifat inkremental tanpa build ulang.
+    """
+
+    def __init__(self, directory, dim=512, nlist=None, m=32, nprobe=8, rerank=64):
+        if dim % m:
+            raise ValueError(f"dim {dim} harus habis dibagi m {m}")
+        self.store = EmbeddingStore(directory, dim)
+        self.dim = dim
+        self.m = m
+        self.nlist_config = nlist
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.centroids = None
+        self.codebooks = None  # (m, 256, dim/m)
+        self._lists = None
+        self._code_maps = None
+        self._lock = threading.Lock()
+        self.ivf_path = os.path.join(directory, "ivf.npz")
+        self.codes_path = os.path.join(directory, "codes.u8")
+        self.assign_path = os.path.join(directory, "lists.i32")
+        if os.path.exists(self.ivf_path):
+            data = np.load(self.ivf_path)
+            self._set_quantizer(data['centroids'], data['codebooks'])
+            self._encode_missing()
+
+    def __len__(self):
+        return len(self.store)
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    # ---------- encoding ----------
+    def _encoded_rows(self):
+        if not os.path.exists(self.assign_path):
+            return 0
+        return min(os.path.getsize(self.assign_path) // 4, os.path.getsize(self.codes_path) // self.m)
+
+    def _codes(self):
+        """Memmap (kode PQ, nomor list); dibuka ulang hanya setelah ada baris baru."""
+        if self._code_maps is None:
+            rows = self._encoded_rows()
+            if rows == 0:
+                return np.zeros((0, self.m), dtype=np.uint8), np.zeros(0, dtype=np.int32)
+            self._code_maps = (np.memmap(self.codes_path, dtype=np.uint8, mode='r', shape=(rows, self.m)),
+                               np.memmap(self.assign_path, dtype=np.int32, mode='r', shape=(rows,)))
+        return self._code_maps
+
+    def _set_quantizer(self, centroids, codebooks):
+        self.centroids, self.codebooks = centroids, codebooks
+        self.nlist, self.m = len(centroids), len(codebooks)
+        self._codebook_norms = (codebooks ** 2).sum(axis=2)  # (m, 256)
+        # Inner product centroid coarse dengan tiap sentroid PQ: (nlist, m, 256)
+        self._centroid_codebook = np.einsum('ljd,jkd->ljk', centroids.reshape(self.nlist, self.m, -1), codebooks)
+
+    def _encode(self, vectors):
+        assign = squared_distances(vectors, self.centroids).argmin(axis=1).astype(np.int32)
+        residual = (vectors - self.centroids[assign]).reshape(len(vectors), self.m, -1)
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = squared_distances(residual[:, j], self.codebooks[j]).argmin(axis=1)
+        return codes, assign
+
+    def _encode_missing(self, chunk=16384):
+        """Encode baris store yang belum punya kode (setelah train atau append yang terputus)."""
+        start = self._encoded_rows()
+        with open(self.codes_path, 'ab') as codes_file, open(self.assign_path, 'ab') as assign_file:
+            codes_file.truncate(start * self.m)
+            assign_file.truncate(start * 4)
+            for begin in range(start, self.store.count, chunk):
+                codes, assign = self._encode(np.asarray(self.store.vectors[begin:begin + chunk]))
+                codes_file.write(codes.tobytes())
+                assign_file.write(assign.tobytes())
+        self._lists = None
+        self._code_maps = None
+
+    def train(self, sample_size=20000, iterations=10, seed=0):
+        """Latih centroid coarse dan codebook PQ dari sampel embedding yang ada.
+
+        Tanpa `nlist` eksplisit, jumlah list = 4·sqrt(N) agar panjang list (dan
+        latensi per query) hanya tumbuh sebanding sqrt(N).
+        """
+        started = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        rows = np.flatnonzero(self.store.alive)
+        nlist = self.nlist_config or int(np.clip(4 * np.sqrt(len(rows)), 16, 1024))
+        if len(rows) < max(nlist, 256):
+            raise ValueError(f"Butuh minimal {max(nlist, 256)} embedding untuk train, baru ada {len(rows)}")
+        sample = np.asarray(self.store.vectors[np.sort(rng.choice(rows, min(sample_size, len(rows)), replace=False))])
+        centroids, assign = kmeans(sample, nlist, iterations, seed)
+        residual = (sample - centroids[assign]).reshape(len(sample), self.m, -1)
+        codebooks = np.stack([kmeans(residual[:, j], 256, iterations, seed)[0] for j in range(self.m)])
+        with self._lock:
+            self._set_quantizer(centroids, codebooks)
+            self._code_maps = None
+            for path in (self.codes_path, self.assign_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            np.savez(self.ivf_path, centroids=centroids, codebooks=codebooks)
+            self._encode_missing()
+        print(f"[INFO] Indeks wajah dilatih: {self.nlist} list, PQ {self.m}x256, "
+              f"{len(sample)} sampel ({time.perf_counter() - started:.1f} s)")
+
+    # ---------- insert / delete ----------
+    def add(self, labels, embeddings):
+        vectors = normalize_rows(embeddings)
+        if isinstance(labels, str):
+            labels = [labels] * len(vectors)
+        with self._lock:
+            rows = self.store.append(list(labels), vectors)
+            if self.trained:
+                self._encode_missing()
+        return rows
+
+    def indexed_labels(self):
+        """Label yang masih punya embedding aktif."""
+        with self._lock:
+            return {label for label, alive in zip(self.store.labels, self.store.alive) if alive}
+
+    def remove(self, label):
+        with self._lock:
+            rows = [i for i, l in enumerate(self.store.labels) if l == label]
+            return self.store.delete(rows)
+
+    # ---------- search ----------
+    def _inverted_lists(self):
+        """Baris per inverted list, dibangun ulang (satu argsort) hanya jika ada baris baru."""
+        if self._lists is None:
+            _, assign = self._codes()
+            order = np.argsort(assign, kind='stable')
+            bounds = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+            self._lists = (order.astype(np.int64), bounds)
+        return self._lists
+
+    def search(self, embedding, k=5, nprobe=None, rerank=None):
+        """k label terdekat: list (label, cosine similarity), terbaik dulu."""
+        query = normalize_rows(embedding)[0]
+        with self._lock:
+            if not self.trained:
+                rows, scores = self._brute_force(query, k)
+            else:
+                rows, scores = self._search_ivf(query, k, nprobe or self.nprobe, rerank or self.rerank)
+        return [(self.store.labels[r], float(s)) for r, s in zip(rows, scores)]
+
+    def _brute_force(self, query, k, chunk=65536):
+        vectors = self.store.vectors
+        scores = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), chunk):
+            scores[start:start + chunk] = vectors[start:start + chunk] @ query
+        scores[~self.store.alive] = -np.inf
+        return self._top(np.arange(len(scores)), scores, k)
+
+    def _search_ivf(self, query, k, nprobe, rerank):
+        codes, assign = self._codes()
+        order, bounds = self._inverted_lists()
+        coarse = squared_distances(query[None], self.centroids)[0]
+        probes = np.argpartition(coarse, min(nprobe, self.nlist) - 1)[:nprobe]
+
+        candidates = np.concatenate([order[bounds[lst]:bounds[lst + 1]] for lst in probes])
+        if not len(candidates):
+            return [], []
+        # ADC tanpa loop per list: ||q - c_l - p||² = ||q - c_l||² + Σ_j (||p_j||² - 2 q_j·p_j + 2 c_lj·p_j)
+        # Suku q·p dihitung sekali per query; suku c·p sudah ditabelkan saat train
+        query_table = self._codebook_norms - 2 * np.einsum('jd,jkd->jk', query.reshape(self.m, -1), self.codebooks)
+        lists = assign[candidates]
+        row_codes = codes[candidates]
+        sub = np.arange(self.m)
+        approx = (coarse[lists] + query_table[sub, row_codes].sum(axis=1)
+                  + 2 * self._centroid_codebook[lists[:, None], sub, row_codes].sum(axis=1))
+        approx[~self.store.alive[candidates]] = np.inf
+
+        # Rerank eksak dari memmap untuk kandidat PQ teratas saja
+        keep = min(rerank, len(candidates))
+        best = np.argpartition(approx, keep - 1)[:keep]
+        best = best[np.isfinite(approx[best])]
+        rows = np.sort(candidates[best])
+        scores = np.asarray(self.store.vectors[rows]) @ query
+        return self._top(rows, scores, k)
+
+    @staticmethod
+    def _top(rows, scores, k):
+        k = min(k, len(scores))
+        if k == 0:
+            return [], []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        best = best[np.isfinite(scores[best])]
+        return rows[best], scores[best]
+
+
+# =============================================
+# 3. Benchmark recall vs latensi
+# =============================================
+def synthetic_embeddings(count, dim, identities, seed=0, noise=0.35):
+    """Embedding sintetis: tiap identitas = arah acak, tiap sampel = arah + noise."""
+    rng = np.random.default_rng(seed)
+    centers = normalize_rows(rng.normal(size=(identities, dim)))
+    owner = rng.integers(0, identities, count)
+    samples = centers[owner] + noise * rng.normal(size=(count, dim)).astype(np.float32) / np.sqrt(dim)
+    return normalize_rows(samples), owner
+
+
+def benchmark(directory, size, dim=512, queries=200, k=5, nprobes=(1, 4, 8, 16, 32)):
+    """Isi indeks dengan `size` embedding sintetis lalu laporkan recall@k vs latensi per nprobe."""
+    index = FaceIndex(directory, dim)
+    if index.store.count < size:
+        vectors, owner = synthetic_embeddings(size - index.store.count, dim, max(size // 4, 1),
+                                              seed=index.store.count)
+        for start in range(0, len(vectors), 50000):
+            index.add([f"id{o}" for o in owner[start:start + 50000]], vectors[start:start + 50000])
+    if not index.trained:
+        index.train()
+
+    rng = np.random.default_rng(1)
+    targets = rng.choice(index.store.count, queries, replace=False)
+    probe = normalize_rows(np.asarray(index.store.vectors[targets])
+                           + 0.2 * rng.normal(size=(queries, dim)).astype(np.float32) / np.sqrt(dim))
+    truth = []
+    started = time.perf_counter()
+    for q in probe:
+        rows, _ = index._brute_force(q, k)
+        truth.append(set(rows.tolist()))
+    brute_ms = (time.perf_counter() - started) / queries * 1000
+
+    print(f"\n=== {index.store.count} embedding, dim {dim}, {queries} query ===")
+    print(f"{'nprobe':<10}{'recall@1':>10}{'recall@' + str(k):>11}{'p50 ms':>9}{'p95 ms':>9}")
+    print(f"{'brute':<10}{1.0:>10.3f}{1.0:>11.3f}{brute_ms:>9.2f}{'':>9}")
+    for nprobe in nprobes:
+        latencies, hit1, hitk = [], 0, 0
+        for q, expected in zip(probe, truth):
+            t = time.perf_counter()
+            rows, _ = index._search_ivf(q, k, nprobe, index.rerank)
+            latencies.append((time.perf_counter() - t) * 1000)
+            rows = list(rows)
+            top1 = max(expected, key=lambda r: float(index.store.vectors[r] @ q))
+            hit1 += bool(rows) and rows[0] == top1
+            hitk += len(expected & set(rows)) / len(expected)
+        print(f"{nprobe:<10}{hit1 / queries:>10.3f}{hitk / queries:>11.3f}"
+              f"{np.percentile(latencies, 50):>9.2f}{np.percentile(latencies, 95):>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indeks wajah IVF-PQ memory-mapped.")
+    parser.add_argument('--index', default="face_index", help="Direktori indeks")
+    sub = parser.add_subparsers(dest='command', required=True)
+    bench = sub.add_parser('bench', help="Recall vs latensi pada embedding sintetis")
+    bench.add_argument('--size', type=int, default=50000)
+    bench.add_argument('--dim', type=int, default=512)
+    bench.add_argument('--queries', type=int, default=200)
+    enroll = sub.add_parser('enroll', help="Sinkronkan wajah di folder ke indeks (label = path gambar); "
+                                           "file yang tidak berubah dilewati sehingga enroll ulang aman")
+    enroll.add_argument('folder')
+    enroll.add_argument('--replace', action='store_true', help="Embed ulang semua file walau tidak berubah")
+    remove = sub.add_parser('remove', help="Hapus semua embedding milik label (path gambar)")
+    remove.add_argument('label')
+    sub.add_parser('train', help="Latih ulang IVF-PQ dari embedding yang ada")
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        benchmark(args.index, args.size, args.dim, args.queries)
+        return 0
+
+    index = FaceIndex(args.index)
+    if args.command == 'enroll':
+        from face_gallery import FaceGallery
+        gallery = FaceGallery(args.folder, index=index)
+        if args.replace:
+            gallery.paths, gallery.no_face = [], {}
+        added, removed, kept = gallery.refresh()
+        print(f"[SUCCESS] {added} wajah ditambahkan, {removed} dihapus, {kept} sudah terindeks dilewati, "
+              f"total {len(index)}")
+    elif args.command == 'remove':
+        print(f"[INFO] {index.remove(args.label)} embedding dihapus")
+    elif args.command == 'train':
+        index.train()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Post-processing multi-wajah berbasis array: fusi detektor, track ID stabil, target motor.
+
+Sebelumnya face_log dibangun ulang setiap frame dan diurutkan menurut luas box,
+sehingga "Face 1" bisa berpindah orang antar frame dan motor mengejar siapa pun
+yang paling besar. Di sini:
+
+- box MediaPipe FaceDetection dan box backend face_log (YuNet/DeepFace) digabung
+  dengan NMS + rata-rata berbobot skor (`fuse_boxes`), semua dalam array NumPy.
+  Fusi hanya untuk pelacakan dan tampilan: face['confirmed'] menandai wajah yang
+  juga ditemukan backend, dan aturan motor memakai `confirmed_faces()` sehingga
+  wajah yang hanya dilihat MediaPipe tetap dianggap belum terkonfirmasi;
+- `FaceTracks.update(face_log)` mengasosiasikan box ke track lama dengan matriks
+  IoU, sehingga setiap orang punya `track_id` yang stabil;
+- satu track dikunci sebagai target motor dan dipertahankan sampai hilang
+  selama `target_lost_frames`, walaupun ada wajah lain yang lebih besar.
+"""
+import numpy as np
+
+FACE_TRACK_CONFIG = dict(
+    fusion_iou=0.4,            # box dua detektor dengan IoU di atas ini dianggap wajah yang sama
+    iou_match=0.3,             # IoU minimal untuk meneruskan track ke box frame berikutnya
+    max_missed=8,              # track dihapus setelah tidak terlihat selama N frame
+    target_lost_frames=12,     # target motor dilepas setelah hilang selama N frame
+)
+
+_NO_BOXES = np.zeros((0, 4), dtype=np.int32)
+
+
+def boxes_iou(a, b):
+    """Matriks IoU (N, M) untuk box x, y, w, h."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(1, -1, 4)
+    w = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+    h = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+    inter = np.clip(w, 0, None) * np.clip(h, 0, None)
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def fuse_boxes(box_sets, iou_threshold=FACE_TRACK_CONFIG['fusion_iou'], with_primary=False):
+    """Gabungkan beberapa (boxes, scores) dari detektor berbeda.
+
+    NMS rakus berdasarkan skor; box yang tertekan oleh box terpilih dirata-rata
+    berbobot skor ke box tersebut. Skor hasil = skor tertinggi di klasternya.
+    `with_primary=True` juga mengembalikan mask klaster yang memuat box dari set pertama.
+    """
+    sets = [(np.asarray(b, dtype=np.float32).reshape(-1, 4), np.asarray(s, dtype=np.float32).reshape(-1))
+            for b, s in box_sets]
+    boxes = np.concatenate([b for b, _ in sets]) if sets else np.zeros((0, 4), np.float32)
+    scores = np.concatenate([s for _, s in sets]) if sets else np.zeros((0,), np.float32)
+    primary = np.zeros(len(boxes), dtype=bool)
+    if sets:
+        primary[:len(sets[0][0])] = True
+    if len(boxes) <= 1:
+        fused = boxes.astype(np.int32), scores
+        return fused + (primary,) if with_primary else fused
+    order = np.argsort(-scores)
+    boxes, scores, primary = boxes[order], scores[order], primary[order]
+    overlap = boxes_iou(boxes, boxes) > iou_threshold
+    free = np.ones(len(boxes), dtype=bool)
+    fused, fused_scores, fused_primary = [], [], []
+    for i in range(len(boxes)):
+        if not free[i]:
+            continue
+        cluster = overlap[i] & free
+        free &= ~cluster
+        weights = scores[cluster]
+        fused.append((boxes[cluster] * weights[:, None]).sum(axis=0) / max(weights.sum(), 1e-6))
+        fused_scores.append(scores[i])
+        fused_primary.append(primary[cluster].any())
+    fused = np.asarray(fused).astype(np.int32), np.asarray(fused_scores, dtype=np.float32)
+    return fused + (np.asarray(fused_primary, dtype=bool),) if with_primary else fused
+
+
+def confirmed_faces(face_log):
+    """Jumlah wajah face_log yang ditemukan backend wajah (bukan hanya hasil fusi MediaPipe)."""
+    return sum(1 for face in face_log if face.get('confirmed', True))
+
+
+def detection_boxes(detections, frame_width, frame_height):
+    """Hasil MediaPipe FaceDetection -> (boxes int32 (N, 4), scores float32 (N,)) di koordinat frame."""
+    if not detections:
+        return _NO_BOXES, np.zeros((0,), dtype=np.float32)
+    relative = np.array([(d.location_data.relative_bounding_box.xmin, d.location_data.relative_bounding_box.ymin,
+                          d.location_data.relative_bounding_box.width, d.location_data.relative_bounding_box.height)
+                         for d in detections], dtype=np.float32)
+    boxes = (relative * (frame_width, frame_height, frame_width, frame_height)).astype(np.int32)
+    return boxes, np.array([d.score[0] for d in detections], dtype=np.float32)
+
+
+def nearest_box(boxes, target_box):
+    """Indeks box dengan pusat terdekat ke `target_box`, atau None jika tidak ada box."""
+    if target_box is None or not len(boxes):
+        return None
+    boxes = np.asarray(boxes, dtype=np.float32)
+    centers = boxes[:, :2] + boxes[:, 2:] / 2
+    tx, ty, tw, th = target_box
+    return int(np.argmin(np.hypot(centers[:, 0] - (tx + tw / 2), centers[:, 1] - (ty + th / 2))))
+
+
+class FaceTracks:
+    """Track ID stabil untuk face_log dan penguncian satu target untuk motor.
+
+    `update(face_log)` dipanggil sekali per frame (face_log boleh hasil cache) dan
+    menambahkan face['track_id'] serta face['target'] ke tiap wajah.
+    """
+
+    def __init__(self, config=None):
+        self.config = dict(FACE_TRACK_CONFIG, **(config or {}))
+        self.ids = np.zeros((0,), dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.missed = np.zeros((0,), dtype=np.int32)
+        self._next_id = 1
+        self.target_id = None
+        self._target_missed = 0
+        self.stats = dict(tracks=0, target_switches=0)
+
+    def update(self, face_log):
+        boxes = np.array([face['bounding_box'] for face in face_log], dtype=np.float32).reshape(-1, 4)
+        assigned = np.full(len(boxes), -1, dtype=np.int64)
+        matched_tracks = np.zeros(len(self.ids), dtype=bool)
+        if len(boxes) and len(self.ids):
+            iou = boxes_iou(boxes, self.boxes)
+            # Pasangan dengan IoU terbesar lebih dulu (asosiasi rakus)
+            for flat in np.argsort(-iou, axis=None):
+                i, j = divmod(int(flat), len(self.ids))
+                if iou[i, j] < self.config['iou_match']:
+                    break
+                if assigned[i] >= 0 or matched_tracks[j]:
+                    continue
+                assigned[i] = self.ids[j]
+                matched_tracks[j] = True
+                self.boxes[j] = boxes[i]
+        self.missed[matched_tracks] = 0
+        self.missed[~matched_tracks] += 1
+
+        new = assigned < 0
+        if new.any():
+            new_ids = np.arange(self._next_id, self._next_id + int(new.sum()))
+            self._next_id += len(new_ids)
+            assigned[new] = new_ids
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.boxes = np.concatenate([self.boxes, boxes[new]])
+            self.missed = np.concatenate([self.missed, np.zeros(len(new_ids), dtype=np.int32)])
+            self.stats['tracks'] += len(new_ids)
+
+        alive = self.missed <= self.config['max_missed']
+        self.ids, self.boxes, self.missed = self.ids[alive], self.boxes[alive], self.missed[alive]
+
+        self._update_target(assigned, boxes)
+        for face, track_id in zip(face_log, assigned.tolist()):
+            face['track_id'] = track_id
+            face['target'] = track_id == self.target_id
+        return self.target_id
+
+    def _update_target(self, assigned, boxes):
+        if self.target_id is not None and self.target_id in assigned:
+            self._target_missed = 0
+            return
+        if self.target_id is not None:
+            self._target_missed += 1
+            if self._target_missed <= self.config['target_lost_frames']:
+                return
+        # Kunci target baru: wajah terbesar saat ini
+        previous = self.target_id
+        self.target_id = int(assigned[np.argmax(boxes[:, 2] * boxes[:, 3])]) if len(boxes) else None
+        self._target_missed = 0
+        if self.target_id is not None and previous is not None and self.target_id != previous:
+            self.stats['target_switches'] += 1
+
+    def target_box(self):
+        """Box terakhir track target (x, y, w, h), atau None."""
+        if self.target_id is None:
+            return None
+        index = np.flatnonzero(self.ids == self.target_id)
+        return tuple(self.boxes[index[0]].tolist()) if len(index) else None
@@ -0,0 +1,581 @@
+import ctypes
+import queue
+import threading
+import time
+from ctypes import (
+    c_int, c_uint, c_void_p, c_char, c_char_p,
+    POINTER, Structure, byref, cast
+)
+
+import numpy as np
+
+import ansi381
+import journal
+import metrics
+
+# Define constants and data types from the header files
+DPFPDD_SUCCESS = 0
+DPFPDD_E_MORE_DATA = 0x05BA000D
+DPFPDD_IMG_FMT_ANSI381 = 0x001B0401
+DPFPDD_QUALITY_GOOD = 0
+DPFPDD_QUALITY_TIMED_OUT = 1
+DPFPDD_QUALITY_CANCELED = 1 << 1
+DPFPDD_QUALITY_NO_FINGER = 1 << 2
+MAX_FMD_SIZE = 1024 * 10  # Adjust size if necessary
+
+# =============================================
+# 1. Definisi Semua Struktur dari Header C
+# =============================================
+class DPFPDD_VER_INFO(Structure):
+    _fields_ = [
+        ("major", c_int),
+        ("minor", c_int),
+        ("maintenance", c_int)
+    ]
+
+class DPFPDD_VERSION(Structure):
+    _fields_ = [
+        ("size", c_uint),
+        ("lib_ver", DPFPDD_VER_INFO),
+        ("api_ver", DPFPDD_VER_INFO)
+    ]
+
+class DPFPDD_HW_DESCR(Structure):
+    _fields_ = [
+        ("vendor_name", c_char * 128),
+        ("product_name", c_char * 128),
+        ("serial_num", c_char * 128)
+    ]
+
+class DPFPDD_HW_ID(Structure):
+    _fields_ = [
+        ("vendor_id", c_uint),
+        ("product_id", c_uint)
+    ]
+
+class DPFPDD_HW_VERSION(Structure):
+    _fields_ = [
+        ("hw_ver", DPFPDD_VER_INFO),
+        ("fw_ver", DPFPDD_VER_INFO),
+        ("bcd_rev", c_uint)
+    ]
+
+class DPFPDD_DEV_INFO(Structure):
+    _fields_ = [
+        ("size", c_uint),
+        ("name", c_char * 1024),
+        ("descr", DPFPDD_HW_DESCR),
+        ("id", DPFPDD_HW_ID),
+        ("ver", DPFPDD_HW_VERSION),
+        ("modality", c_uint),
+        ("technology", c_uint)
+    ]
+
+class DPFPDD_DEV(Structure):
+    pass
+
+class DPFPDD_CAPTURE_PARAM(Structure):
+    _fields_ = [
+        ("size", c_uint),
+        ("image_fmt", c_uint),
+        ("image_proc", c_uint),
+        ("image_res", c_uint)
+    ]
+
+class DPFPDD_IMAGE_INFO(Structure):
+    _fields_ = [
+        ("size", c_uint),
+        ("width", c_uint),
+        ("height", c_uint),
+        ("res", c_uint),
+        ("bpp", c_uint)
+    ]
+
+class DPFPDD_CAPTURE_RESULT(Structure):
+    _fields_ = [
+        ("size", c_uint),
+        ("success", c_int),
+        ("quality", c_uint),
+        ("score", c_uint),
+        ("info", DPFPDD_IMAGE_INFO)
+    ]
+
+class DPFPDD_DEV_CAPS(Structure):
+    _fields_ = [
+        ("size", c_uint),
+        ("can_capture_image", c_int),
+        ("can_stream_image", c_int),
+        ("can_extract_features", c_int),
+        ("can_match", c_int),
+        ("can_identify", c_int),
+        ("has_fp_storage", c_int),
+        ("indicator_type", c_uint),
+        ("has_pwr_mgmt", c_int),
+        ("has_calibration", c_int),
+        ("piv_compliant", c_int),
+        ("resolution_cnt", c_uint),
+        ("resolutions", c_uint * 1)  # Array of resolutions
+    ]
+
+# =============================================
+# 2. Inisialisasi Fungsi DLL
+# =============================================
+dpfpdd = None
+dpfj = None
+
+
+def load_libraries():
+    """Muat dpfpdd.dll dan dpfj.dll. Melempar OSError jika DLL tidak tersedia."""
+    global dpfpdd, dpfj
+    if dpfpdd is not None:
+        return dpfpdd
+    dpfpdd = ctypes.WinDLL('dpfpdd.dll')
+    dpfj = ctypes.CDLL("dpfj.dll")
+
+    dpfpdd.dpfpdd_version.argtypes = [POINTER(DPFPDD_VERSION)]
+    dpfpdd.dpfpdd_version.restype = c_int
+
+    dpfpdd.dpfpdd_init.restype = c_int
+    dpfpdd.dpfpdd_exit.restype = c_int
+
+    dpfpdd.dpfpdd_query_devices.argtypes = [POINTER(c_uint), POINTER(DPFPDD_DEV_INFO)]
+    dpfpdd.dpfpdd_query_devices.restype = c_int
+
+    dpfpdd.dpfpdd_open.argtypes = [c_char_p, POINTER(POINTER(DPFPDD_DEV))]
+    dpfpdd.dpfpdd_open.restype = c_int
+
+    dpfpdd.dpfpdd_get_device_capabilities.argtypes = [POINTER(DPFPDD_DEV), POINTER(DPFPDD_DEV_CAPS)]
+    dpfpdd.dpfpdd_get_device_capabilities.restype = c_int
+
+    dpfpdd.dpfpdd_start_stream.argtypes = [POINTER(DPFPDD_DEV)]
+    dpfpdd.dpfpdd_start_stream.restype = c_int
+
+    dpfpdd.dpfpdd_stop_stream.argtypes = [POINTER(DPFPDD_DEV)]
+    dpfpdd.dpfpdd_stop_stream.restype = c_int
+
+    dpfpdd.dpfpdd_get_stream_image.argtypes = [
+        POINTER(DPFPDD_DEV),
+        POINTER(DPFPDD_CAPTURE_PARAM), 
+        POINTER(DPFPDD_CAPTURE_RESULT), 
+        POINTER (c_uint),
+        c_void_p]
+    dpfpdd.dpfpdd_get_stream_image.restype = c_int
+
+    dpfpdd.dpfpdd_capture.argtypes = [
+        POINTER(DPFPDD_DEV),
+        POINTER(DPFPDD_CAPTURE_PARAM),
+        c_uint,
+        POINTER(DPFPDD_CAPTURE_RESULT),
+        POINTER(c_uint),
+        c_void_p
+    ]
+    dpfpdd.dpfpdd_capture.restype = c_int
+    return dpfpdd
+
+
+
+# =============================================
+# 3. Antarmuka Reader (perangkat asli dan simulasi)
+# =============================================
+class CaptureResult:
+    __slots__ = ('res', 'success', 'quality', 'width', 'height', 'size')
+
+    def __init__(self, res, success, quality, width, height, size):
+        self.res = res
+        self.success = success
+        self.quality = quality
+        self.width = width
+        self.height = height
+        self.size = size
+
+    @property
+    def ok(self):
+        return self.res == DPFPDD_SUCCESS and bool(self.success)
+
+
+class FingerprintReader:
+    """Antarmuka perangkat fingerprint yang dipakai FingerprintWorker.
+
+    `read_stream` dan `capture` menulis record ANSI 381 langsung ke `buffer`
+    (array ctypes milik pemanggil) dan mengembalikan CaptureResult. Jika buffer
+    terlalu kecil, `res` bernilai DPFPDD_E_MORE_DATA dan `size` berisi ukuran
+    yang dibutuhkan.
+    """
+    # Ukuran buffer yang disarankan (byte), diisi setelah open()
+    image_size = MAX_FMD_SIZE
+
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    def read_stream(self, buffer):
+        raise NotImplementedError
+
+    def capture(self, buffer, timeout_ms):
+        raise NotImplementedError
+
+
+class DpfpddReader(FingerprintReader):
+    """Reader DigitalPersona lewat dpfpdd.dll (mode streaming)."""
+
+    def __init__(self, device_index=0):
+        self.device_index = device_index  # urutan perangkat dari dpfpdd_query_devices (multi-station)
+        self.dev_handle = None
+        self._param = DPFPDD_CAPTURE_PARAM()
+        self._param.size = ctypes.sizeof(DPFPDD_CAPTURE_PARAM)
+        self._param.image_fmt = DPFPDD_IMG_FMT_ANSI381
+        self._param.image_proc = 2
+        self._param.image_res = 500
+        self._result = DPFPDD_CAPTURE_RESULT()
+        self._result.size = ctypes.sizeof(DPFPDD_CAPTURE_RESULT)
+        self._image_size = c_uint(0)
+
+    def open(self):
+        load_libraries()
+        if dpfpdd.dpfpdd_init() != 0:
+            print("[ERROR] Gagal inisialisasi library")
+            return False
+
+        version = DPFPDD_VERSION()
+        version.size = ctypes.sizeof(DPFPDD_VERSION)
+        if dpfpdd.dpfpdd_version(byref(version)) == 0:
+            print(f"[INFO] Versi Library: {version.lib_ver.major}.{version.lib_ver.minor}")
+
+        dev_count = c_uint(0)
+        res = dpfpdd.dpfpdd_query_devices(byref(dev_count), None)
+        if res != 0 and dev_count.value == 0:
+            print("[ERROR] Tidak ada perangkat terdeteksi")
+            return False
+
+        print(f"[INFO] Jumlah perangkat: {dev_count.value}")
+
+        dev_info_array = (DPFPDD_DEV_INFO * dev_count.value)()
+        for dev in dev_info_array:
+            dev.size = ctypes.sizeof(DPFPDD_DEV_INFO)
+
+        res = dpfpdd.dpfpdd_query_devices(byref(dev_count), dev_info_array)
+        if res != 0:
+            print("[ERROR] Gagal mendapatkan info perangkat")
+            dpfpdd.dpfpdd_exit()
+            return False
+
+        if self.device_index >= dev_count.value:
+            print(f"[ERROR] Perangkat ke-{self.device_index} tidak ada (hanya {dev_count.value})")
+            dpfpdd.dpfpdd_exit()
+            return False
+        dev_handle = POINTER(DPFPDD_DEV)()
+        device_name = cast(dev_info_array[self.device_index].name, c_char_p)
+        res = dpfpdd.dpfpdd_open(device_name, byref(dev_handle))
+        if res != 0:
+            print("[ERROR] Gagal membuka perangkat")
+            dpfpdd.dpfpdd_exit()
+            return False
+
+        print("[SUCCESS] Perangkat berhasil dibuka")
+        self.dev_handle = dev_handle
+        dpfpdd.dpfpdd_start_stream(self.dev_handle)
+
+        # Tanya ukuran gambar sekali saja (buffer NULL), bukan di setiap poll
+        self._image_size.value = 0
+        dpfpdd.dpfpdd_get_stream_image(self.dev_handle, byref(self._param), byref(self._result),
+                                       byref(self._image_size), None)
+        if self._image_size.value:
+            self.image_size = self._image_size.value
+        return True
+
+    def _result_for(self, res):
+        info = self._result.info
+        return CaptureResult(res, self._result.success, self._result.quality,
+                             info.width, info.height, self._image_size.value)
+
+    def read_stream(self, buffer):
+        self._image_size.value = ctypes.sizeof(buffer)
+        res = dpfpdd.dpfpdd_get_stream_image(self.dev_handle, byref(self._param), byref(self._result),
+                                             byref(self._image_size), buffer)
+        return self._result_for(res)
+
+    def capture(self, buffer, timeout_ms):
+        self._image_size.value = ctypes.sizeof(buffer)
+        res = dpfpdd.dpfpdd_capture(self.dev_handle, byref(self._param), timeout_ms, byref(self._result),
+                                    byref(self._image_size), buffer)
+        return self._result_for(res)
+
+    def close(self):
+        if self.dev_handle:
+            dpfpdd.dpfpdd_stop_stream(self.dev_handle)
+            dpfpdd.dpfpdd_exit()
+            self.dev_handle = None
+
+
+def synthetic_fingerprint(width, height, seed=0):
+    """Gambar sidik jari sintetis (uint8) untuk simulasi dan benchmark.
+
+    Ridge berbentuk spiral/lingkaran di sekitar core acak, didistorsi medan acak
+    halus. Dislokasi fase di titik-titik acak menghasilkan ujung ridge dan
+    percabangan (minutiae), sehingga tiap `seed` memberi jari yang berbeda.
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    cx = rng.uniform(0.3, 0.7) * width
+    cy = rng.uniform(0.25, 0.6) * height
+    grid = int(rng.integers(3, 7))
+    warp = cv2.resize(rng.normal(0, 1, (grid, grid)).astype(np.float32), (width, height),
+                      interpolation=cv2.INTER_CUBIC)
+    radius = np.hypot((xx - cx) * rng.uniform(0.8, 1.3), yy - cy)
+    angle = np.arctan2(yy - cy, xx - cx)
+    period = rng.uniform(8.0, 10.0)
+    phase = (2 * np.pi * (radius + rng.uniform(8, 16) * warp) / period
+             + int(rng.integers(-2, 3)) * angle + rng.uniform(0, 3) * np.sin(angle))
+    for _ in range(int(rng.integers(15, 30))):
+        px, py = rng.uniform(0.15, 0.85) * width, rng.uniform(0.15, 0.85) * height
+        phase += rng.choice((-1.0, 1.0)) * np.arctan2(yy - py, xx - px)
+    ridges = 0.5 + 0.5 * np.cos(phase)
+    # Bentuk ujung jari (elips), di luar elips latar putih
+    inside = ((xx - width / 2) / (width * 0.45)) ** 2 + ((yy - height / 2) / (height * 0.48)) ** 2 <= 1.0
+    image = np.where(inside, 40 + 200 * ridges, 255)
+    return image.astype(np.uint8)
+
+
+class SimulatedReader(FingerprintReader):
+    """Reader simulasi untuk Linux/benchmark: jari menempel `hold` detik setiap `period` detik.
+
+    Awal tiap sentuhan (`settle` detik) memberi kualitas buruk (jari belum pas),
+    sisanya DPFPDD_QUALITY_GOOD. Gambar adalah `synthetic_fingerprint(seed)`.
+    """
+
+    def __init__(self, width=357, height=392, seed=0, period=5.0, hold=0.35, offset=2.0, settle=0.07,
+                 clock=time.monotonic):
+        self.width = width
+        self.height = height
+        self.period = period
+        self.hold = hold
+        self.offset = offset
+        self.settle = settle
+        self.clock = clock
+        self.started = clock()
+        self.image_size = ansi381.HEADER_SIZE + width * height
+        self.set_finger(seed)
+
+    def set_finger(self, seed):
+        """Ganti jari yang 'ditempelkan' (untuk simulasi beberapa pengguna)."""
+        self.record = bytearray(self.image_size)
+        ansi381.write_header(self.record, self.width, self.height)
+        self.record[ansi381.HEADER_SIZE:] = synthetic_fingerprint(self.width, self.height, seed).tobytes()
+
+    def _quality(self):
+        elapsed = self.clock() - self.started
+        phase = (elapsed - self.offset) % self.period
+        if elapsed < self.offset or phase >= self.hold:
+            return DPFPDD_QUALITY_NO_FINGER
+        return 1 << 4 if phase < self.settle else DPFPDD_QUALITY_GOOD
+
+    def _fill(self, buffer, quality):
+        if ctypes.sizeof(buffer) < self.image_size:
+            return CaptureResult(DPFPDD_E_MORE_DATA, 0, quality, self.width, self.height, self.image_size)
+        ctypes.memmove(buffer, bytes(self.record), self.image_size)
+        return CaptureResult(DPFPDD_SUCCESS, 1, quality, self.width, self.height, self.image_size)
+
+    def read_stream(self, buffer):
+        return self._fill(buffer, self._quality())
+
+    def capture(self, buffer, timeout_ms):
+        return self._fill(buffer, DPFPDD_QUALITY_GOOD)
+
+
+# =============================================
+# 4. Worker akuisisi fingerprint
+# =============================================
+class BufferPool:
+    """Buffer ctypes yang dialokasikan sekali lalu dipakai ulang antar poll."""
+
+    def __init__(self, count, size):
+        self.count = count
+        self.size = size
+        self._free = queue.Queue()
+        for _ in range(count):
+            self._free.put((ctypes.c_ubyte * size)())
+
+    def acquire(self):
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return None
+
+    def release(self, buffer):
+        # Buffer dari generasi lama (sebelum resize) tidak dikembalikan ke pool
+        if ctypes.sizeof(buffer) == self.size:
+            self._free.put(buffer)
+
+    def resize(self, size):
+        self.size = size
+        self._free = queue.Queue()
+        for _ in range(self.count):
+            self._free.put((ctypes.c_ubyte * size)())
+
+
+class FingerprintFrame:
+    """Gambar fingerprint berupa view numpy (tanpa copy) di atas buffer pool.
+
+    Penerima wajib memanggil `release()` setelah selesai memakai `image`, agar
+    buffer bisa dipakai lagi oleh worker.
+    """
+    __slots__ = ('kind', 'quality', 'image', 'record', 'matches', 'timestamp', '_buffer', '_pool')
+
+    def __init__(self, kind, quality, image, buffer, pool, record=None):
+        self.kind = kind  # "stream" atau "verified"
+        self.quality = quality
+        self.image = image
+        self.record = record  # record FID ANSI 381 lengkap (memoryview), untuk backend dpfj
+        # None = identifikasi tidak dijalankan (tanpa galeri), list kosong = tidak dikenali
+        self.matches = None
+        self.timestamp = time.perf_counter()
+        self._buffer = buffer
+        self._pool = pool
+
+    @property
+    def finger_present(self):
+        return not (self.quality & DPFPDD_QUALITY_NO_FINGER)
+
+    def release(self):
+        if self._buffer is not None:
+            self._pool.release(self._buffer)
+            self._buffer = None
+
+
+def image_view(buffer, result):
+    """View numpy (height, width) atas gambar di record ANSI 381, tanpa copy. None jika tidak valid."""
+    try:
+        return ansi381.parse(buffer, result.size).image
+    except ValueError as e:
+        print(f"[ERROR] Record fingerprint tidak valid: {e}")
+        return None
+
+
+class FingerprintWorker(threading.Thread):
+    """Polling reader fingerprint di thread sendiri.
+
+    `on_event(frame)` hanya dipanggil saat jari menempel atau kualitas berubah,
+    dan sekali dengan kind "verified" setelah capture berkualitas baik. Setelah
+    verifikasi, poll ditahan `verify_cooldown` detik (dulu time.sleep di GUI).
+    Jika `identifier` (FingerprintIdentifier) berisi template, capture "verified"
+    diidentifikasi di thread ini dan hasilnya ada di `frame.matches`.
+    Jika `gate` (motion_gate.MotionGate) idle dan tidak ada jari, poll diperjarang
+    ke `fingerprint_idle_interval` dan langsung kembali normal saat gate aktif.
+    """
+
+    def __init__(self, reader, on_event, poll_interval=0.03, pool_size=3,
+                 verify_cooldown=1.0, capture_timeout_ms=5000, clock=time.monotonic, identifier=None,
+                 gate=None):
+        super().__init__(name="fingerprint", daemon=True)
+        self.reader = reader
+        self.on_event = on_event
+        self.poll_interval = poll_interval
+        self.gate = gate
+        self.verify_cooldown = verify_cooldown
+        self.capture_timeout_ms = capture_timeout_ms
+        self.clock = clock
+        self.identifier = identifier
+        self.pool = BufferPool(pool_size, max(reader.image_size, MAX_FMD_SIZE))
+        self.stop_event = threading.Event()
+        self.last_quality = None
+        self.last_error = None
+        self.dropped = 0
+        self._cooldown_until = 0.0
+
+    def _read(self, buffer, capture=False):
+        if capture:
+            result = self.reader.capture(buffer, self.capture_timeout_ms)
+        else:
+            result = self.reader.read_stream(buffer)
+        if result.res == DPFPDD_E_MORE_DATA:
+            print(f"[INFO] Buffer fingerprint diperbesar ke {result.size} byte")
+            self.pool.resize(result.size)
+            return result, None
+        if not result.ok:
+            if result.res != self.last_error:
+                print(f"[ERROR] Gagal mengambil gambar dari streaming. Kode: {result.res}")
+            self.last_error = result.res
+            return result, None
+        self.last_error = None
+        return result, image_view(buffer, result)
+
+    def _emit(self, kind, result, image, buffer):
+        if image is None:
+            self.pool.release(buffer)
+            return
+        frame = FingerprintFrame(kind, result.quality, image, buffer, self.pool,
+                                 record=memoryview(buffer)[:result.size])
+        if kind == "verified" and self.identifier is not None and len(self.identifier):
+            with metrics.span("fingerprint_identify"):
+                frame.matches = self.identifier.identify(image, frame.record)
+        self.on_event(frame)
+
+    def poll_once(self):
+        """Satu siklus poll; dipakai oleh run() dan oleh benchmark secara sinkron."""
+        with metrics.span("fingerprint_poll"):
+            self._poll()
+
+    def _poll(self):
+        if self.clock() < self._cooldown_until:
+            return
+        buffer = self.pool.acquire()
+        if buffer is None:
+            # Semua buffer masih dipakai penerima; lewati poll ini
+            self.dropped += 1
+            metrics.count("fingerprint_dropped_polls")
+            return
+        result, image = self._read(buffer)
+        quality = result.quality if image is not None else None
+        if image is not None and (not (quality & DPFPDD_QUALITY_NO_FINGER) or quality != self.last_quality):
+            if quality != self.last_quality:
+                journal.event("fingerprint_quality", quality)
+            self._emit("stream", result, image, buffer)
+        else:
+            self.pool.release(buffer)
+        if quality is not None:
+            self.last_quality = quality
+
+        if quality == DPFPDD_QUALITY_GOOD:
+            buffer = self.pool.acquire()
+            if buffer is None:
+                self.dropped += 1
+                metrics.count("fingerprint_dropped_polls")
+                return
+            result, image = self._read(buffer, capture=True)
+            if image is not None and result.quality == DPFPDD_QUALITY_GOOD:
+                self._emit("verified", result, image, buffer)
+                self._cooldown_until = self.clock() + self.verify_cooldown
+            else:
+                self.pool.release(buffer)
+
+    def finger_present(self):
+        return self.last_quality is not None and not (self.last_quality & DPFPDD_QUALITY_NO_FINGER)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            present = self.finger_present()
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"[ERROR] Fingerprint: {e}")
+            if self.gate is None:
+                self.stop_event.wait(self.poll_interval)
+                continue
+            if self.finger_present() and not present:
+                self.gate.note_fingerprint()
+            if self.gate.idle and not self.finger_present():
+                # Station kosong: tunggu gate aktif atau poll pengaman berikutnya
+                self.gate.wait_active(self.gate.config['fingerprint_idle_interval'], self.stop_event)
+            else:
+                self.stop_event.wait(self.poll_interval)
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        if self.gate is not None:
+            self.gate.interrupt()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,409 @@
+import numpy as np
+
+# Ukuran blok (piksel) untuk medan orientasi, ~1.5 periode ridge pada 500 dpi
+BLOCK_SIZE = 16
+
+
+def block_sum(values, block):
+    """Jumlahkan nilai per blok (block x block) secara vektor, sisa tepi dibuang."""
+    bh, bw = values.shape[0] // block, values.shape[1] // block
+    return values[:bh * block, :bw * block].reshape(bh, block, bw, block).sum(axis=(1, 3))
+
+
+def orientation_field(image, block=BLOCK_SIZE):
+    """Orientasi ridge per blok (radian, 0..pi) dan koherensinya (0..1).
+
+    Metode gradien kuadrat: orientasi dominan gradien dihitung dari jumlah
+    Gxx, Gyy, Gxy per blok, lalu diputar 90 derajat menjadi arah ridge.
+    """
+    img = image.astype(np.float32)
+    gy, gx = np.gradient(img)
+    gxx = block_sum(gx * gx, block)
+    gyy = block_sum(gy * gy, block)
+    gxy = block_sum(gx * gy, block)
+    theta = 0.5 * np.arctan2(2 * gxy, gxx - gyy) + np.pi / 2
+    coherence = np.sqrt((gxx - gyy) ** 2 + 4 * gxy ** 2) / (gxx + gyy + 1e-6)
+    return np.mod(theta, np.pi), coherence
+
+
+def foreground_mask(image, block=BLOCK_SIZE, min_std=12.0):
+    """Blok yang berisi ridge (simpangan baku intensitas cukup besar)."""
+    img = image.astype(np.float32)
+    n = block * block
+    mean = block_sum(img, block) / n
+    var = block_sum(img * img, block) / n - mean ** 2
+    return np.sqrt(np.maximum(var, 0)) > min_std
+
+
+def orientation_descriptor(image, grid=16, block=BLOCK_SIZE):
+    """Vektor (cos 2θ, sin 2θ) x koherensi pada grid blok yang dipusatkan ke jari.
+
+    Hasilnya float32 ternormalisasi L2, sehingga kemiripan dua sidik jari cukup
+    dihitung dengan dot product.
+    """
+    theta, coherence = orientation_field(image, block)
+    mask = foreground_mask(image, block)
+    weight = coherence * mask
+    field = np.stack([np.cos(2 * theta) * weight, np.sin(2 * theta) * weight])
+
+    # Pusatkan jendela grid x grid blok ke centroid area jari (toleransi translasi)
+    descriptor = np.zeros((2, grid, grid), dtype=np.float32)
+    if mask.any():
+        rows, cols = np.nonzero(mask)
+        cy, cx = int(rows.mean()), int(cols.mean())
+    else:
+        cy, cx = mask.shape[0] // 2, mask.shape[1] // 2
+    y0, x0 = cy - grid // 2, cx - grid // 2
+    sy0, sx0 = max(y0, 0), max(x0, 0)
+    sy1, sx1 = min(y0 + grid, mask.shape[0]), min(x0 + grid, mask.shape[1])
+    descriptor[:, sy0 - y0:sy1 - y0, sx0 - x0:sx1 - x0] = field[:, sy0:sy1, sx0:sx1]
+
+    descriptor = descriptor.ravel()
+    norm = np.linalg.norm(descriptor)
+    return descriptor / norm if norm > 0 else descriptor
+
+
+def orientation_histogram(image, bins=12, block=BLOCK_SIZE):
+    """Histogram orientasi berbobot koherensi (tak bergantung posisi), untuk pruning kandidat."""
+    theta, coherence = orientation_field(image, block)
+    weight = coherence * foreground_mask(image, block)
+    hist, _ = np.histogram(theta, bins=bins, range=(0, np.pi), weights=weight)
+    hist = hist.astype(np.float32)
+    norm = np.linalg.norm(hist)
+    return hist / norm if norm > 0 else hist
+
+
+# =============================================
+# Ekstraksi minutiae (numpy murni)
+# =============================================
+MINUTIA_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('theta', '<f4'), ('kind', 'u1')])
+MINUTIA_ENDING = 1
+MINUTIA_BIFURCATION = 3
+
+GABOR_ORIENTATIONS = 16
+GABOR_CACHE_SIZE = 8
+_gabor_cache = {}
+
+
+def normalize(image, mask=None):
+    """Intensitas dinormalisasi ke mean 0, std 1 (dihitung di area jari)."""
+    img = image.astype(np.float32)
+    sample = img[mask] if mask is not None and mask.any() else img
+    return (img - sample.mean()) / (sample.std() + 1e-6)
+
+
+def upsample_blocks(values, block, shape):
+    """Perbesar nilai per blok ke resolusi piksel (nearest), tepi diisi blok terakhir."""
+    full = np.repeat(np.repeat(values, block, axis=0), block, axis=1)
+    pad_y, pad_x = max(shape[0] - full.shape[0], 0), max(shape[1] - full.shape[1], 0)
+    if pad_y or pad_x:
+        full = np.pad(full, ((0, pad_y), (0, pad_x)), mode='edge')
+    return full[:shape[0], :shape[1]]
+
+
+def interpolate_blocks(values, block, shape):
+    """Interpolasi bilinear nilai per blok (pusat blok) ke resolusi piksel."""
+    def axis_weights(count, size):
+        pos = np.clip((np.arange(size) + 0.5) / block - 0.5, 0, count - 1)
+        low = np.minimum(pos.astype(np.intp), max(count - 2, 0))
+        return low, np.minimum(low + 1, count - 1), (pos - low).astype(np.float32)
+
+    y0, y1, wy = axis_weights(values.shape[0], shape[0])
+    x0, x1, wx = axis_weights(values.shape[1], shape[1])
+    top = values[y0][:, x0] * (1 - wx) + values[y0][:, x1] * wx
+    bottom = values[y1][:, x0] * (1 - wx) + values[y1][:, x1] * wx
+    return top * (1 - wy[:, None]) + bottom * wy[:, None]
+
+
+def smooth_orientation(theta, coherence, passes=2):
+    """Haluskan medan orientasi lewat rata-rata (cos 2θ, sin 2θ) tetangga 3x3 berbobot koherensi."""
+    c = np.cos(2 * theta) * coherence
+    s = np.sin(2 * theta) * coherence
+    for _ in range(passes):
+        c = _box3(c)
+        s = _box3(s)
+    return np.mod(0.5 * np.arctan2(s, c), np.pi)
+
+
+def _box3(values):
+    padded = np.pad(values, 1, mode='edge')
+    h, w = values.shape
+    return sum(padded[dy:dy + h, dx:dx + w] for dy in range(3) for dx in range(3)) / 9.0
+
+
+def ridge_period(image, mask, min_period=5.0, max_period=15.0):
+    """Perkiraan periode ridge global (piksel) dari spektrum 2D area jari.
+
+    Dipakai rata-rata frekuensi berbobot energi di pita periode wajar, bukan satu
+    puncak, agar stabil terhadap pergeseran kecil jari.
+    """
+    img = image.astype(np.float32)
+    if mask.any():
+        img = np.where(mask, img - img[mask].mean(), 0)
+    power = np.abs(np.fft.rfft2(img)) ** 2
+    fy = np.fft.fftfreq(img.shape[0])[:, None]
+    fx = np.fft.rfftfreq(img.shape[1])[None, :]
+    radius = np.hypot(fy, fx)
+    band = (radius >= 1.0 / max_period) & (radius <= 1.0 / min_period)
+    weight = power[band]
+    if not band.any() or weight.sum() <= 0:
+        return 9.0
+    return float(weight.sum() / (weight * radius[band]).sum())
+
+
+def fast_length(n):
+    """Panjang >= n terkecil berbentuk 2^a 3^b 5^c (ukuran efisien untuk FFT)."""
+    best = 2 * n
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            value = p35
+            while value < n:
+                value *= 2
+            best = min(best, value)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _gabor_spectra(shape, period, orientations=GABOR_ORIENTATIONS):
+    """Spektrum rfft2 kernel Gabor untuk setiap orientasi.
+
+    Periode dibulatkan ke 0.5 piksel dan hasilnya di-cache, sehingga capture
+    berikutnya dari reader yang sama tidak menghitung ulang kernel.
+    """
+    period = round(period * 2) / 2
+    key = (shape, period, orientations)
+    spectra = _gabor_cache.get(key)
+    if spectra is None:
+        # Spektrum Gabor langsung dalam domain frekuensi: dua Gaussian di ±f0,
+        # f0 tegak lurus arah ridge (tanpa membangun kernel spasial lalu FFT)
+        sigma = 0.5 * period
+        fy = np.fft.fftfreq(shape[0]).astype(np.float32)[None, :, None]
+        fx = np.fft.rfftfreq(shape[1]).astype(np.float32)[None, None, :]
+        angles = (np.arange(orientations) * np.pi / orientations).astype(np.float32)[:, None, None]
+        u0, v0 = -np.sin(angles) / period, np.cos(angles) / period
+        scale = np.float32(-2 * np.pi ** 2 * sigma ** 2)
+        spectra = (np.exp(scale * ((fx - u0) ** 2 + (fy - v0) ** 2))
+                   + np.exp(scale * ((fx + u0) ** 2 + (fy + v0) ** 2)))
+        spectra[:, 0, 0] = 0  # tanpa komponen DC, setara kernel ber-mean nol
+        if len(_gabor_cache) >= GABOR_CACHE_SIZE:
+            _gabor_cache.pop(next(iter(_gabor_cache)))
+        _gabor_cache[key] = spectra
+    return spectra
+
+
+def enhance(image, orientation, mask, period, block=BLOCK_SIZE):
+    """Perkuat ridge dengan filter Gabor terarah.
+
+    Citra difilter sekaligus untuk semua orientasi terkuantisasi (satu batch FFT),
+    lalu tiap piksel mengambil respons dari orientasi bloknya.
+    """
+    img = normalize(image, upsample_blocks(mask, block, image.shape))
+    # FFT dipad ke ukuran 2^a 3^b 5^c (mis. lebar 357 -> 360) yang jauh lebih cepat
+    shape = (fast_length(image.shape[0]), fast_length(image.shape[1]))
+    spectrum = np.fft.rfft2(img, s=shape)[None] * _gabor_spectra(shape, period)
+    responses = np.fft.irfft2(spectrum, s=shape)[:, :image.shape[0], :image.shape[1]]
+    # Orientasi per piksel diinterpolasi dari (cos 2θ, sin 2θ) blok agar tidak ada
+    # patahan ridge palsu di batas blok
+    cos2 = interpolate_blocks(np.cos(2 * orientation), block, image.shape)
+    sin2 = interpolate_blocks(np.sin(2 * orientation), block, image.shape)
+    pixel_orientation = np.mod(0.5 * np.arctan2(sin2, cos2), np.pi)
+    index = np.round(pixel_orientation / np.pi * GABOR_ORIENTATIONS).astype(np.intp) % GABOR_ORIENTATIONS
+    rows, cols = np.indices(image.shape)
+    return responses[index, rows, cols]
+
+
+# Urutan tetangga searah jarum jam mulai dari atas: P2..P9 (notasi Zhang-Suen)
+_NEIGHBOURS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+
+def neighbour_code(binary):
+    """Kode 8-bit tetangga setiap piksel (bit i = tetangga ke-i di _NEIGHBOURS)."""
+    padded = np.pad(binary.astype(np.uint8), 1)
+    h, w = binary.shape
+    code = np.zeros((h, w), dtype=np.uint8)
+    for bit, (dy, dx) in enumerate(_NEIGHBOURS):
+        code |= padded[1 + dy:1 + dy + h, 1 + dx:1 + dx + w] << bit
+    return code
+
+
+def _bits(codes):
+    return (codes[:, None] >> np.arange(8)) & 1
+
+
+def _thinning_tables():
+    """Tabel lookup 256 entri untuk dua sub-iterasi Zhang-Suen."""
+    p = _bits(np.arange(256, dtype=np.uint16))
+    count = p.sum(axis=1)
+    transitions = ((p == 0) & (np.roll(p, -1, axis=1) == 1)).sum(axis=1)
+    p2, p4, p6, p8 = p[:, 0], p[:, 2], p[:, 4], p[:, 6]
+    base = (count >= 2) & (count <= 6) & (transitions == 1)
+    first = base & (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+    second = base & (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+    return first, second
+
+
+def _crossing_table():
+    p = _bits(np.arange(256, dtype=np.uint16))
+    return (np.abs(p - np.roll(p, -1, axis=1)).sum(axis=1) // 2).astype(np.uint8)
+
+
+_THIN_FIRST, _THIN_SECOND = _thinning_tables()
+_CROSSING_NUMBER = _crossing_table()
+
+
+def thin(binary, max_iterations=20):
+    """Skeletonisasi Zhang-Suen; tiap sub-iterasi diproses sekaligus lewat tabel lookup."""
+    skeleton = binary.astype(bool).copy()
+    for _ in range(max_iterations):
+        changed = False
+        for table in (_THIN_FIRST, _THIN_SECOND):
+            remove = skeleton & table[neighbour_code(skeleton)]
+            if remove.any():
+                skeleton &= ~remove
+                changed = True
+        if not changed:
+            break
+    return skeleton
+
+
+def extract_minutiae(image, block=BLOCK_SIZE, border=1, min_distance=None, max_count=80):
+    """Ekstraksi minutiae: orientasi → enhancement Gabor → thinning → crossing number.
+
+    Mengembalikan structured array MINUTIA_DTYPE (x, y piksel; theta arah ridge
+    0..pi; kind 1 = ujung ridge, 3 = percabangan).
+    """
+    theta, coherence = orientation_field(image, block)
+    mask = foreground_mask(image, block)
+    orientation = smooth_orientation(theta, coherence)
+    period = ridge_period(image, upsample_blocks(mask, block, image.shape))
+    enhanced = enhance(image, orientation, mask, period, block)
+
+    # Ridge gelap pada gambar reader → respons negatif
+    pixel_mask = upsample_blocks(_erode(mask, border), block, image.shape)
+    skeleton = thin((enhanced < 0) & upsample_blocks(mask, block, image.shape))
+    crossing = _CROSSING_NUMBER[neighbour_code(skeleton)]
+    candidates = skeleton & pixel_mask & ((crossing == MINUTIA_ENDING) | (crossing == MINUTIA_BIFURCATION))
+    ys, xs = np.nonzero(candidates)
+    kinds = crossing[ys, xs]
+
+    # Buang pasangan minutiae yang terlalu dekat (ridge putus/jembatan palsu)
+    min_distance = min_distance or period * 0.8
+    if len(xs) > 1:
+        points = np.stack([xs, ys], axis=1).astype(np.float32)
+        dist = np.linalg.norm(points[:, None] - points[None, :], axis=2)
+        np.fill_diagonal(dist, np.inf)
+        keep = dist.min(axis=1) >= min_distance
+        xs, ys, kinds = xs[keep], ys[keep], kinds[keep]
+
+    # Jika terlalu banyak, ambil yang koherensi bloknya paling tinggi
+    block_coherence = coherence[np.minimum(ys // block, coherence.shape[0] - 1),
+                                np.minimum(xs // block, coherence.shape[1] - 1)]
+    if len(xs) > max_count:
+        keep = np.argsort(-block_coherence)[:max_count]
+        xs, ys, kinds = xs[keep], ys[keep], kinds[keep]
+
+    minutiae = np.empty(len(xs), dtype=MINUTIA_DTYPE)
+    minutiae['x'] = xs
+    minutiae['y'] = ys
+    minutiae['theta'] = orientation[np.minimum(ys // block, orientation.shape[0] - 1),
+                                    np.minimum(xs // block, orientation.shape[1] - 1)]
+    minutiae['kind'] = kinds
+    return minutiae
+
+
+def _erode(mask, iterations):
+    """Erosi mask blok (4-tetangga) agar minutiae palsu di tepi jari terbuang."""
+    for _ in range(iterations):
+        padded = np.pad(mask, 1, constant_values=False)
+        mask = (mask & padded[:-2, 1:-1] & padded[2:, 1:-1] & padded[1:-1, :-2] & padded[1:-1, 2:])
+    return mask
+
+
+# =============================================
+# Pencocokan minutiae
+# =============================================
+def neighbour_distances(minutiae, k=4):
+    """Descriptor lokal invarian rotasi/translasi: jarak terurut ke k minutiae terdekat."""
+    points = np.stack([minutiae['x'], minutiae['y']], axis=1)
+    if len(points) <= k:
+        return np.zeros((len(points), k), dtype=np.float32)
+    dist = np.linalg.norm(points[:, None] - points[None, :], axis=2)
+    return np.sort(dist, axis=1)[:, 1:k + 1].astype(np.float32)
+
+
+class MinutiaeBatch:
+    """Template minutiae galeri dalam array padded (template x MAX) untuk skor sekaligus.
+
+    Slot kosong diberi koordinat jauh di luar gambar sehingga tidak pernah cocok.
+    """
+    PAD = 1e6
+
+    def __init__(self, templates, k=4):
+        count = max([len(t) for t in templates] + [1])
+        shape = (len(templates), count)
+        self.x = np.full(shape, self.PAD, dtype=np.float32)
+        self.y = np.full(shape, self.PAD, dtype=np.float32)
+        self.theta = np.zeros(shape, dtype=np.float32)
+        self.kind = np.zeros(shape, dtype=np.uint8)
+        self.desc = np.full(shape + (k,), self.PAD, dtype=np.float32)
+        self.size = np.array([len(t) for t in templates], dtype=np.int32)
+        for i, minutiae in enumerate(templates):
+            n = len(minutiae)
+            self.x[i, :n], self.y[i, :n] = minutiae['x'], minutiae['y']
+            self.theta[i, :n], self.kind[i, :n] = minutiae['theta'], minutiae['kind']
+            self.desc[i, :n] = neighbour_distances(minutiae, k)
+
+
+def minutiae_similarity(probe, gallery, indices, hypotheses=12, distance_tolerance=12.0,
+                        angle_tolerance=np.pi / 12, chunk=32):
+    """Kemiripan 0..1 satu set minutiae probe terhadap template `indices` di MinutiaeBatch.
+
+    Untuk tiap template, pasangan minutiae dengan descriptor lokal paling mirip
+    dijadikan hipotesis alignment (rotasi dari selisih arah, translasi dari posisi).
+    Semua template dan hipotesis diuji sekaligus sebagai array (template x hipotesis
+    x probe x galeri), diproses per `chunk` template agar memori terbatas.
+    Skor = n_cocok² / (n_probe * n_galeri) untuk hipotesis terbaik.
+    """
+    indices = np.asarray(indices)
+    scores = np.zeros(len(indices), dtype=np.float64)
+    n = len(probe)
+    if n < 3:
+        return scores
+    probe_desc = neighbour_distances(probe, gallery.desc.shape[2])
+    px, py, ptheta = probe['x'], probe['y'], probe['theta']
+    for start in range(0, len(indices), chunk):
+        idx = indices[start:start + chunk]
+        gx, gy, gtheta = gallery.x[idx], gallery.y[idx], gallery.theta[idx]
+        m = gx.shape[1]
+        count = min(hypotheses, n * m)
+
+        cost = np.abs(probe_desc[None, :, None] - gallery.desc[idx][:, None]).mean(axis=3)
+        cost += 2.0 * (probe['kind'][None, :, None] != gallery.kind[idx][:, None, :])
+        pairs = np.argpartition(cost.reshape(len(idx), -1), count - 1, axis=1)[:, :count]
+        pi, gi = np.divmod(pairs, m)
+        rows = np.arange(len(idx))[:, None]
+
+        # Arah ridge mod pi: rotasi diasumsikan di bawah 90 derajat
+        rotation = (np.mod(gtheta[rows, gi] - ptheta[pi] + np.pi / 2, np.pi) - np.pi / 2).astype(np.float32)
+        cos_r, sin_r = np.cos(rotation)[..., None], np.sin(rotation)[..., None]
+        rx = cos_r * px - sin_r * py
+        ry = sin_r * px + cos_r * py
+        rx += (gx[rows, gi] - (cos_r[..., 0] * px[pi] - sin_r[..., 0] * py[pi]))[..., None]
+        ry += (gy[rows, gi] - (sin_r[..., 0] * px[pi] + cos_r[..., 0] * py[pi]))[..., None]
+
+        # Cek sudut tanpa mod per elemen: |Δθ + rotasi| < tol (mod pi) <=> cos 2(Δθ + rotasi) > cos 2tol
+        delta = 2 * (ptheta[None, :, None] - gtheta[:, None, :])
+        cos_d, sin_d = np.cos(delta)[:, None], np.sin(delta)[:, None]
+        cos_2r, sin_2r = np.cos(2 * rotation)[..., None, None], np.sin(2 * rotation)[..., None, None]
+        dx = rx[..., None] - gx[:, None, None, :]
+        dy = ry[..., None] - gy[:, None, None, :]
+        ok = ((dx * dx + dy * dy < distance_tolerance ** 2)
+              & (cos_d * cos_2r - sin_d * sin_2r > np.cos(2 * angle_tolerance)))
+        # Perkiraan pasangan satu-satu: minimum jumlah probe dan galeri yang punya pasangan
+        matched = np.minimum(ok.any(axis=3).sum(axis=2), ok.any(axis=2).sum(axis=2)).max(axis=1)
+        size = gallery.size[idx]
+        scores[start:start + chunk] = np.where(size >= 3, matched ** 2 / (n * np.maximum(size, 1.0)), 0.0)
+    return scores
@@ -0,0 +1,366 @@
+"""Identifikasi sidik jari 1:N terhadap galeri template pengguna terdaftar.
+
+Contoh CLI:
+    python fingerprint_match.py enroll budi jari1.png jari2.png
+    python fingerprint_match.py identify probe.png
+    python fingerprint_match.py --backend dpfj enroll budi jari1.fir   # record ANSI 381
+    python fingerprint_match.py list
+    python fingerprint_match.py bench --users 5000
+
+Latensi identifikasi sangat bergantung pada CPU; ukur dengan `bench` di hardware
+station sebelum menentukan ukuran galeri.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from ctypes import POINTER, byref, c_int, c_uint, c_ubyte
+
+import numpy as np
+
+import ansi381
+import fingerprint
+from fingerprint_features import (
+    MINUTIA_DTYPE, MinutiaeBatch, extract_minutiae, minutiae_similarity,
+    orientation_descriptor, orientation_histogram,
+)
+
+GALLERY_PATH = "fingerprint_gallery.npz"
+
+
+# =============================================
+# 1. Backend matcher
+# =============================================
+class MatcherBackend:
+    """Antarmuka backend: ekstraksi template dan skor satu probe ke banyak template.
+
+    Template disimpan sebagai bytes agar galeri bisa menyimpan backend apa pun.
+    `prepare` mengubah daftar template menjadi bentuk batch milik backend (mis.
+    matriks numpy), lalu `score` menghitung kemiripan 0..1 untuk baris `indices`.
+    """
+    name = None
+    threshold = 0.5
+
+    def extract(self, image, record=None):
+        raise NotImplementedError
+
+    def prepare(self, templates):
+        return list(templates)
+
+    def score(self, probe, batch, indices):
+        raise NotImplementedError
+
+
+class OrientationBackend(MatcherBackend):
+    """Matcher numpy murni: descriptor medan orientasi, skor = cosine similarity."""
+    name = "orientation"
+    # Dikalibrasi pada galeri sintetis (genuine ~0.99, impostor terbesar ~0.96);
+    # sesuaikan dengan data capture nyata
+    threshold = 0.97
+
+    def extract(self, image, record=None):
+        return orientation_descriptor(image).tobytes()
+
+    def prepare(self, templates):
+        if not templates:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack([np.frombuffer(t, dtype=np.float32) for t in templates])
+
+    def score(self, probe, batch, indices):
+        # Satu perkalian matriks-vektor untuk semua kandidat
+        return batch[indices] @ np.frombuffer(probe, dtype=np.float32)
+
+
+class MinutiaeBackend(MatcherBackend):
+    """Matcher minutiae numpy murni (tanpa DLL vendor, jalan juga di Linux).
+
+    Template = array minutiae (x, y, theta, kind); `prepare` menyusunnya menjadi
+    MinutiaeBatch (array padded + descriptor lokal), sehingga identifikasi hanya
+    menjalankan alignment tervektorisasi untuk semua kandidat.
+    """
+    name = "minutiae"
+    # Galeri sintetis: genuine 0.3..0.97 (termasuk rotasi 20 derajat), impostor <= 0.13
+    threshold = 0.16
+
+    def extract(self, image, record=None):
+        return extract_minutiae(image).tobytes()
+
+    def prepare(self, templates):
+        return MinutiaeBatch([np.frombuffer(t, dtype=MINUTIA_DTYPE) for t in templates])
+
+    def score(self, probe, batch, indices):
+        return minutiae_similarity(np.frombuffer(probe, dtype=MINUTIA_DTYPE), batch, indices)
+
+
+DPFJ_SUCCESS = 0
+DPFJ_FID_ANSI_381_2004 = 0x001B0401
+DPFJ_FMD_ANSI_378_2004 = 0x001B0001
+DPFJ_PROBABILITY_ONE = 0x7FFFFFFF
+DPFJ_MAX_FMD_SIZE = 1562
+
+
+class DpfjBackend(MatcherBackend):
+    """Backend dpfj.dll: FMD ANSI 378 dari FID ANSI 381, skor dari dpfj_compare.
+
+    dpfj mengembalikan dissimilarity (0 = identik, DPFJ_PROBABILITY_ONE = beda);
+    nilainya diubah menjadi kemiripan 1 - dissimilarity / DPFJ_PROBABILITY_ONE.
+    Threshold default setara FMR 1/100000 yang disarankan DigitalPersona.
+    """
+    name = "dpfj"
+    threshold = 1.0 - 1.0 / 100000
+
+    def __init__(self):
+        fingerprint.load_libraries()
+        self.dpfj = fingerprint.dpfj
+        self.dpfj.dpfj_create_fmd_from_fid.argtypes = [
+            c_int, POINTER(c_ubyte), c_uint, c_int, POINTER(c_ubyte), POINTER(c_uint)]
+        self.dpfj.dpfj_create_fmd_from_fid.restype = c_int
+        self.dpfj.dpfj_compare.argtypes = [
+            c_int, POINTER(c_ubyte), c_uint, c_uint,
+            c_int, POINTER(c_ubyte), c_uint, c_uint, POINTER(c_uint)]
+        self.dpfj.dpfj_compare.restype = c_int
+        self._fmd = (c_ubyte * DPFJ_MAX_FMD_SIZE)()
+        self._score = c_uint(0)
+
+    def extract(self, image, record=None):
+        if record is None:
+            raise ValueError("Backend dpfj membutuhkan record FID ANSI 381 lengkap")
+        fid = (c_ubyte * len(record)).from_buffer_copy(record)
+        fmd_size = c_uint(DPFJ_MAX_FMD_SIZE)
+        res = self.dpfj.dpfj_create_fmd_from_fid(DPFJ_FID_ANSI_381_2004, fid, len(record),
+                                                 DPFJ_FMD_ANSI_378_2004, self._fmd, byref(fmd_size))
+        if res != DPFJ_SUCCESS:
+            raise RuntimeError(f"dpfj_create_fmd_from_fid gagal. Kode: 0x{res:08X}")
+        return bytes(self._fmd[:fmd_size.value])
+
+    def prepare(self, templates):
+        # Buffer ctypes dibuat sekali per template, bukan di setiap identifikasi
+        return [((c_ubyte * len(t)).from_buffer_copy(t), len(t)) for t in templates]
+
+    def score(self, probe, batch, indices):
+        probe_buf = (c_ubyte * len(probe)).from_buffer_copy(probe)
+        scores = np.empty(len(indices), dtype=np.float64)
+        for i, idx in enumerate(indices):
+            fmd, size = batch[idx]
+            res = self.dpfj.dpfj_compare(DPFJ_FMD_ANSI_378_2004, probe_buf, len(probe), 0,
+                                         DPFJ_FMD_ANSI_378_2004, fmd, size, 0, byref(self._score))
+            scores[i] = 1.0 - self._score.value / DPFJ_PROBABILITY_ONE if res == DPFJ_SUCCESS else 0.0
+        return scores
+
+
+BACKENDS = {
+    OrientationBackend.name: OrientationBackend,
+    MinutiaeBackend.name: MinutiaeBackend,
+    DpfjBackend.name: DpfjBackend,
+}
+
+
+DEFAULT_BACKEND = MinutiaeBackend.name
+
+
+def create_backend(name):
+    return BACKENDS[name]()
+
+
+# =============================================
+# 2. Galeri template dan identifikasi 1:N
+# =============================================
+class FingerprintIdentifier:
+    """Galeri template persisten dengan identifikasi 1:N.
+
+    Identifikasi berjalan dua tahap: (1) semua template disaring dengan histogram
+    orientasi (vektor kecil, satu perkalian matriks) dan hanya `max_candidates`
+    teratas yang lolos; (2) backend menghitung skor penuh untuk kandidat tersebut.
+    Satu pengguna boleh punya beberapa template (beberapa sampel jari).
+    """
+
+    def __init__(self, backend=None, path=GALLERY_PATH, max_candidates=200):
+        self.backend = backend
+        self.path = path
+        self.max_candidates = max_candidates
+        self.user_ids = []
+        self.templates = []
+        self.coarse = np.zeros((0, 0), dtype=np.float32)
+        self._batch = None
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+        if self.backend is None:
+            self.backend = create_backend(DEFAULT_BACKEND)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def users(self):
+        return sorted(set(self.user_ids))
+
+    def enroll(self, user_id, image, record=None):
+        template = self.backend.extract(image, record)
+        coarse = orientation_histogram(image)
+        with self._lock:
+            self.user_ids.append(user_id)
+            self.templates.append(template)
+            self.coarse = np.vstack([self.coarse, coarse]) if len(self.coarse) else coarse[None, :]
+            self._batch = None
+
+    def remove(self, user_id):
+        with self._lock:
+            keep = [i for i, uid in enumerate(self.user_ids) if uid != user_id]
+            removed = len(self.user_ids) - len(keep)
+            self.user_ids = [self.user_ids[i] for i in keep]
+            self.templates = [self.templates[i] for i in keep]
+            self.coarse = self.coarse[keep] if len(keep) else np.zeros((0, 0), dtype=np.float32)
+            self._batch = None
+        return removed
+
+    def identify(self, image, record=None, top_k=1):
+        """Cocokkan satu capture ke seluruh galeri.
+
+        Mengembalikan list (user_id, skor) di atas threshold backend, terbaik dulu.
+        """
+        with self._lock:
+            if not self.user_ids:
+                return []
+            if self._batch is None:
+                self._batch = self.backend.prepare(self.templates)
+            batch, user_ids, coarse = self._batch, self.user_ids, self.coarse
+
+        probe = self.backend.extract(image, record)
+        candidates = np.arange(len(user_ids))
+        if len(candidates) > self.max_candidates:
+            coarse_scores = coarse @ orientation_histogram(image)
+            candidates = np.argpartition(-coarse_scores, self.max_candidates)[:self.max_candidates]
+
+        scores = self.backend.score(probe, batch, candidates)
+        order = np.argsort(-scores)
+        matches = []
+        seen = set()
+        for i in order:
+            if scores[i] < self.backend.threshold or len(matches) >= top_k:
+                break
+            user_id = user_ids[candidates[i]]
+            if user_id not in seen:
+                seen.add(user_id)
+                matches.append((user_id, float(scores[i])))
+        return matches
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            lengths = np.array([len(t) for t in self.templates], dtype=np.int64)
+            blob = np.frombuffer(b"".join(self.templates), dtype=np.uint8)
+            tmp_path = path + ".tmp.npz"
+            np.savez(tmp_path, backend=np.array(self.backend.name), user_ids=np.array(self.user_ids, dtype=str),
+                     lengths=lengths, blob=blob, coarse=self.coarse)
+        # Ganti file secara atomik agar galeri tidak rusak jika proses terhenti
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        path = path or self.path
+        data = np.load(path)
+        if self.backend is None:
+            # Tanpa backend eksplisit, pakai backend yang membuat galeri
+            self.backend = create_backend(str(data['backend']))
+        if str(data['backend']) != self.backend.name:
+            raise ValueError(f"Galeri '{path}' dibuat dengan backend {data['backend']}, bukan {self.backend.name}")
+        blob = data['blob'].tobytes()
+        offsets = np.concatenate([[0], np.cumsum(data['lengths'])])
+        with self._lock:
+            self.user_ids = [str(u) for u in data['user_ids']]
+            self.templates = [blob[offsets[i]:offsets[i + 1]] for i in range(len(self.user_ids))]
+            self.coarse = data['coarse'].astype(np.float32)
+            self._batch = None
+
+
+def load_image(path):
+    import cv2
+    image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise IOError(f"Gambar '{path}' tidak dapat dibaca")
+    return image
+
+
+def load_sample(path):
+    """(image, record) dari file gambar biasa atau record ANSI 381 (mis. hasil simpan reader).
+
+    Record dikenali dari format id 'FIR'; gambarnya diambil dari view pertama dan
+    record lengkap ikut dikembalikan untuk backend dpfj. Gambar biasa: record None.
+    Record terkompresi memberi image None (hanya dapat dipakai backend dpfj).
+    """
+    with open(path, 'rb') as f:
+        record = f.read()
+    if record[:len(ansi381.FORMAT_ID)] != ansi381.FORMAT_ID:
+        return load_image(path), None
+    return ansi381.parse(record).image, record
+
+
+def benchmark(identifier, users, probes=50):
+    """Ukur latensi identifikasi pada galeri sintetis berukuran `users`."""
+    width, height = 357, 392
+    print(f"[INFO] Membuat galeri sintetis {users} pengguna...")
+    for seed in range(users):
+        identifier.enroll(f"user{seed:05d}", fingerprint.synthetic_fingerprint(width, height, seed))
+    latencies = []
+    correct = 0
+    for seed in np.linspace(0, users - 1, probes).astype(int):
+        probe = fingerprint.synthetic_fingerprint(width, height, int(seed))
+        # Geser probe beberapa piksel agar tidak identik dengan template
+        probe = np.roll(probe, (3, -2), axis=(0, 1))
+        started = time.perf_counter()
+        matches = identifier.identify(probe)
+        latencies.append(time.perf_counter() - started)
+        correct += bool(matches) and matches[0][0] == f"user{seed:05d}"
+    values = np.array(latencies) * 1000
+    print(f"[INFO] {users} pengguna: p50={np.percentile(values, 50):.2f} ms, "
+          f"p95={np.percentile(values, 95):.2f} ms, benar {correct}/{probes}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Galeri dan identifikasi sidik jari 1:N.")
+    parser.add_argument('--gallery', default=GALLERY_PATH)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=None,
+                        help=f"Default: backend galeri yang ada, atau {DEFAULT_BACKEND}")
+    sub = parser.add_subparsers(dest='command', required=True)
+    enroll = sub.add_parser('enroll', help="Daftarkan gambar sidik jari atau record ANSI 381 untuk pengguna")
+    enroll.add_argument('user_id')
+    enroll.add_argument('images', nargs='+')
+    identify = sub.add_parser('identify', help="Identifikasi satu gambar sidik jari atau record ANSI 381")
+    identify.add_argument('image')
+    remove = sub.add_parser('remove', help="Hapus semua template pengguna")
+    remove.add_argument('user_id')
+    sub.add_parser('list', help="Tampilkan pengguna terdaftar")
+    bench = sub.add_parser('bench', help="Benchmark identifikasi pada galeri sintetis (tidak disimpan)")
+    bench.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    backend = create_backend(args.backend) if args.backend else None
+    if args.command == 'bench':
+        benchmark(FingerprintIdentifier(backend, path=None), args.users)
+        return 0
+
+    identifier = FingerprintIdentifier(backend, args.gallery)
+    if args.command == 'enroll':
+        for path in args.images:
+            identifier.enroll(args.user_id, *load_sample(path))
+        identifier.save()
+        print(f"[SUCCESS] {len(args.images)} template ditambahkan untuk {args.user_id}")
+    elif args.command == 'identify':
+        image, record = load_sample(args.image)
+        matches = identifier.identify(image, record, top_k=3)
+        if not matches:
+            print("[INFO] Sidik jari tidak terdaftar")
+        for user_id, score in matches:
+            print(f"{user_id}\t{score:.4f}")
+    elif args.command == 'remove':
+        removed = identifier.remove(args.user_id)
+        identifier.save()
+        print(f"[INFO] {removed} template dihapus")
+    elif args.command == 'list':
+        for user_id in identifier.users():
+            print(f"{user_id}\t{identifier.user_ids.count(user_id)} template")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
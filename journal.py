@@ -0,0 +1,477 @@
+"""Jurnal event biner ber-buffer, pengganti print() per frame di jalur panas.
+
+Sebelumnya setiap frame mencetak beberapa baris ke stdout (posisi wajah emoji,
+alasan keputusan motor, kualitas fingerprint, "Mengirim perintah ke Arduino").
+Di konsol Windows print() sinkron dan memperlambat loop frame. Di sini event
+dikodekan ke record biner ringkas (struct) di thread pemanggil, dimasukkan ke
+deque, lalu thread writer menulis batch ke file setiap `flush_interval` detik:
+
+    journal.start("journal", prefix="mone")
+    journal.event("motor_command", "UP", "automatic")
+    journal.stop()
+
+Format file (.mjr): header `MAGIC` + (time.time(), time.perf_counter()) saat file
+dibuka, lalu record `<d H B x H` (waktu, kode event, level, panjang payload) +
+payload struct per jenis event (lihat EVENTS). File dirotasi setelah
+`max_file_bytes` dan hanya `max_files` file terbaru yang disimpan.
+
+Level minimum dan batas laju (record/detik) diatur per kategori di
+JOURNAL_CONFIG; event yang tersaring tidak dikodekan sama sekali.
+
+Ekspor dan replay offline:
+    python journal.py export journal/ --out sesi.jsonl
+    python journal.py replay journal/ --controller smooth   # ulangi keputusan motor dari deteksi
+    python journal.py bench --records 20000                 # print() vs journal.event()
+"""
+import argparse
+import collections
+import glob
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+import metrics
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+JOURNAL_CONFIG = dict(
+    enabled=True,
+    directory="journal",          # folder file jurnal
+    max_file_bytes=8 * 1024 * 1024,
+    max_files=20,                 # rotasi: file tertua dihapus
+    flush_interval=0.5,           # detik antar tulis batch
+    max_pending=16384,            # record antre maksimum; sisanya dibuang (writer tertinggal)
+    # Level minimum per kategori; DEBUG = baris emoji lama (posisi wajah, alasan keputusan)
+    levels=dict(detection=INFO, face=INFO, motor=INFO, fingerprint=INFO, log=INFO),
+    # Record per detik per kategori (None = tanpa batas); detection tidak dibatasi agar replay lengkap
+    rate_limits=dict(face=10.0, fingerprint=20.0, log=50.0),
+    echo=False,                   # juga print event ke stdout (debug di konsol)
+)
+
+MAGIC = b"MONEJRN\x01"
+_FILE_HEADER = struct.Struct("<dd")
+_RECORD = struct.Struct("<dHBxH")
+_NONE = -2 ** 31                  # int32 pengganti None
+
+MOTOR_STATES = ("STOP", "UP", "DOWN")
+FACE_SOURCES = ("face", "pose")
+DECISION_REASONS = ("face_high", "face_low", "face_center", "body_only")
+COMMAND_SOURCES = ("automatic", "manual")
+
+
+class EventType:
+    """Satu jenis event: kode, kategori, format struct payload dan teks konsol."""
+    __slots__ = ('code', 'name', 'category', 'level', 'struct', 'fields', 'enums', 'text')
+
+    def __init__(self, code, name, category, level, fmt, fields, enums=None, text=None):
+        self.code = code
+        self.name = name
+        self.category = category
+        self.level = level
+        self.struct = struct.Struct(fmt) if fmt else None
+        self.fields = fields
+        self.enums = enums or {}
+        self.text = text
+
+    def encode(self, values):
+        if self.struct is None:
+            return " ".join(str(v) for v in values).encode("utf-8")[:0xFFFF]
+        packed = []
+        for field, value in zip(self.fields, values):
+            table = self.enums.get(field)
+            if table is not None:
+                value = table.index(value)
+            elif value is None:
+                value = _NONE
+            packed.append(value)
+        return self.struct.pack(*packed)
+
+    def decode(self, payload):
+        if self.struct is None:
+            return {self.fields[0]: payload.decode("utf-8", "replace")}
+        result = {}
+        for field, value in zip(self.fields, self.struct.unpack(payload)):
+            table = self.enums.get(field)
+            if table is not None:
+                value = table[value] if value < len(table) else value
+            elif value == _NONE:
+                value = None
+            result[field] = value
+        return result
+
+    def format(self, fields):
+        if self.text:
+            return self.text.format(**fields)
+        return f"{self.name} " + " ".join(f"{k}={fields.get(k)}" for k in self.fields)
+
+
+EVENTS = {}
+_BY_CODE = {}
+
+
+def _register(*args, **kwargs):
+    event_type = EventType(*args, **kwargs)
+    EVENTS[event_type.name] = event_type
+    _BY_CODE[event_type.code] = event_type
+
+
+# Satu record per frame yang diputuskan: cukup untuk mengulang MotorController offline
+# (confirmed_faces = wajah yang ditemukan backend wajah, yang dibaca aturan motor)
+_register(1, "detection", "detection", INFO, "<qdHHiH??iB",
+          ('seq', 'captured_at', 'width', 'height', 'face_center_y', 'confirmed_faces', 'face_detected', 'body_detected',
+           'target_id', 'motor_state'),
+          enums=dict(motor_state=MOTOR_STATES))
+_register(2, "face_position", "face", DEBUG, "<Bi", ('source', 'y'), enums=dict(source=FACE_SOURCES),
+          text="[{source}] Wajah di Y: {y}")
+_register(3, "motor_decision", "motor", DEBUG, "<BB", ('state', 'reason'),
+          enums=dict(state=MOTOR_STATES, reason=DECISION_REASONS), text="{reason} → Motor {state}")
+_register(4, "motor_command", "motor", INFO, "<BB", ('state', 'source'),
+          enums=dict(state=MOTOR_STATES, source=COMMAND_SOURCES), text="📡 Perintah ke Arduino ({source}): {state}")
+_register(5, "motor_position", "motor", INFO, "<i", ('position',), text="📡 Setpoint ke Arduino: POSITION:{position}")
+_register(6, "fingerprint_quality", "fingerprint", INFO, "<I", ('quality',), text="Kualitas fingerprint: {quality}")
+_register(7, "message", "log", INFO, None, ('text',), text="{text}")
+
+
+# =============================================
+# Penulis
+# =============================================
+class JournalWriter(threading.Thread):
+    """Thread yang menulis batch record ke file dan merotasinya."""
+
+    def __init__(self, journal, directory, prefix):
+        super().__init__(name="journal", daemon=True)
+        self.journal = journal
+        self.directory = directory
+        self.prefix = prefix
+        self.stop_event = threading.Event()
+        self.file = None
+        self.path = None
+        self._index = 0
+        self._session = time.strftime("%Y%m%d-%H%M%S")
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self):
+        self._index += 1
+        self.path = os.path.join(self.directory, f"{self.prefix}-{self._session}-{self._index:03d}.mjr")
+        self.file = open(self.path, "wb")
+        self.file.write(MAGIC + _FILE_HEADER.pack(time.time(), time.perf_counter()))
+        self.journal.stats['files'] += 1
+        self._prune()
+
+    def _prune(self):
+        # Nama file = prefix-sesi-indeks, urutan nama = urutan waktu
+        files = sorted(glob.glob(os.path.join(self.directory, f"{self.prefix}-*.mjr")))
+        for path in files[:max(len(files) - self.journal.config['max_files'], 0)]:
+            if path != self.path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def flush(self):
+        pending = self.journal._pending
+        if not pending:
+            return
+        batch = []
+        while pending:
+            try:
+                batch.append(pending.popleft())
+            except IndexError:
+                break
+        data = b"".join(batch)
+        if self.file is None or self.file.tell() + len(data) > self.journal.config['max_file_bytes']:
+            if self.file is not None:
+                self.file.close()
+            self._open()
+        with metrics.span("journal_write"):
+            self.file.write(data)
+            self.file.flush()
+        self.journal.stats['bytes'] += len(data)
+
+    def run(self):
+        while not self.stop_event.wait(self.journal.config['flush_interval']):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"[ERROR] Jurnal: {e}")
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        self.join(timeout)
+
+
+class Journal:
+    """Filter level + batas laju per kategori, kodekan record, antre ke JournalWriter.
+
+    event() aman dipanggil dari thread mana pun (deque.append atomik). Sebelum
+    start() event hanya dihitung (dan dicetak jika `echo`).
+    """
+
+    def __init__(self, config=None):
+        self.config = dict(JOURNAL_CONFIG, **(config or {}))
+        self._levels = dict(self.config['levels'])
+        self._limits = dict(self.config['rate_limits'])
+        self._buckets = {}          # kategori -> [token, waktu terakhir]
+        self._pending = collections.deque()
+        self.writer = None
+        self.stats = dict(records=0, bytes=0, files=0, filtered=0, rate_limited=0, dropped=0)
+        metrics.collector(self._collect_metrics)
+
+    def start(self, directory=None, prefix="mone"):
+        if not self.config['enabled'] or self.writer is not None:
+            return None
+        self.writer = JournalWriter(self, directory or self.config['directory'], prefix)
+        self.writer.start()
+        return self.writer
+
+    def stop(self):
+        writer, self.writer = self.writer, None
+        if writer is not None:
+            writer.stop()
+
+    def set_level(self, category, level):
+        self._levels[category] = level
+
+    def enabled(self, name, level=None):
+        """True jika event `name` lolos filter level (untuk melewati persiapan nilai yang mahal)."""
+        event_type = EVENTS[name]
+        return (event_type.level if level is None else level) >= self._levels.get(event_type.category, INFO)
+
+    def _allow_rate(self, category, now):
+        rate = self._limits.get(category)
+        if rate is None:
+            return True
+        bucket = self._buckets.get(category)
+        if bucket is None:
+            bucket = self._buckets[category] = [rate, now]
+        bucket[0] = min(bucket[0] + (now - bucket[1]) * rate, rate)
+        bucket[1] = now
+        if bucket[0] < 1.0:
+            return False
+        bucket[0] -= 1.0
+        return True
+
+    def event(self, name, *values, level=None):
+        """Catat satu event; nilai posisional sesuai EVENTS[name].fields. True jika diantrekan."""
+        event_type = EVENTS[name]
+        level = event_type.level if level is None else level
+        if level < self._levels.get(event_type.category, INFO):
+            self.stats['filtered'] += 1
+            return False
+        now = time.time()
+        if not self._allow_rate(event_type.category, now):
+            self.stats['rate_limited'] += 1
+            return False
+        if self.config['echo']:
+            print(event_type.format(dict(zip(event_type.fields, values))))
+        if self.writer is None:
+            return False
+        if len(self._pending) >= self.config['max_pending']:
+            self.stats['dropped'] += 1
+            return False
+        payload = event_type.encode(values)
+        self._pending.append(_RECORD.pack(now, event_type.code, level, len(payload)) + payload)
+        self.stats['records'] += 1
+        return True
+
+    def message(self, text, level=INFO):
+        return self.event("message", text, level=level)
+
+    def _collect_metrics(self):
+        yield "journal_records_total", "counter", self.stats['records'], {}
+        yield "journal_bytes_total", "counter", self.stats['bytes'], {}
+        yield "journal_rate_limited_total", "counter", self.stats['rate_limited'], {}
+        yield "journal_dropped_total", "counter", self.stats['dropped'], {}
+
+
+JOURNAL = Journal()
+start = JOURNAL.start
+stop = JOURNAL.stop
+event = JOURNAL.event
+enabled = JOURNAL.enabled
+message = JOURNAL.message
+
+
+# =============================================
+# Pembaca: ekspor JSONL dan replay
+# =============================================
+def journal_files(paths):
+    """Daftar file .mjr dari file/folder, urut nama (prefix-sesi-indeks)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, "*.mjr")))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def read_records(path):
+    """Iterasi record satu file sebagai dict: time, event, category, level, + field event."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"'{path}' bukan file jurnal")
+    offset = len(MAGIC)
+    wall, perf = _FILE_HEADER.unpack_from(data, offset)
+    offset += _FILE_HEADER.size
+    while offset + _RECORD.size <= len(data):
+        timestamp, code, level, size = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        if offset + size > len(data):
+            break  # record terakhir terpotong (proses berhenti saat menulis)
+        payload = data[offset:offset + size]
+        offset += size
+        event_type = _BY_CODE.get(code)
+        if event_type is None:
+            continue
+        record = dict(time=timestamp, event=event_type.name, category=event_type.category,
+                      level=LEVEL_NAMES.get(level, level))
+        record.update(event_type.decode(payload))
+        if 'captured_at' in record:
+            # perf_counter proses penulis -> waktu dinding
+            record['captured_time'] = wall + record['captured_at'] - perf
+        yield record
+
+
+def iter_records(paths):
+    for path in journal_files(paths):
+        yield from read_records(path)
+
+
+def export_jsonl(paths, out):
+    count = 0
+    for record in iter_records(paths):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def detection_analysis(record):
+    """Analisis minimal dari record deteksi (field yang dibaca MotorController / decide_motor_state)."""
+    return {
+        'frame_size': (record['width'], record['height']),
+        'face_center_y': record['face_center_y'],
+        'face_detected': record['face_detected'],
+        'body_detected': record['body_detected'],
+        'face_log': [{'confirmed': True}] * record['confirmed_faces'],
+        'target_id': record['target_id'],
+    }
+
+
+def replay(paths, controller=None, on_record=None):
+    """Putar ulang deteksi dan perintah motor satu sesi.
+
+    `controller`: None = hanya ringkasan; "smooth" / "legacy" = keputusan motor
+    diulang dari record deteksi dan dibandingkan dengan keputusan yang tercatat.
+    """
+    decide = None
+    if controller == "smooth":
+        from motor_control import MotorController
+        decide = MotorController().update
+    elif controller == "legacy":
+        import vision
+        decide = lambda analysis, now: vision.decide_motor_state(analysis)
+    report = dict(records=0, detections=0, face_frames=0, body_frames=0, commands=[], decided=0, mismatches=0,
+                  first=None, last=None)
+    for record in iter_records(paths):
+        report['records'] += 1
+        report['first'] = record['time'] if report['first'] is None else report['first']
+        report['last'] = record['time']
+        if on_record is not None:
+            on_record(record)
+        if record['event'] == "detection":
+            report['detections'] += 1
+            report['face_frames'] += record['face_detected']
+            report['body_frames'] += record['body_detected']
+            if decide is not None:
+                state = decide(detection_analysis(record), record['captured_at'])
+                report['decided'] += 1
+                report['mismatches'] += state != record['motor_state']
+        elif record['event'] == "motor_command":
+            report['commands'].append((record['time'], record['state'], record['source']))
+    return report
+
+
+def bench(records):
+    """Biaya per event di thread pemanggil: print() baris emoji lama vs journal.event()."""
+    import tempfile
+    samples = {}
+    started = time.perf_counter()
+    for i in range(records):
+        print(f"🟢 Wajah terdeteksi di Y: {i % 1080}")
+        print("⬆️ Wajah terlalu atas → Motor naik")
+    samples['print'] = (time.perf_counter() - started) / records
+    with tempfile.TemporaryDirectory() as directory:
+        journal = Journal(dict(levels=dict(face=DEBUG, motor=DEBUG), rate_limits={}, max_pending=records * 2 + 1))
+        journal.start(directory, prefix="bench")
+        started = time.perf_counter()
+        for i in range(records):
+            journal.event("face_position", "face", i % 1080)
+            journal.event("motor_decision", "UP", "face_high")
+        samples['journal'] = (time.perf_counter() - started) / records
+        journal.stop()
+        samples['bytes_per_frame'] = journal.stats['bytes'] / records
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor / replay jurnal event biner (.mjr).")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help="Tulis semua record ke JSONL")
+    export.add_argument('paths', nargs='+', help="File .mjr atau folder jurnal")
+    export.add_argument('--out', help="File JSONL (default stdout)")
+    play = sub.add_parser('replay', help="Ringkasan deteksi dan perintah motor satu sesi")
+    play.add_argument('paths', nargs='+', help="File .mjr atau folder jurnal")
+    play.add_argument('--controller', choices=['smooth', 'legacy'], help="Ulangi keputusan motor dari deteksi")
+    play.add_argument('--print', action='store_true', help="Cetak setiap record seperti log konsol lama")
+    timing = sub.add_parser('bench', help="Bandingkan biaya print() dan journal.event()")
+    timing.add_argument('--records', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as out:
+                count = export_jsonl(args.paths, out)
+            print(f"[INFO] {count} record ditulis ke {args.out}")
+        else:
+            export_jsonl(args.paths, sys.stdout)
+        return 0
+
+    if args.command == 'bench':
+        samples = bench(args.records)
+        print(f"\n[INFO] print(): {samples['print'] * 1e6:.1f} µs/frame, journal.event(): "
+              f"{samples['journal'] * 1e6:.1f} µs/frame, {samples['bytes_per_frame']:.0f} byte/frame",
+              file=sys.stderr)
+        return 0
+
+    def show(record):
+        event_type = EVENTS[record['event']]
+        stamp = time.strftime("%H:%M:%S", time.localtime(record['time'])) + f".{int(record['time'] * 1000) % 1000:03d}"
+        print(f"{stamp} [{record['level']}] {event_type.format(record)}")
+
+    report = replay(args.paths, args.controller, show if args.print else None)
+    if not report['records']:
+        print("[ERROR] Tidak ada record jurnal")
+        return 1
+    duration = report['last'] - report['first']
+    detections = max(report['detections'], 1)
+    print(f"[INFO] {report['records']} record dalam {duration:.1f} s, {report['detections']} frame deteksi "
+          f"(wajah {report['face_frames'] / detections * 100:.0f}%, badan {report['body_frames'] / detections * 100:.0f}%)")
+    for timestamp, state, source in report['commands']:
+        print(f"  +{timestamp - report['first']:8.2f} s  {state:<5} ({source})")
+    if report['decided']:
+        print(f"[INFO] Keputusan ulang ({args.controller}): {report['mismatches']} dari {report['decided']} "
+              f"frame berbeda dengan yang tercatat")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Liveness (anti-spoofing) sesuai kebutuhan, dengan cache per wajah yang dilacak.
+
+Sebelumnya DeepFace.extract_faces dipanggil dengan anti_spoofing=True di setiap
+frame, sehingga jaringan anti-spoofing berjalan untuk setiap wajah 20-30x per
+detik padahal `face['is_real']` tidak pernah dipakai. Sekarang liveness adalah
+tahap tersendiri yang hanya berjalan saat sebuah keputusan membutuhkannya:
+
+- wajah baru masuk ke detection_area (`observe`, dipanggil tahap inferensi);
+- verifikasi akan diberikan, mis. sidik jari cocok (`verify`).
+
+Hasil disimpan per wajah yang dilacak (asosiasi box antar frame dengan IoU)
+selama `ttl` detik, dan dibatalkan jika tampilan wajah berubah banyak (jarak
+korelasi thumbnail 16x16 grayscale) sehingga orang lain yang masuk ke posisi
+yang sama tidak mewarisi hasil sebelumnya.
+
+Biaya per keputusan tercatat di metrics (tahap "liveness") dan rasio cache hit
+di `report()` / counter mone_liveness_*.
+"""
+import itertools
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+import vision
+
+LIVENESS_CONFIG = dict(
+    enabled=True,
+    ttl=10.0,                  # detik hasil liveness dianggap masih berlaku untuk wajah yang sama
+    iou_match=0.3,             # IoU minimal box frame ini dengan box track sebelumnya
+    track_timeout=1.0,         # track tanpa wajah cocok selama ini dihapus
+    appearance_change=0.5,     # 1 - korelasi thumbnail; di atas ini cache dibatalkan
+    crop_margin=0.2,           # margin crop wajah untuk model anti-spoofing (relatif ke box)
+    require_face=False,        # True: verifikasi ditolak jika tidak ada wajah di kamera
+)
+
+_SIGNATURE_SIZE = (16, 16)
+
+
+def deepface_liveness(crop):
+    """Jalankan model anti-spoofing DeepFace pada crop wajah; (is_real, skor)."""
+    deepface = vision.registry.get('deepface')
+    with vision.deepface_lock:
+        faces = deepface.extract_faces(img_path=crop, detector_backend='skip', enforce_detection=False,
+                                       anti_spoofing=True)
+    if not faces:
+        return None, 0.0
+    return bool(faces[0].get('is_real')), float(faces[0].get('antispoof_score', 0.0))
+
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = min(ax + aw, bx + bw) - max(ax, bx)
+    h = min(ay + ah, by + bh) - max(ay, by)
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+def crop_face(frame, box, margin):
+    x, y, w, h = box
+    frame_h, frame_w = frame.shape[:2]
+    dx, dy = int(w * margin), int(h * margin)
+    x1, y1 = max(int(x) - dx, 0), max(int(y) - dy, 0)
+    x2, y2 = min(int(x + w) + dx, frame_w), min(int(y + h) + dy, frame_h)
+    if x2 - x1 < 8 or y2 - y1 < 8:
+        return None
+    return frame[y1:y2, x1:x2]
+
+
+def appearance_signature(crop):
+    """Thumbnail grayscale 16x16 ternormalisasi (mean 0, norm 1) untuk deteksi perubahan wajah."""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    small = cv2.resize(gray, _SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    small -= small.mean()
+    norm = np.linalg.norm(small)
+    return small / norm if norm > 1e-6 else small
+
+
+class FaceTrack:
+    __slots__ = ('id', 'box', 'last_seen', 'signature', 'is_real', 'score', 'checked_at')
+
+    def __init__(self, track_id, box, now):
+        self.id = track_id
+        self.box = box
+        self.last_seen = now
+        self.signature = None
+        self.is_real = None
+        self.score = 0.0
+        self.checked_at = None
+
+
+class LivenessChecker:
+    """Cache liveness per wajah; `check(crop)` -> (is_real, skor), default model DeepFace.
+
+    `observe()` dipanggil dari thread inferensi, `verify()` dari thread GUI/worker
+    fingerprint; keduanya diserialkan dengan lock.
+    """
+
+    def __init__(self, check=deepface_liveness, config=None):
+        self.check = check
+        self.config = dict(LIVENESS_CONFIG, **(config or {}))
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self._frame = None
+        self._target_id = None
+        self._lock = threading.Lock()
+        self.stats = dict(checks=0, hits=0, misses=0, expired=0, invalidated=0, new_faces=0)
+        metrics.collector(self._collect_metrics)
+
+    def _associate(self, face_log, now):
+        """Pasangkan tiap box face_log ke track: lewat face['track_id'] (face_tracks.FaceTracks)
+        jika ada, selain itu ke track dengan IoU terbesar; box sisa jadi track baru."""
+        matched = []
+        free = list(self.tracks)
+        for face in face_log:
+            box = face['bounding_box']
+            best, best_iou = None, self.config['iou_match']
+            if 'track_id' in face:
+                best = next((t for t in free if t.id == face['track_id']), None)
+            else:
+                for track in free:
+                    iou = box_iou(box, track.box)
+                    if iou >= best_iou:
+                        best, best_iou = track, iou
+            if best is None:
+                best = FaceTrack(face.get('track_id') or next(self._ids), box, now)
+                self.tracks.append(best)
+                self.stats['new_faces'] += 1
+            else:
+                free.remove(best)
+            best.box = box
+            best.last_seen = now
+            matched.append((face, best))
+        timeout = self.config['track_timeout']
+        self.tracks = [t for t in self.tracks if now - t.last_seen <= timeout]
+        return matched
+
+    def _fresh(self, track, face, now):
+        """True jika hasil cache track masih berlaku untuk crop wajah ini."""
+        if track.checked_at is None:
+            return False
+        if now - track.checked_at > self.config['ttl']:
+            self.stats['expired'] += 1
+            return False
+        distance = 1.0 - float(np.dot(track.signature, appearance_signature(face)))
+        if distance > self.config['appearance_change']:
+            self.stats['invalidated'] += 1
+            return False
+        return True
+
+    def _decide(self, track, frame, now):
+        # Signature dari box wajah saja (tanpa margin) agar latar belakang tidak mendominasi
+        face = crop_face(frame, track.box, 0.0)
+        if face is None:
+            return track.is_real
+        if self._fresh(track, face, now):
+            self.stats['hits'] += 1
+            return track.is_real
+        self.stats['misses'] += 1
+        crop = crop_face(frame, track.box, self.config['crop_margin'])
+        with metrics.span("liveness"):
+            is_real, score = self.check(crop)
+        track.is_real, track.score, track.checked_at = is_real, score, now
+        track.signature = appearance_signature(face)
+        self.stats['checks'] += 1
+        return is_real
+
+    def observe(self, frame, face_log, now=None):
+        """Perbarui track dari face_log frame ini; wajah baru langsung dicek.
+
+        Menambahkan face['track_id'] dan face['is_real'] (None = belum dicek) ke face_log.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._frame = frame
+            self._target_id = next((f['track_id'] for f in face_log if f.get('target')), None)
+            for face, track in self._associate(face_log, now):
+                if track.checked_at is None:
+                    self._decide(track, frame, now)
+                face['track_id'] = track.id
+                face['is_real'] = track.is_real
+
+    def verify(self, frame=None, now=None):
+        """Liveness wajah target/terbesar sebelum verifikasi diberikan.
+
+        Memakai cache jika masih berlaku, jika tidak model dijalankan pada `frame`
+        (default: frame terakhir dari observe). Mengembalikan True/False, atau
+        None jika tidak ada wajah yang dilacak.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            frame = self._frame if frame is None else frame
+            live = [t for t in self.tracks if now - t.last_seen <= self.config['track_timeout']]
+            if frame is None or not live:
+                return None
+            # Target motor (face_tracks) jika ada, selain itu wajah terbesar
+            track = next((t for t in live if t.id == self._target_id), None)
+            if track is None:
+                track = max(live, key=lambda t: t.box[2] * t.box[3])
+            return self._decide(track, frame, now)
+
+    def allow(self, frame=None, now=None):
+        """Keputusan akhir untuk memberi verifikasi (sesuai `require_face`)."""
+        result = self.verify(frame, now)
+        if result is None:
+            return not self.config['require_face']
+        return bool(result)
+
+    def report(self):
+        """Jumlah cek model, rasio cache hit dan biaya per keputusan (ms)."""
+        report = dict(self.stats)
+        decisions = self.stats['hits'] + self.stats['misses']
+        report['hit_rate'] = self.stats['hits'] / decisions if decisions else 0.0
+        values = metrics.REGISTRY.stage("liveness").percentiles()
+        if values is not None:
+            report['cost_p50_ms'] = float(values[0] * 1000.0)
+            report['cost_p95_ms'] = float(values[1] * 1000.0)
+        return report
+
+    def close(self):
+        metrics.REGISTRY.remove_collector(self._collect_metrics)
+
+    def _collect_metrics(self):
+        yield "liveness_checks_total", "counter", self.stats['checks'], {}
+        yield "liveness_cache_hits_total", "counter", self.stats['hits'], {}
+        yield "liveness_cache_misses_total", "counter", self.stats['misses'], {}
@@ -0,0 +1,221 @@
+"""Instrumentasi performa per tahap dan endpoint metrics lokal (format Prometheus).
+
+Setiap tahap dicatat sebagai span bernama (capture, tiap model, postprocess,
+motor_decision, serial_write, fingerprint_poll, render, qt_paint, ...):
+
+    with metrics.span("capture"):
+        ret, frame = camera.read()
+    metrics.observe("deepface", seconds)      # durasi yang sudah diukur di tempat lain
+    metrics.count("serial_commands")
+
+Histogram tidak memakai lock: observe() hanya menambah int/float dan menulis satu
+slot list (ring buffer sampel terakhir untuk persentil overlay). Jika dua thread
+menulis tahap yang sama bersamaan, paling buruk satu hitungan hilang; tiap tahap
+di aplikasi ini hanya ditulis oleh satu thread. Biaya satu span sekitar 1 µs.
+
+Endpoint: http://127.0.0.1:9108/metrics (lihat METRICS_CONFIG), contoh:
+    curl -s http://127.0.0.1:9108/metrics | grep mone_stage_seconds_count
+"""
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+METRICS_CONFIG = dict(
+    enabled=True,
+    host="127.0.0.1",   # hanya lokal; ganti "0.0.0.0" agar bisa di-scrape dari jaringan
+    port=9108,
+    window=1024,        # sampel terakhir per tahap untuk persentil overlay
+)
+
+# Batas bucket histogram (detik), dari operasi serial sub-milidetik sampai DeepFace
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+PREFIX = "mone"
+
+
+class Histogram:
+    """Histogram bucket kumulatif + ring buffer sampel terakhir (tanpa lock)."""
+    __slots__ = ('name', 'buckets', 'counts', 'total', 'count', 'samples', '_size')
+
+    def __init__(self, name, buckets=STAGE_BUCKETS, window=1024):
+        self.name = name
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._size = window
+        self.samples = [0.0] * window
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.samples[self.count % self._size] = seconds
+        self.total += seconds
+        self.count += 1
+
+    def percentiles(self, q=(50, 95)):
+        n = min(self.count, self._size)
+        if not n:
+            return None
+        return np.percentile(np.asarray(self.samples[:n]), q)
+
+
+class Span:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self, window=1024):
+        self.window = window
+        self.stages = {}
+        self.counters = {}
+        self._collectors = []
+        self._lock = threading.Lock()  # hanya untuk mendaftarkan tahap/collector baru
+
+    def stage(self, name):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(name, Histogram(name, window=self.window))
+        return histogram
+
+    def span(self, name):
+        return Span(self.stage(name))
+
+    def observe(self, name, seconds):
+        self.stage(name).observe(seconds)
+
+    def observe_all(self, timings):
+        """Catat dict {tahap: detik}, mis. analysis['timings'] dari vision."""
+        for name, seconds in timings.items():
+            self.stage(name).observe(seconds)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def collector(self, collect):
+        """`collect()` dipanggil saat scrape; kembalikan iterable (nama, tipe, nilai, labels)."""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def remove_collector(self, collect):
+        with self._lock:
+            if collect in self._collectors:
+                self._collectors.remove(collect)
+
+    def summary(self):
+        """{tahap: (p50_ms, p95_ms, jumlah)} untuk overlay."""
+        result = {}
+        for name, histogram in list(self.stages.items()):
+            values = histogram.percentiles()
+            if values is not None:
+                result[name] = (values[0] * 1000.0, values[1] * 1000.0, histogram.count)
+        return result
+
+    def render_prometheus(self):
+        lines = [f"# HELP {PREFIX}_stage_seconds Durasi tiap tahap pipeline",
+                 f"# TYPE {PREFIX}_stage_seconds histogram"]
+        for name, h in sorted(self.stages.items()):
+            cumulative = 0
+            for bound, count in zip(h.buckets, h.counts):
+                cumulative += count
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{name}"}} {h.total:.6f}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{name}"}} {h.count}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        seen = set()
+        for collect in list(self._collectors):
+            try:
+                samples = list(collect())
+            except Exception as e:
+                lines.append(f"# collector error: {e}")
+                continue
+            for name, kind, value, labels in samples:
+                metric = f"{PREFIX}_{name}"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} {kind}")
+                    seen.add(metric)
+                label_text = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+                lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry(METRICS_CONFIG['window'])
+span = REGISTRY.span
+observe = REGISTRY.observe
+observe_all = REGISTRY.observe_all
+count = REGISTRY.count
+collector = REGISTRY.collector
+
+
+def overlay_text(registry=REGISTRY, stages=None):
+    """Teks multi-baris "tahap p50/p95 ms" untuk overlay di layar."""
+    summary = registry.summary()
+    names = stages or sorted(summary, key=lambda name: -summary[name][0])
+    lines = [f"{name:<16}{summary[name][0]:7.1f}{summary[name][1]:7.1f}" for name in names if name in summary]
+    return "\n".join([f"{'tahap':<16}{'p50':>7}{'p95':>7} ms"] + lines)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrape berkala tidak perlu dicetak
+
+
+class MetricsServer:
+    """HTTP /metrics di thread daemon."""
+
+    def __init__(self, registry=REGISTRY, host=METRICS_CONFIG['host'], port=METRICS_CONFIG['port']):
+        handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.address = self.httpd.server_address
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_server(registry=REGISTRY):
+    """Mulai endpoint sesuai METRICS_CONFIG; None jika dinonaktifkan atau port terpakai."""
+    if not METRICS_CONFIG['enabled']:
+        return None
+    try:
+        server = MetricsServer(registry, METRICS_CONFIG['host'], METRICS_CONFIG['port']).start()
+    except OSError as e:
+        print(f"[ERROR] Endpoint metrics tidak dapat dibuka di port {METRICS_CONFIG['port']}: {e}")
+        return None
+    print(f"[INFO] Metrics: http://{server.address[0]}:{server.address[1]}/metrics")
+    return server
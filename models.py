@@ -0,0 +1,105 @@
+import threading
+import time
+
+
+class StartupTimer:
+    """Catat durasi tiap langkah startup untuk laporan waktu muat aplikasi."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self._lock = threading.Lock()
+        self.steps = []
+
+    def mark(self, name):
+        with self._lock:
+            now = time.perf_counter()
+            self.steps.append((name, now - self._last))
+            self._last = now
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.steps.append((name, seconds))
+
+    def report(self):
+        lines = ["[INFO] Laporan waktu startup:"]
+        with self._lock:
+            for name, seconds in self.steps:
+                lines.append(f"    {name:<32}{seconds * 1000:>9.0f} ms")
+        lines.append(f"    {'total sejak start':<32}{(time.perf_counter() - self.started) * 1000:>9.0f} ms")
+        return "\n".join(lines)
+
+
+startup_timer = StartupTimer()
+
+
+class ModelRegistry:
+    """Registry model yang dibangun saat pertama dipakai atau oleh warm-up di background.
+
+    Setiap model punya lock sendiri: `get()` dari thread inferensi menunggu jika
+    model yang sama sedang dibangun/di-warm-up, sehingga model tidak pernah dipakai
+    bersamaan oleh dua thread selama warm-up.
+    """
+
+    def __init__(self, timer=None):
+        self._builders = {}
+        self._warmups = {}
+        self._models = {}
+        self._locks = {}
+        self.timer = timer
+        self.ready = threading.Event()
+        self.warmup_thread = None
+
+    def register(self, name, builder, warmup=None):
+        self._builders[name] = builder
+        self._locks[name] = threading.Lock()
+        if warmup is not None:
+            self._warmups[name] = warmup
+
+    def is_built(self, name):
+        return name in self._models
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is None:
+            with self._locks[name]:
+                model = self._build(name, warm=False)
+        return model
+
+    def _build(self, name, warm):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        started = time.perf_counter()
+        model = self._builders[name]()
+        if self.timer is not None:
+            self.timer.add(f"build {name}", time.perf_counter() - started)
+        warmup = self._warmups.get(name)
+        if warm and warmup is not None:
+            started = time.perf_counter()
+            warmup(model)
+            if self.timer is not None:
+                self.timer.add(f"warm-up {name}", time.perf_counter() - started)
+        # Model baru terlihat oleh thread lain setelah warm-up selesai
+        self._models[name] = model
+        return model
+
+    def warm_up(self, names, background=True, on_done=None):
+        """Bangun model `names` dan jalankan satu inferensi dummy untuk masing-masing."""
+        def run():
+            for name in names:
+                try:
+                    with self._locks[name]:
+                        self._build(name, warm=True)
+                except Exception as e:
+                    print(f"[ERROR] Warm-up model {name} gagal: {e}")
+            self.ready.set()
+            if on_done is not None:
+                on_done()
+
+        if not background:
+            run()
+            return None
+        self.warmup_thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        self.warmup_thread.start()
+        return self.warmup_thread
@@ -0,0 +1,197 @@
+"""Gerbang gerak di depan detektor: station kosong -> mode idle dengan polling jarang.
+
+Station lebih sering kosong, tetapi setiap frame tetap menjalankan semua model.
+MotionGate membandingkan frame (diperkecil ke lebar `width`, grayscale) dengan
+background rata-rata berjalan (cv2.accumulateWeighted); biayanya ~0.3 ms per frame (termasuk resize dari 1080p).
+
+- active : semua frame diinferensi. Jika tidak ada gerakan dan tidak ada
+           wajah/badan selama `idle_after` detik -> idle.
+- idle   : inferensi hanya setiap `idle_interval` detik (poll pengaman untuk
+           orang yang datang sangat pelan). Gerakan langsung membangunkan gate
+           pada frame yang sama, sehingga frame pemicu sudah diinferensi.
+
+Worker fingerprint memakai jadwal yang sama (`fingerprint_idle_interval`).
+Laporan (`report()`): CPU proses per detik di tiap mode, latensi bangun
+(frame gerakan -> hasil inferensi), dan "missed arrivals": kedatangan orang yang
+ditemukan oleh poll idle / sentuhan fingerprint saat idle, bukan oleh gerakan.
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+
+MOTION_GATE_CONFIG = dict(
+    enabled=True,
+    width=160,                  # lebar frame untuk differencing
+    threshold=20,               # selisih grayscale minimum per piksel
+    motion_fraction=0.003,      # fraksi piksel berubah yang dianggap gerakan
+    background_alpha=0.05,      # laju adaptasi background (perubahan cahaya pelan)
+    idle_after=5.0,             # detik tanpa gerakan dan tanpa orang sebelum idle
+    idle_interval=0.5,          # detik antar inferensi saat idle
+    fingerprint_idle_interval=0.5,  # detik antar poll fingerprint saat idle
+)
+
+
+def presence(analysis):
+    """True jika hasil analisis menunjukkan ada orang di depan kamera."""
+    return bool(analysis['face_detected'] or analysis['body_detected'] or analysis['face_log'])
+
+
+class MotionGate:
+    """Putuskan per frame apakah inferensi dijalankan; juga jadwal poll fingerprint.
+
+    `check()` dan `observe()` dipanggil dari thread inferensi; `idle` dan
+    `wait_active()` boleh dipanggil dari thread lain.
+    """
+
+    def __init__(self, config=None, clock=time.perf_counter):
+        self.config = dict(MOTION_GATE_CONFIG, **(config or {}))
+        self.clock = clock
+        self.idle = False
+        self._active = threading.Condition()  # dinotifikasi saat gate aktif lagi atau interrupt()
+        self._background = None
+        self._size = None
+        now = clock()
+        self.last_motion = now
+        self.last_presence = now
+        self._last_poll = now
+        self._polling = False
+        self._wake_at = None
+        self._present = False
+        self._cpu = {True: [0.0, 0.0], False: [0.0, 0.0]}  # idle -> [cpu detik, wall detik]
+        self._cpu_mark = (time.process_time(), now)
+        self.wake_latencies = []
+        self.stats = dict(frames=0, gated=0, idle_polls=0, wakeups=0, arrivals=0, missed_arrivals=0)
+        metrics.collector(self._collect_metrics)
+
+    def _account(self, now):
+        cpu, wall = time.process_time(), now
+        bucket = self._cpu[self.idle]
+        bucket[0] += cpu - self._cpu_mark[0]
+        bucket[1] += max(wall - self._cpu_mark[1], 0.0)
+        self._cpu_mark = (cpu, wall)
+
+    def _set_idle(self, idle, now):
+        self._account(now)
+        with self._active:
+            self.idle = idle
+            if not idle:
+                self._active.notify_all()
+
+    def motion(self, frame):
+        """True jika frame berbeda cukup banyak dari background."""
+        height, width = frame.shape[:2]
+        if self._size is None:
+            scale = self.config['width'] / width
+            self._size = (self.config['width'], max(int(height * scale), 1))
+        # INTER_AREA langsung dari 1080p ke 160 px ~3.5 ms; sampling nearest ke 2x ukuran lalu
+        # INTER_AREA tepat 2x (jalur cepat) ~0.1 ms dengan peredaman noise yang hampir sama
+        double = (self._size[0] * 2, self._size[1] * 2)
+        small = cv2.resize(cv2.resize(frame, double, interpolation=cv2.INTER_NEAREST), self._size,
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        if self._background is None:
+            self._background = gray.astype(np.float32)
+            return True
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        changed = cv2.countNonZero(cv2.threshold(diff, self.config['threshold'], 255, cv2.THRESH_BINARY)[1])
+        cv2.accumulateWeighted(gray, self._background, self.config['background_alpha'])
+        return changed > self.config['motion_fraction'] * gray.size
+
+    def check(self, frame, now=None):
+        """True jika frame ini perlu diinferensi."""
+        now = self.clock() if now is None else now
+        self.stats['frames'] += 1
+        with metrics.span("motion_gate"):
+            moving = self.motion(frame)
+        self._polling = False
+        if moving:
+            self.last_motion = now
+            if self.idle:
+                self._set_idle(False, now)
+                self.stats['wakeups'] += 1
+                self._wake_at = now
+            return True
+        if not self.idle:
+            if now - max(self.last_motion, self.last_presence) > self.config['idle_after']:
+                self._set_idle(True, now)
+                self._last_poll = now
+            return True
+        if now - self._last_poll >= self.config['idle_interval']:
+            self._last_poll = now
+            self._polling = True
+            self.stats['idle_polls'] += 1
+            return True
+        self.stats['gated'] += 1
+        return False
+
+    def observe(self, analysis, now=None):
+        """Umpan balik hasil inferensi frame yang lolos gate."""
+        now = self.clock() if now is None else now
+        present = presence(analysis)
+        if self._wake_at is not None:
+            self.wake_latencies.append(now - self._wake_at)
+            metrics.observe("motion_wake", now - self._wake_at)
+            self._wake_at = None
+        if present:
+            self.last_presence = now
+            if not self._present:
+                self.stats['arrivals'] += 1
+                if self._polling:
+                    # Orang ditemukan oleh poll idle, gerakan tidak membangunkan gate
+                    self.stats['missed_arrivals'] += 1
+            if self.idle:
+                self._set_idle(False, now)
+        self._present = present
+
+    def note_fingerprint(self):
+        """Jari menempel saat gate idle: dihitung missed arrival dan gate dibangunkan."""
+        if self.idle:
+            self.stats['missed_arrivals'] += 1
+            now = self.clock()
+            self.last_presence = now
+            self._set_idle(False, now)
+
+    def wait_active(self, timeout, stop_event=None):
+        """Tunggu sampai gate aktif lagi, `stop_event` diset (lihat interrupt()) atau timeout.
+
+        Untuk worker fingerprint; True jika gate aktif.
+        """
+        with self._active:
+            self._active.wait_for(lambda: not self.idle or (stop_event is not None and stop_event.is_set()),
+                                  timeout)
+            return not self.idle
+
+    def interrupt(self):
+        """Bangunkan semua wait_active() agar memeriksa stop_event-nya."""
+        with self._active:
+            self._active.notify_all()
+
+    def report(self):
+        self._account(self.clock())
+        report = dict(self.stats)
+        report['idle'] = self.idle
+        frames = self.stats['frames']
+        report['gated_fraction'] = self.stats['gated'] / frames if frames else 0.0
+        for idle, name in ((True, 'idle'), (False, 'active')):
+            cpu, wall = self._cpu[idle]
+            report[f'{name}_seconds'] = wall
+            if wall > 0:
+                report[f'{name}_cpu_percent'] = cpu / wall * 100.0
+        if self.wake_latencies:
+            values = np.asarray(self.wake_latencies) * 1000.0
+            report['wake_p50_ms'] = float(np.percentile(values, 50))
+            report['wake_max_ms'] = float(values.max())
+        return report
+
+    def close(self):
+        metrics.REGISTRY.remove_collector(self._collect_metrics)
+
+    def _collect_metrics(self):
+        yield "motion_gate_idle", "gauge", int(self.idle), {}
+        yield "motion_gated_frames_total", "counter", self.stats['gated'], {}
+        yield "motion_wakeups_total", "counter", self.stats['wakeups'], {}
+        yield "motion_missed_arrivals_total", "counter", self.stats['missed_arrivals'], {}
@@ -0,0 +1,197 @@
+"""Controller motor mode Automatic: posisi wajah difilter, hysteresis, dead-time.
+
+Logika lama (vision.decide_motor_state) membandingkan face_center_y mentah dengan
+frame_height // 3 dan angka 320 setiap frame, sehingga jitter detektor di dekat
+batas membuat motor bolak-balik UP/STOP/DOWN. MotorController:
+
+- memfilter posisi wajah (Kalman kecepatan-konstan atau EMA) dalam satuan
+  relatif tinggi frame, dan tetap memprediksi selama wajah hilang sebentar;
+- memakai pita hysteresis: motor mulai bergerak saat wajah melewati batas lama
+  (1/3 dan 2/3 tinggi frame), dan baru berhenti setelah wajah masuk
+  `hysteresis` lebih dalam ke pita tengah;
+- menahan gerakan baru selama `dead_time` detik setelah perubahan perintah
+  (STOP selalu langsung dikirim);
+- opsional mengeluarkan setpoint POSITION proporsional terhadap error.
+"""
+import time
+
+import numpy as np
+
+from face_tracks import confirmed_faces
+
+CONTROLLER_CONFIG = dict(
+    enabled=True,
+    filter="kalman",         # "kalman" atau "ema"
+    ema_alpha=0.35,          # bobot pengukuran baru untuk filter EMA
+    process_noise=4.0,       # Kalman: noise percepatan (tinggi frame / s^2)
+    measurement_noise=0.03,  # Kalman: deviasi standar pengukuran (tinggi frame)
+    up_line=1 / 3,           # wajah di atas garis ini -> UP (frame_height // 3 lama)
+    down_line=2 / 3,         # wajah di bawah garis ini -> DOWN
+    confirm_px=320,          # wajah di atas y ini (piksel, seperti logika lama) tanpa wajah terkonfirmasi backend -> UP
+    hysteresis=0.05,         # berhenti setelah wajah masuk sejauh ini ke pita tengah
+    dead_time=0.4,           # detik tanpa gerakan baru setelah perubahan perintah
+    hold_time=0.3,           # detik estimasi dipertahankan saat wajah hilang
+    position_output=False,   # kirim POSITION:<n> proporsional terhadap error
+    position_gain=6000,      # langkah posisi per satuan error (tinggi frame)
+    position_range=(0, 10000),
+    position_step=100,       # setpoint dibulatkan ke kelipatan ini
+)
+
+
+class ScalarKalman:
+    """Filter Kalman 1D model kecepatan-konstan (posisi, kecepatan)."""
+
+    def __init__(self, process_noise, measurement_noise):
+        self.q = process_noise
+        self.r = measurement_noise ** 2
+        self.x = None
+        self.p = None
+
+    def reset(self):
+        self.x = None
+
+    def predict(self, dt):
+        if self.x is None:
+            return None
+        f = np.array([[1.0, dt], [0.0, 1.0]])
+        # Noise percepatan putih diskret
+        g = np.array([0.5 * dt * dt, dt])
+        self.x = f @ self.x
+        self.p = f @ self.p @ f.T + self.q * np.outer(g, g)
+        return float(self.x[0])
+
+    def update(self, z, dt):
+        if self.x is None:
+            self.x = np.array([z, 0.0])
+            self.p = np.diag([self.r, 1.0])
+            return z
+        self.predict(dt)
+        innovation = z - self.x[0]
+        s = self.p[0, 0] + self.r
+        k = self.p[:, 0] / s
+        self.x = self.x + k * innovation
+        self.p = self.p - np.outer(k, self.p[0])
+        return float(self.x[0])
+
+
+class Ema:
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.x = None
+
+    def reset(self):
+        self.x = None
+
+    def predict(self, dt):
+        return self.x
+
+    def update(self, z, dt):
+        self.x = z if self.x is None else self.x + self.alpha * (z - self.x)
+        return self.x
+
+
+class MotorController:
+    """Ubah hasil analisis per frame menjadi perintah motor yang stabil.
+
+    `update(analysis, now)` mengembalikan "UP" / "DOWN" / "STOP". Jika
+    `position_output` aktif, setpoint baru tersedia lewat `take_position()`.
+    """
+
+    def __init__(self, config=None, clock=time.perf_counter):
+        self.config = dict(CONTROLLER_CONFIG, **(config or {}))
+        self.clock = clock
+        if self.config['filter'] == "ema":
+            self.filter = Ema(self.config['ema_alpha'])
+        else:
+            self.filter = ScalarKalman(self.config['process_noise'], self.config['measurement_noise'])
+        self.state = "STOP"
+        self.estimate = None  # posisi wajah terfilter (relatif tinggi frame)
+        self.position = None  # setpoint POSITION terakhir
+        self._pending_position = None
+        self._last_update = None
+        self._last_seen = None
+        self._last_change = float('-inf')
+        self.stats = dict(updates=0, changes=0, held=0)
+
+    def reset(self):
+        self.filter.reset()
+        self.estimate = None
+        self.state = "STOP"
+        self._last_update = self._last_seen = None
+
+    def update(self, analysis, now=None):
+        now = self.clock() if now is None else now
+        dt = 0.0 if self._last_update is None else max(now - self._last_update, 1e-3)
+        self._last_update = now
+        self.stats['updates'] += 1
+
+        height = analysis['frame_size'][1]
+        face_y = analysis['face_center_y']
+        if face_y is not None:
+            self.estimate = self.filter.update(face_y / height, dt)
+            self._last_seen = now
+        elif self._last_seen is not None and now - self._last_seen <= self.config['hold_time']:
+            # Wajah hilang sebentar (jitter detektor): pakai prediksi filter
+            self.estimate = self.filter.predict(dt)
+        else:
+            self.filter.reset()
+            self.estimate = None
+            self._last_seen = None
+
+        desired = self._desired_state(analysis)
+        return self._apply(desired, now)
+
+    def take_position(self):
+        """Setpoint POSITION baru sejak pemanggilan terakhir, atau None."""
+        value, self._pending_position = self._pending_position, None
+        return value
+
+    def _desired_state(self, analysis):
+        c = self.config
+        y = self.estimate
+        if y is None:
+            # Sama dengan logika lama: hanya badan/tangan terlihat -> naik mencari wajah
+            return "UP" if analysis['body_detected'] else "STOP"
+        unconfirmed = not confirmed_faces(analysis['face_log'])
+        confirm_line = c['confirm_px'] / analysis['frame_size'][1]
+        if self.state == "UP":
+            # Tetap naik sampai wajah masuk cukup dalam ke pita tengah
+            if y < c['up_line'] + c['hysteresis'] or (unconfirmed and y < confirm_line):
+                return "UP"
+        elif self.state == "DOWN":
+            if y > c['down_line'] - c['hysteresis']:
+                return "DOWN"
+        if y < c['up_line'] or (unconfirmed and y < confirm_line - c['hysteresis']):
+            return "UP"
+        if y > c['down_line']:
+            return "DOWN"
+        return "STOP"
+
+    def _apply(self, desired, now):
+        if desired == self.state:
+            return self.state
+        if desired != "STOP" and now - self._last_change < self.config['dead_time']:
+            # Dead-time: motor baru saja berubah; berbalik arah harus lewat STOP dulu
+            self.stats['held'] += 1
+            if self.state != "STOP":
+                desired = "STOP"
+            else:
+                return self.state
+        self.state = desired
+        self._last_change = now
+        self.stats['changes'] += 1
+        if self.config['position_output'] and desired != "STOP" and self.estimate is not None:
+            self._queue_position()
+        return self.state
+
+    def _queue_position(self):
+        c = self.config
+        low, high = c['position_range']
+        current = self.position if self.position is not None else (low + high) / 2
+        target = 0.5 * (c['up_line'] + c['down_line'])
+        # Wajah di atas (y kecil) -> kamera naik -> posisi bertambah
+        value = current - c['position_gain'] * (self.estimate - target)
+        value = int(np.clip(round(value / c['position_step']) * c['position_step'], low, high))
+        if value != self.position:
+            self.position = value
+            self._pending_position = value
@@ -0,0 +1,323 @@
+"""Kanal serial non-blocking ke Arduino.
+
+Semua tulis/baca serial terjadi di satu thread worker. GUI, pipeline, dan
+worker fingerprint hanya menaruh perintah ke antrean:
+
+- Perintah motor (UP/DOWN/STOP) dan POSITION di-coalesce: hanya permintaan
+  terakhir yang dikirim, permintaan yang tersusul dibuang.
+- Interlock: arah motor hanya boleh berubah lewat STOP, dan gerakan baru
+  dikirim paling cepat `stop_settle` detik setelah STOP (dulu time.sleep(0.1)
+  di thread GUI).
+- Tulis dibatasi minimal `min_interval` detik antar perintah.
+- Balasan board: "OK <perintah>" / "ERR <pesan>" / teks lain (protokol teks), atau
+  ACK/NACK per nomor urut (protokol biner, lihat motor_protocol.py). Round-trip
+  time dihitung dari tulis sampai ACK yang cocok.
+- Protokol biner bisa mengirim beberapa setpoint POSITION dalam satu frame
+  (`send_positions`); protokol teks hanya mengirim setpoint terakhir.
+
+Contoh (tanpa hardware, memakai emulator pseudo-terminal):
+    python motor_link.py --emulator
+    python motor_link.py --emulator --protocol binary
+"""
+import argparse
+import collections
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+import metrics
+from motor_protocol import PROTOCOLS, TextProtocol, create_protocol
+
+MOTOR_COMMANDS = ("UP", "DOWN", "STOP")
+
+
+class MotorLink(threading.Thread):
+    """Worker I/O serial dengan antrean perintah, coalescing, interlock dan ACK."""
+
+    def __init__(self, port, min_interval=0.02, stop_settle=0.1, ack_timeout=0.5,
+                 on_response=None, protocol=None, clock=time.monotonic):
+        super().__init__(name="motor-link", daemon=True)
+        self.port = port  # objek serial.Serial (atau kompatibel) yang sudah terbuka
+        self.min_interval = min_interval
+        self.stop_settle = stop_settle
+        self.ack_timeout = ack_timeout
+        self.on_response = on_response
+        self.protocol = protocol or TextProtocol()
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._motor = None      # permintaan motor terakhir yang belum dikirim
+        self._position = None   # setpoint POSITION terakhir (list) yang belum dikirim
+        self._messages = collections.deque()  # perintah lain, dikirim berurutan (FIFO)
+        self._closing = False
+
+        self.motor_sent = "STOP"          # perintah motor terakhir yang benar-benar terkirim
+        self._stopped_at = float('-inf')  # waktu STOP terakhir terkirim
+        self._next_write = 0.0
+        self._awaiting = collections.deque()  # (kunci ACK, perintah, waktu kirim)
+        self._seq = 0
+
+        self.rtt = collections.deque(maxlen=1000)
+        # Tiap permintaan yang tidak dikirim dihitung tepat sekali: `coalesced` jika digantikan
+        # permintaan lebih baru sebelum terkirim, `redundant` jika sama dengan keadaan motor saat ini
+        self.stats = dict(sent=0, coalesced=0, redundant=0, acked=0, unacked=0, errors=0, board_errors=0,
+                          clamped=0)
+        self.last_error = None
+        metrics.collector(self._collect_metrics)
+
+    # ---------- API (thread mana pun, tidak pernah blocking) ----------
+    def send_motor(self, state):
+        if state not in MOTOR_COMMANDS:
+            raise ValueError(f"Perintah motor tidak dikenal: {state}")
+        with self._cond:
+            if self._motor is not None:
+                self.stats['coalesced'] += 1
+            self._motor = state
+            self._cond.notify()
+
+    def send_position(self, value):
+        self.send_positions([value])
+
+    def send_positions(self, values):
+        """Batch setpoint yang dieksekusi berurutan; menggantikan batch yang belum terkirim.
+
+        Setpoint di luar `protocol.position_range` dipotong ke batasnya (dihitung di stats['clamped'])."""
+        low, high = self.protocol.position_range
+        values = [int(v) for v in values]
+        if not values:
+            return
+        clamped = [min(max(v, low), high) for v in values]
+        with self._cond:
+            if clamped != values:
+                self.stats['clamped'] += 1
+            if self._position is not None:
+                self.stats['coalesced'] += 1
+            self._position = clamped
+            self._cond.notify()
+
+    def send(self, line):
+        with self._cond:
+            self._messages.append(line)
+            self._cond.notify()
+
+    def close(self, timeout=1.0):
+        """Kirim sisa antrean (dengan batas waktu), hentikan worker, lalu tutup port."""
+        metrics.REGISTRY.remove_collector(self._collect_metrics)
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self.is_alive():
+            self.join(timeout)
+        try:
+            self.port.close()
+        except Exception:
+            pass
+
+    def rtt_report(self):
+        if not self.rtt:
+            return dict(self.stats)
+        values = np.asarray(self.rtt) * 1000.0
+        report = dict(self.stats)
+        report.update(rtt_p50_ms=float(np.percentile(values, 50)), rtt_p95_ms=float(np.percentile(values, 95)),
+                      rtt_max_ms=float(values.max()))
+        return report
+
+    def _collect_metrics(self):
+        for name, value in self.stats.items():
+            yield "serial_commands_total", "counter", value, {"result": name}
+
+    # ---------- worker ----------
+    def _next_command(self, now):
+        """Pilih perintah berikutnya yang boleh dikirim sekarang, atau (None, waktu tunggu)."""
+        if self._motor is not None:
+            wanted = self._motor
+            if wanted == self.motor_sent:
+                # Sudah dalam keadaan itu: permintaan tidak perlu dikirim
+                self._motor = None
+                self.stats['redundant'] += 1
+            elif wanted == "STOP" or self.motor_sent != "STOP":
+                # STOP selalu didahulukan; arah berlawanan harus lewat STOP dulu
+                self._motor = None if wanted == "STOP" else wanted
+                return "STOP", 0.0
+            else:
+                wait = self._stopped_at + self.stop_settle - now
+                if wait <= 0:
+                    self._motor = None
+                    return wanted, 0.0
+                # Tunggu motor benar-benar berhenti; perintah lain tetap boleh jalan
+                if not self._messages and self._position is None:
+                    return None, wait
+        if self._messages:
+            return self._messages.popleft(), 0.0
+        if self._position is not None:
+            values, self._position = self._position, None
+            return "POSITION:" + ",".join(map(str, values)), 0.0
+        return None, None
+
+    def run(self):
+        while True:
+            try:
+                if self._step():
+                    return
+            except Exception as e:
+                # Worker tidak boleh mati: STOP berikutnya harus tetap terkirim
+                self.stats['errors'] += 1
+                print(f"[ERROR] Motor link: {e}")
+                if self._closing:
+                    return
+                time.sleep(0.01)
+
+    def _step(self):
+        """Satu putaran worker; True jika worker selesai."""
+        with self._cond:
+            now = self.clock()
+            if now < self._next_write:
+                command, wait = None, self._next_write - now
+            else:
+                command, wait = self._next_command(now)
+            if command is None:
+                if self._closing and wait is None:
+                    return True
+                # Poll lebih rapat selama menunggu ACK agar RTT terukur akurat
+                poll = 0.002 if self._awaiting else 0.01
+                self._cond.wait(min(wait, poll) if wait is not None else poll)
+        if command is not None:
+            self._write(command)
+        self._read()
+        self._expire_acks()
+        if self._closing and self.clock() > self._next_write + 1.0:
+            return True
+        return False
+
+    def _write(self, command):
+        now = self.clock()
+        try:
+            data, key = self.protocol.encode(command, self._seq)
+        except (struct.error, ValueError) as e:
+            # Perintah tidak dapat dikodekan (mis. setpoint di luar u16): dibuang, worker tetap jalan
+            self.stats['errors'] += 1
+            print(f"[ERROR] Perintah tidak valid untuk protokol {self.protocol.name} ({command}): {e}")
+            return
+        try:
+            with metrics.span("serial_write"):
+                self.port.write(data)
+        except Exception as e:
+            self.stats['errors'] += 1
+            if str(e) != self.last_error:
+                print(f"[ERROR] Gagal menulis ke Arduino ({command}): {e}")
+            self.last_error = str(e)
+            self._next_write = now + max(self.min_interval, 0.5)
+            return
+        self.last_error = None
+        self.stats['sent'] += 1
+        self._seq = (self._seq + 1) & 0xFF
+        self._next_write = now + self.min_interval
+        self._awaiting.append((key, command, now))
+        if command in MOTOR_COMMANDS:
+            self.motor_sent = command
+            if command == "STOP":
+                self._stopped_at = now
+
+    def _read(self):
+        try:
+            waiting = self.port.in_waiting
+            if not waiting:
+                return
+            data = self.port.read(waiting)
+        except Exception as e:
+            self.stats['errors'] += 1
+            if str(e) != self.last_error:
+                print(f"[ERROR] Gagal membaca dari Arduino: {e}")
+            self.last_error = str(e)
+            return
+        for kind, key, line in self.protocol.feed(data):
+            self._handle_reply(kind, key, line)
+
+    def _handle_reply(self, kind, key, line):
+        now = self.clock()
+        if kind == "ok":
+            # Cocokkan ke perintah tertua dengan kunci sama (atau tertua jika OK tanpa kunci)
+            for i, (awaited, command, sent_at) in enumerate(self._awaiting):
+                if key is None or awaited == key:
+                    del self._awaiting[i]
+                    self.rtt.append(now - sent_at)
+                    metrics.observe("serial_rtt", now - sent_at)
+                    self.stats['acked'] += 1
+                    break
+        elif kind == "err":
+            self.stats['board_errors'] += 1
+            for i, (awaited, command, sent_at) in enumerate(self._awaiting):
+                if key is not None and awaited == key:
+                    del self._awaiting[i]  # NACK: perintah ditolak, tidak perlu menunggu timeout
+                    line = f"{line} [{command}]"
+                    break
+            print(f"[ERROR] Arduino: {line}")
+        if self.on_response is not None:
+            self.on_response(line)
+
+    def _expire_acks(self):
+        now = self.clock()
+        while self._awaiting and now - self._awaiting[0][2] > self.ack_timeout:
+            self._awaiting.popleft()
+            self.stats['unacked'] += 1
+
+
+def open_port(port, baudrate=115200):
+    import serial
+    # timeout=0: baca non-blocking, worker sendiri yang mengatur jeda
+    return serial.serial_for_url(port, baudrate, timeout=0, write_timeout=0.5)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Uji kanal serial motor (coalescing, interlock, RTT).")
+    parser.add_argument('--port', help="Port serial, mis. COM14 atau /dev/ttyACM0")
+    parser.add_argument('--emulator', action='store_true', help="Pakai emulator Arduino pseudo-terminal")
+    parser.add_argument('--bursts', type=int, default=50, help="Jumlah burst perintah")
+    parser.add_argument('--protocol', choices=sorted(PROTOCOLS), default="text", help="Protokol serial")
+    args = parser.parse_args(argv)
+
+    emulator = None
+    if args.emulator:
+        from arduino_emulator import ArduinoEmulator
+        emulator = ArduinoEmulator(protocol=args.protocol)
+        emulator.start()
+        args.port = emulator.port_name
+    if not args.port:
+        parser.error("isi --port atau --emulator")
+
+    link = MotorLink(open_port(args.port), protocol=create_protocol(args.protocol))
+    link.start()
+    rng = np.random.default_rng(0)
+    requested = 0
+    for _ in range(args.bursts):
+        # Burst keputusan motor per frame seperti mode Automatic + slider
+        for state in rng.choice(MOTOR_COMMANDS, 5):
+            link.send_motor(str(state))
+            requested += 1
+        link.send_position(int(rng.integers(0, 10)) * 1000)
+        requested += 1
+        time.sleep(0.033)
+    link.send_motor("STOP")
+    time.sleep(0.5)
+    link.close()
+
+    report = link.rtt_report()
+    print(f"[INFO] {requested} permintaan, {report['sent']} terkirim, {report['coalesced']} di-coalesce, "
+          f"{report['redundant']} redundan")
+    print(f"[INFO] ACK {report['acked']}, tanpa ACK {report['unacked']}, error tulis/baca {report['errors']}, "
+          f"error board {report['board_errors']}")
+    if 'rtt_p50_ms' in report:
+        print(f"[INFO] RTT p50={report['rtt_p50_ms']:.2f} ms, p95={report['rtt_p95_ms']:.2f} ms, "
+              f"max={report['rtt_max_ms']:.2f} ms")
+    if emulator is not None:
+        emulator.stop()
+        print(f"[INFO] Emulator: {emulator.report()}")
+        return 1 if emulator.violations else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
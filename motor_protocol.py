@@ -0,0 +1,265 @@
+"""Protokol perintah motor: teks (lama) dan biner berframe (opsional).
+
+Protokol teks: satu perintah per baris ("UP\\n", "POSITION:3000\\n", ...), balasan
+"OK <perintah>" / "ERR <pesan>".
+
+Frame biner (little-endian):
+    0xA5 0x5A | seq u8 | type u8 | len u8 | payload (len byte) | crc16 u16
+CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) dihitung atas seq..payload.
+
+    MOTOR     0x01  u8 arah (0 STOP, 1 UP, 2 DOWN)
+    POSITION  0x02  u8 jumlah + jumlah x u16 setpoint (batch, dieksekusi berurutan)
+    EVENT     0x03  teks ASCII (mis. "fingerprint verified")
+    PING      0x04  kosong
+    ACK       0x80  u8 seq yang dibalas
+    NACK      0x81  u8 seq + u8 kode error
+    INFO      0x82  teks ASCII dari board
+
+Contoh benchmark throughput (emulator pty, baud 115200 disimulasikan):
+    python motor_protocol.py --commands 500
+"""
+import argparse
+import collections
+import struct
+import sys
+import time
+
+import numpy as np
+
+SYNC = b"\xA5\x5A"
+FRAME_OVERHEAD = 2 + 3 + 2
+
+TYPE_MOTOR = 0x01
+TYPE_POSITION = 0x02
+TYPE_EVENT = 0x03
+TYPE_PING = 0x04
+TYPE_ACK = 0x80
+TYPE_NACK = 0x81
+TYPE_INFO = 0x82
+
+MOTOR_CODES = {"STOP": 0, "UP": 1, "DOWN": 2}
+MOTOR_NAMES = {code: name for name, code in MOTOR_CODES.items()}
+MAX_BATCH = 120  # setpoint per frame (payload <= 255 byte)
+POSITION_RANGE = (0, 0xFFFF)  # setpoint u16 di frame biner
+
+NACK_CRC = 1
+NACK_UNKNOWN = 2
+NACK_INTERLOCK = 3
+NACK_BAD_PAYLOAD = 4
+NACK_REASONS = {NACK_CRC: "crc", NACK_UNKNOWN: "unknown", NACK_INTERLOCK: "interlock", NACK_BAD_PAYLOAD: "payload"}
+
+
+def _crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data, crc=0xFFFF):
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC_TABLE[((crc >> 8) ^ byte) & 0xFF]
+    return crc
+
+
+def encode_frame(seq, frame_type, payload=b""):
+    body = struct.pack("<BBB", seq & 0xFF, frame_type, len(payload)) + payload
+    return SYNC + body + struct.pack("<H", crc16(body))
+
+
+def parse_position(command):
+    """'POSITION:1000' atau 'POSITION:1000,2000' -> [1000, 2000]."""
+    return [int(v) for v in command.split(":", 1)[1].split(",")]
+
+
+class FrameDecoder:
+    """Parser stream frame biner; sinkron ulang otomatis jika CRC/format rusak."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.crc_errors = 0
+
+    def feed(self, data):
+        """Tambah byte dari serial; kembalikan list (seq, type, payload) frame lengkap."""
+        self._buffer += data
+        frames = []
+        while True:
+            start = self._buffer.find(SYNC)
+            if start < 0:
+                # Simpan byte terakhir: mungkin awal SYNC yang terpotong
+                del self._buffer[:max(len(self._buffer) - 1, 0)]
+                return frames
+            del self._buffer[:start]
+            if len(self._buffer) < 5:
+                return frames
+            length = self._buffer[4]
+            total = 5 + length + 2
+            if len(self._buffer) < total:
+                return frames
+            body = bytes(self._buffer[2:5 + length])
+            (crc,) = struct.unpack_from("<H", self._buffer, 5 + length)
+            if crc != crc16(body):
+                self.crc_errors += 1
+                del self._buffer[:1]  # lompati SYNC ini, cari SYNC berikutnya
+                continue
+            frames.append((body[0], body[1], body[3:]))
+            del self._buffer[:total]
+
+
+class TextProtocol:
+    """Protokol baris teks lama. Kunci ACK = teks perintah."""
+    name = "text"
+    position_range = POSITION_RANGE  # sama dengan biner agar firmware menerima rentang yang sama
+
+    def __init__(self):
+        self._rx = bytearray()
+
+    def encode(self, command, seq):
+        if command.startswith("POSITION:"):
+            # Teks hanya punya satu setpoint: dari batch dikirim setpoint terakhir
+            command = f"POSITION:{parse_position(command)[-1]}"
+        return (command + "\n").encode(), command
+
+    def feed(self, data):
+        """Kembalikan list (jenis, kunci, teks) dengan jenis 'ok' / 'err' / 'info'."""
+        self._rx += data
+        replies = []
+        while b"\n" in self._rx:
+            raw, _, rest = self._rx.partition(b"\n")
+            self._rx = bytearray(rest)
+            line = raw.decode(errors='replace').strip()
+            if not line:
+                continue
+            if line.startswith("OK"):
+                replies.append(("ok", line[2:].strip() or None, line))
+            elif line.startswith("ERR"):
+                replies.append(("err", None, line))
+            else:
+                replies.append(("info", None, line))
+        return replies
+
+
+class BinaryProtocol:
+    """Protokol frame biner dengan nomor urut dan CRC. Kunci ACK = seq."""
+    name = "binary"
+    position_range = POSITION_RANGE
+
+    def __init__(self):
+        self.decoder = FrameDecoder()
+
+    def encode(self, command, seq):
+        seq &= 0xFF
+        if command in MOTOR_CODES:
+            return encode_frame(seq, TYPE_MOTOR, bytes([MOTOR_CODES[command]])), seq
+        if command.startswith("POSITION:"):
+            values = parse_position(command)[-MAX_BATCH:]
+            payload = struct.pack(f"<B{len(values)}H", len(values), *values)
+            return encode_frame(seq, TYPE_POSITION, payload), seq
+        if command == "PING":
+            return encode_frame(seq, TYPE_PING), seq
+        return encode_frame(seq, TYPE_EVENT, command.encode()[:255]), seq
+
+    def feed(self, data):
+        replies = []
+        for seq, frame_type, payload in self.decoder.feed(data):
+            if frame_type == TYPE_ACK and payload:
+                replies.append(("ok", payload[0], f"ACK {payload[0]}"))
+            elif frame_type == TYPE_NACK and len(payload) >= 2:
+                reason = NACK_REASONS.get(payload[1], payload[1])
+                replies.append(("err", payload[0], f"ERR {reason} (seq {payload[0]})"))
+            else:
+                replies.append(("info", None, payload.decode(errors='replace')))
+        return replies
+
+
+PROTOCOLS = {TextProtocol.name: TextProtocol, BinaryProtocol.name: BinaryProtocol}
+
+
+def create_protocol(name):
+    return PROTOCOLS[name]()
+
+
+# =============================================
+# Benchmark throughput dan latensi
+# =============================================
+def _run_commands(port, protocol, commands, window):
+    """Kirim `commands` dengan maksimal `window` perintah belum di-ACK. Kembalikan (durasi, rtt)."""
+    # Kunci ACK teks bisa berulang (perintah sama), jadi per kunci disimpan antrean FIFO
+    sent_at = collections.defaultdict(collections.deque)
+    outstanding = 0
+    rtt = []
+    next_index = 0
+    seq = 0
+    started = time.perf_counter()
+    deadline = started + 30.0
+    while (next_index < len(commands) or outstanding) and time.perf_counter() < deadline:
+        while next_index < len(commands) and outstanding < window:
+            data, key = protocol.encode(commands[next_index], seq)
+            port.write(data)
+            sent_at[key].append(time.perf_counter())
+            outstanding += 1
+            next_index += 1
+            seq = (seq + 1) & 0xFF
+        waiting = port.in_waiting
+        if not waiting:
+            time.sleep(0.0002)
+            continue
+        for kind, key, _ in protocol.feed(port.read(waiting)):
+            if kind == "ok" and sent_at.get(key):
+                rtt.append(time.perf_counter() - sent_at[key].popleft())
+                outstanding -= 1
+    return time.perf_counter() - started, rtt
+
+
+def benchmark(protocol_name, count, baudrate, batch):
+    from arduino_emulator import ArduinoEmulator
+    from motor_link import open_port
+
+    emulator = ArduinoEmulator(protocol=protocol_name, baudrate=baudrate, latency=0)
+    emulator.start()
+    port = open_port(emulator.port_name, baudrate)
+    rng = np.random.default_rng(0)
+    setpoints = (rng.integers(0, 11, count * batch) * 1000).tolist()
+    if protocol_name == "binary":
+        commands = ["POSITION:" + ",".join(map(str, setpoints[i:i + batch])) for i in range(0, len(setpoints), batch)]
+    else:
+        # Teks tidak bisa batch: satu baris per setpoint
+        commands = [f"POSITION:{v}" for v in setpoints]
+
+    _, rtt = _run_commands(port, create_protocol(protocol_name), commands[:50], window=1)
+    elapsed, _ = _run_commands(port, create_protocol(protocol_name), commands, window=8)
+    port.close()
+    emulator.stop()
+    wire = sum(len(create_protocol(protocol_name).encode(c, 0)[0]) for c in commands) / len(setpoints)
+    values = np.asarray(rtt) * 1000
+    return dict(protocol=protocol_name, batch=batch if protocol_name == "binary" else 1,
+                bytes_per_setpoint=wire, setpoints_per_s=len(setpoints) / elapsed,
+                frames_per_s=len(commands) / elapsed, rtt_p50_ms=float(np.percentile(values, 50)),
+                rtt_p95_ms=float(np.percentile(values, 95)), emulator=emulator.report())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark protokol teks vs biner lewat emulator pty.")
+    parser.add_argument('--commands', type=int, default=500, help="Jumlah setpoint posisi per protokol")
+    parser.add_argument('--baudrate', type=int, default=115200, help="Baud yang disimulasikan emulator")
+    parser.add_argument('--batch', type=int, default=8, help="Setpoint per frame biner")
+    args = parser.parse_args(argv)
+
+    print(f"{'protokol':<10}{'batch':>6}{'byte/setpoint':>15}{'setpoint/s':>12}{'frame/s':>10}"
+          f"{'RTT p50':>10}{'RTT p95':>10}")
+    for name, batch in (("text", 1), ("binary", 1), ("binary", args.batch)):
+        result = benchmark(name, args.commands // batch, args.baudrate, batch)
+        print(f"{name:<10}{result['batch']:>6}{result['bytes_per_setpoint']:>15.1f}"
+              f"{result['setpoints_per_s']:>12.0f}{result['frames_per_s']:>10.0f}"
+              f"{result['rtt_p50_ms']:>9.2f}ms{result['rtt_p95_ms']:>8.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
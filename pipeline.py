@@ -0,0 +1,449 @@
+import multiprocessing
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import journal
+import metrics
+import vision
+from face_tracks import FaceTracks, confirmed_faces
+from liveness import LIVENESS_CONFIG, LivenessChecker
+from render import DisplayRenderer
+from motion_gate import MOTION_GATE_CONFIG, MotionGate
+from motor_control import CONTROLLER_CONFIG, MotorController
+from shm_ring import SHM_CONFIG, FrameRing, ResultChannel, decode_analysis
+
+
+class LatestQueue:
+    """Antrian terbatas yang hanya menyimpan item terbaru; item lama dibuang (drop)."""
+
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Ambil item tertua yang tersisa, atau None jika timeout / antrian ditutup."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class FramePacket:
+    """Satu frame kamera beserta hasil tiap tahap pipeline."""
+    __slots__ = ('seq', 'captured_at', 'frame', 'analysis', 'motor_state', 'image', 'stage_times')
+
+    def __init__(self, seq, frame):
+        self.seq = seq
+        self.captured_at = time.perf_counter()
+        self.frame = frame
+        self.analysis = None
+        self.motor_state = None
+        self.image = None
+        self.stage_times = {}
+
+    def latency(self):
+        """Latensi end-to-end (detik) dari kamera sampai frame selesai di-render."""
+        return time.perf_counter() - self.captured_at
+
+
+# =============================================
+# Worker tiap tahap pipeline
+# =============================================
+class CaptureWorker(threading.Thread):
+    """Baca kamera ke `outbox` (LatestQueue), atau ke FrameRing jika `ring` diberikan."""
+
+    def __init__(self, camera, outbox, stop_event, ring=None):
+        super().__init__(name="capture", daemon=True)
+        self.camera = camera
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.ring = ring
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def latest_frame(self):
+        with self._lock:
+            return None if self._latest is None else self._latest.copy()
+
+    def run(self):
+        seq = 0
+        while not self.stop_event.is_set():
+            with metrics.span("capture"):
+                ret, frame = self.camera.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+            seq += 1
+            with self._lock:
+                self._latest = frame
+            if self.ring is not None:
+                # Satu salinan ke shared memory; proses inferensi membaca view tanpa pickle
+                self.ring.write(frame, time.perf_counter())
+                continue
+            packet = FramePacket(seq, frame)
+            packet.stage_times['capture'] = packet.latency()
+            self.outbox.put(packet)
+
+
+class StageWorker(threading.Thread):
+    """Ambil paket dari inbox, proses, lalu teruskan ke outbox (jika ada)."""
+
+    def __init__(self, name, inbox, outbox, stop_event):
+        super().__init__(name=name, daemon=True)
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event
+
+    def process(self, packet):
+        raise NotImplementedError
+
+    def run(self):
+        while not self.stop_event.is_set():
+            packet = self.inbox.get(timeout=0.1)
+            if packet is None:
+                continue
+            started = time.perf_counter()
+            try:
+                packet = self.process(packet)
+            except Exception as e:
+                print(f"[ERROR] Tahap {self.name}: {e}")
+                continue
+            if packet is None:
+                continue
+            packet.stage_times[self.name] = time.perf_counter() - started
+            metrics.observe(self.name, packet.stage_times[self.name])
+            if self.outbox is not None:
+                self.outbox.put(packet)
+
+
+class InferenceWorker(StageWorker):
+    def __init__(self, inbox, outbox, stop_event, on_decision=None, on_position=None, liveness=None, gate=None):
+        super().__init__("inference", inbox, outbox, stop_event)
+        self.on_decision = on_decision
+        self.on_position = on_position
+        self.liveness = liveness
+        self.gate = gate
+        self.cascade = vision.DetectorCascade() if vision.CASCADE_CONFIG['enabled'] else None
+        # Track ID wajah dan target motor (cascade punya FaceTracks sendiri)
+        self.tracks = FaceTracks() if self.cascade is None else None
+        # Controller terfilter + hysteresis; None = ambang per frame lama (vision.decide_motor_state)
+        self.controller = MotorController() if CONTROLLER_CONFIG['enabled'] else None
+
+    def process(self, packet):
+        if not vision.models_ready():
+            # Model masih di-warm-up: tampilkan frame mentah, belum ada keputusan motor
+            packet.analysis = vision.empty_analysis(packet.frame)
+            return packet
+        if self.gate is not None and not self.gate.check(packet.frame, packet.captured_at):
+            # Station kosong dan diam: frame tetap ditampilkan tanpa menjalankan model
+            packet.analysis = vision.empty_analysis(packet.frame)
+            apply_motor_decision(self.controller, packet, self.on_decision, self.on_position)
+            return packet
+        started = time.perf_counter()
+        if self.cascade is not None:
+            packet.analysis = self.cascade.analyze(packet.frame)
+        else:
+            packet.analysis = vision.analyze_frame(packet.frame, self.tracks)
+        # Durasi per model (face_detection, holistic, deepface, ...) + sisa post-processing
+        timings = packet.analysis['timings']
+        metrics.observe_all(timings)
+        metrics.observe("postprocess", max(time.perf_counter() - started - sum(timings.values()), 0.0))
+        if self.liveness is not None:
+            # Model anti-spoofing hanya berjalan untuk wajah yang baru masuk
+            self.liveness.observe(packet.frame, packet.analysis['face_log'])
+        if self.gate is not None:
+            self.gate.observe(packet.analysis, time.perf_counter())
+        apply_motor_decision(self.controller, packet, self.on_decision, self.on_position)
+        return packet
+
+
+def apply_motor_decision(controller, packet, on_decision=None, on_position=None):
+    """Isi packet.motor_state dari hasil analisis dan panggil callback motor."""
+    position = None
+    with metrics.span("motor_decision"):
+        if controller is not None:
+            packet.motor_state = controller.update(packet.analysis, packet.captured_at)
+            position = controller.take_position()
+        else:
+            packet.motor_state = vision.decide_motor_state(packet.analysis)
+    # Satu record per frame (pengganti log emoji per frame), cukup untuk replay keputusan motor
+    analysis = packet.analysis
+    journal.event("detection", packet.seq, packet.captured_at, analysis['frame_size'][0], analysis['frame_size'][1],
+                  analysis['face_center_y'], confirmed_faces(analysis['face_log']), bool(analysis['face_detected']),
+                  bool(analysis['body_detected']), analysis.get('target_id'), packet.motor_state)
+    if position is not None and on_position:
+        on_position(position)
+    if on_decision:
+        on_decision(packet.motor_state)
+
+
+# =============================================
+# Inferensi di proses terpisah (SHM_CONFIG['inference_processes'] > 0)
+# =============================================
+def inference_process(ring_name, channel_name, worker, workers, stop_event):
+    """Entry point proses inferensi: frame dari FrameRing, hasil ke ResultChannel.
+
+    Worker ke-i memproses frame terbaru dengan seq % workers == i, sehingga beberapa
+    proses dapat memakai core berbeda untuk frame yang berurutan. Karena tiap proses
+    hanya melihat setiap N frame, mode multi-worker memakai detektor tanpa state
+    (tanpa DetectorCascade/FaceTracks); track ID dan target dikelola RemoteInferenceWorker
+    di proses utama. Hasil untuk slot yang sudah ditimpa selama inferensi dibuang.
+    """
+    vision.registry.warm_up(vision.required_models(), background=False)
+    ring = FrameRing.attach(ring_name)
+    channel = ResultChannel.attach(channel_name)
+    stateful = workers == 1
+    cascade = vision.DetectorCascade() if vision.CASCADE_CONFIG['enabled'] and stateful else None
+    tracks = FaceTracks() if cascade is None and stateful else None
+    # Gate per proses (hanya relevan untuk satu worker; jadwal fingerprint tidak ikut di mode ini)
+    gate = MotionGate() if MOTION_GATE_CONFIG['enabled'] and workers == 1 else None
+    last = 0
+    try:
+        while not stop_event.is_set():
+            item = ring.wait(last, worker, workers, timeout=0.1)
+            if item is None:
+                if ring.closed:
+                    break
+                continue
+            last, frame, captured_at = item
+            if gate is not None and not gate.check(frame, captured_at):
+                if ring.valid(last):
+                    channel.publish(worker, last, captured_at, vision.empty_analysis(frame))
+                continue
+            started = time.perf_counter()
+            try:
+                analysis = cascade.analyze(frame) if cascade is not None else vision.analyze_frame(frame, tracks)
+            except Exception as e:
+                print(f"[ERROR] Proses inferensi {worker}: {e}")
+                continue
+            if gate is not None:
+                gate.observe(analysis, time.perf_counter())
+            if not ring.valid(last):
+                # Slot ditimpa capture selama inferensi: hasil dari frame yang mungkin sobek
+                continue
+            channel.publish(worker, last, captured_at, analysis, time.perf_counter() - started)
+    finally:
+        ring.close()
+        channel.close()
+
+
+class RemoteInferenceWorker(threading.Thread):
+    """Pengganti InferenceWorker di proses utama: hasil dari ResultChannel diurutkan
+    per seq, lalu keputusan motor (controller butuh urutan frame) dan render.
+
+    `tracks` (FaceTracks) dipakai jika proses inferensi lebih dari satu: track ID dan
+    target motor diberikan di sini, urut seq, bukan oleh tiap proses.
+    """
+
+    def __init__(self, ring, channel, outbox, stop_event, on_decision=None, on_position=None, liveness=None,
+                 tracks=None):
+        super().__init__(name="inference", daemon=True)
+        self.ring = ring
+        self.channel = channel
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.on_decision = on_decision
+        self.on_position = on_position
+        self.liveness = liveness
+        self.tracks = tracks
+        self.controller = MotorController() if CONTROLLER_CONFIG['enabled'] else None
+        self.processed = 0
+        self.late = 0      # hasil datang setelah seq yang lebih baru sudah diteruskan
+        self.expired = 0   # slot frame sudah ditimpa sebelum hasil kembali (naikkan SHM_CONFIG['slots'])
+
+    def run(self):
+        last = 0
+        while not self.stop_event.is_set():
+            batch = self.channel.poll()
+            if not batch:
+                time.sleep(SHM_CONFIG['poll_interval'])
+                continue
+            for record in batch:
+                seq = int(record['seq'])
+                if seq <= last:
+                    self.late += 1
+                    continue
+                last = seq
+                self.processed += 1
+                try:
+                    self.process(seq, record)
+                except Exception as e:
+                    print(f"[ERROR] Tahap inference: {e}")
+
+    def process(self, seq, record):
+        analysis = decode_analysis(record)
+        inference = analysis['timings'].pop('inference', None)
+        metrics.observe_all(analysis['timings'])
+        if inference is not None:
+            metrics.observe("inference", inference)
+            metrics.observe("postprocess", max(inference - sum(analysis['timings'].values()), 0.0))
+        slot = self.ring.read(seq)
+        if slot is None:
+            self.expired += 1
+            return
+        if self.tracks is not None:
+            analysis['target_id'] = self.tracks.update(analysis['face_log'])
+        packet = FramePacket(seq, slot[0])
+        packet.captured_at = float(record['captured_at'])
+        packet.analysis = analysis
+        if inference is not None:
+            packet.stage_times['inference'] = inference
+        if self.liveness is not None:
+            self.liveness.observe(packet.frame, analysis['face_log'])
+        apply_motor_decision(self.controller, packet, self.on_decision, self.on_position)
+        self.outbox.put(packet)
+
+
+class RenderWorker(StageWorker):
+    def __init__(self, inbox, stop_event, on_frame=None, on_latency=None):
+        super().__init__("render", inbox, None, stop_event)
+        self.on_frame = on_frame
+        self.on_latency = on_latency
+        # Resize sekali ke ukuran label, overlay di skala tampilan, hasil di ring buffer
+        self.renderer = DisplayRenderer()
+
+    def process(self, packet):
+        # Frame mentah tidak diubah (tetap bersih untuk capture verifikasi)
+        packet.image = self.renderer.render(packet.frame, packet.analysis)
+        latency = packet.latency()
+        metrics.observe("end_to_end", latency)
+        if self.on_latency:
+            self.on_latency(latency)
+        if self.on_frame:
+            self.on_frame(packet)
+        return packet
+
+
+class VisionPipeline:
+    """Pipeline capture → inference → render, masing-masing di thread sendiri.
+
+    Antar tahap dihubungkan dengan LatestQueue sehingga tahap yang lambat selalu
+    memproses frame terbaru, bukan frame yang sudah basi. Callback `on_frame`,
+    `on_decision` dan `on_position` dipanggil dari thread worker.
+
+    Jika `inference_processes` > 0 (default SHM_CONFIG), inferensi berjalan di
+    proses terpisah: capture menulis ke FrameRing di shared memory dan hasil
+    kembali lewat ResultChannel (lihat shm_ring.py).
+    """
+
+    def __init__(self, camera, on_frame=None, on_decision=None, on_position=None, latency_window=120,
+                 inference_processes=None):
+        self.stop_event = threading.Event()
+        self.capture_queue = LatestQueue()
+        self.render_queue = LatestQueue()
+        self._latencies = deque(maxlen=latency_window)
+        if inference_processes is None:
+            inference_processes = SHM_CONFIG['inference_processes']
+        self.ring = self.channel = None
+        self.processes = []
+        # Liveness wajah dicek sesuai kebutuhan (wajah baru / sebelum verifikasi), lihat liveness.py
+        self.liveness = LivenessChecker() if LIVENESS_CONFIG['enabled'] else None
+        # Gerbang gerak: station kosong -> inferensi jarang (motion_gate.py). Di mode proses
+        # gate berjalan di proses inferensi sehingga tidak tersedia untuk jadwal fingerprint
+        self.gate = None
+        if MOTION_GATE_CONFIG['enabled'] and inference_processes <= 0:
+            self.gate = MotionGate()
+        if inference_processes > 0:
+            self.ring = FrameRing.create(SHM_CONFIG['slots'], SHM_CONFIG['max_shape'])
+            self.channel = ResultChannel.create(inference_processes, SHM_CONFIG['result_slots'])
+            ctx = multiprocessing.get_context("spawn")
+            self._process_stop = ctx.Event()
+            self.processes = [ctx.Process(target=inference_process, name=f"inference-{i}", daemon=True,
+                                          args=(self.ring.name, self.channel.name, i, inference_processes,
+                                                self._process_stop))
+                              for i in range(inference_processes)]
+            self.inference_worker = RemoteInferenceWorker(self.ring, self.channel, self.render_queue,
+                                                          self.stop_event, on_decision, on_position,
+                                                          self.liveness,
+                                                          FaceTracks() if inference_processes > 1 else None)
+        else:
+            self.inference_worker = InferenceWorker(self.capture_queue, self.render_queue, self.stop_event,
+                                                    on_decision, on_position, self.liveness, self.gate)
+        self.capture_worker = CaptureWorker(camera, self.capture_queue, self.stop_event, self.ring)
+        self.render_worker = RenderWorker(self.render_queue, self.stop_event, on_frame, self._latencies.append)
+        self.workers = [self.capture_worker, self.inference_worker, self.render_worker]
+        metrics.collector(self._collect_metrics)
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self, timeout=2.0):
+        metrics.REGISTRY.remove_collector(self._collect_metrics)
+        if self.liveness is not None:
+            self.liveness.close()
+        if self.gate is not None:
+            self.gate.close()
+        self.stop_event.set()
+        self.capture_queue.close()
+        self.render_queue.close()
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.join(timeout)
+        if self.ring is not None:
+            self.ring.close_writer()
+            self._process_stop.set()
+            for process in self.processes:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+            self.ring.close()
+            self.channel.close()
+
+    def latest_frame(self):
+        return self.capture_worker.latest_frame()
+
+    def allow_verification(self):
+        """Cek liveness wajah di kamera sebelum verifikasi diberikan (True jika liveness nonaktif)."""
+        if self.liveness is None:
+            return True
+        return self.liveness.allow()
+
+    def dropped_capture(self):
+        if self.ring is None:
+            return self.capture_queue.dropped
+        # Mode proses: frame yang ditulis ke ring tetapi tidak pernah kembali sebagai hasil
+        return max(self.ring.write_seq - self.inference_worker.processed, 0)
+
+    def _collect_metrics(self):
+        yield "dropped_frames_total", "counter", self.dropped_capture(), {"queue": "capture"}
+        yield "dropped_frames_total", "counter", self.render_queue.dropped, {"queue": "render"}
+
+    def latency_report(self):
+        """Persentil latensi end-to-end (ms) dan jumlah frame yang dibuang per tahap."""
+        samples = list(self._latencies)
+        report = {
+            'dropped_capture': self.dropped_capture(),
+            'dropped_render': self.render_queue.dropped,
+        }
+        if self.ring is not None:
+            report['expired_frames'] = self.inference_worker.expired
+            report['lost_results'] = self.channel.lost + self.inference_worker.late
+        if samples:
+            values = np.array(samples) * 1000.0
+            report['p50_ms'] = float(np.percentile(values, 50))
+            report['p95_ms'] = float(np.percentile(values, 95))
+            report['max_ms'] = float(values.max())
+        report.update(self.render_worker.renderer.report())
+        return report
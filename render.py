@@ -0,0 +1,155 @@
+"""Tahap render: frame kamera langsung ke ukuran tampilan, tanpa salinan ekstra.
+
+Jalur lama per frame: vision.draw_annotations di 1280x720 pada salinan frame, cvtColor
+penuh ke RGB, cv2.flip penuh, QImage(...).copy(), lalu QPixmap.scaled(640x300).
+DisplayRenderer:
+
+- satu cv2.resize dari frame kamera ke ukuran tampilan, ke buffer yang sudah
+  dialokasi; konversi warna dan mirror dilakukan di ukuran kecil;
+- overlay (landmark, box wajah, "Face N", area deteksi, "Jumlah Wajah") digambar
+  di skala tampilan dengan koordinat x yang sudah di-mirror, sehingga teks tidak
+  ikut terbalik dan frame mentah tidak perlu disalin;
+- hasil ditulis ke ring buffer yang dipakai ulang setiap `buffers` frame (dan
+  diganti saat ukuran frame berubah). Penerima yang menyimpan frame lebih lama
+  dari itu (mis. GUI, lihat PipelineBridge di mone) harus menyalinnya; satu
+  salinan ukuran tampilan jauh lebih murah daripada jalur lama.
+"""
+import collections
+import time
+
+import cv2
+import numpy as np
+
+DISPLAY_SIZE = (640, 300)  # ukuran label video di GUI
+
+# Warna dalam urutan RGB (buffer tampilan sudah RGB)
+BOX_COLOR = (0, 255, 0)
+TARGET_COLOR = (255, 255, 0)  # wajah yang dikunci sebagai target motor
+AREA_COLOR = (0, 0, 255)
+COUNT_COLOR = (255, 0, 0)
+LANDMARK_COLOR = (255, 0, 0)
+CONNECTION_COLOR = (224, 224, 224)
+
+
+def display_size(frame_size, target=DISPLAY_SIZE):
+    """Ukuran hasil KeepAspectRatioByExpanding: menutupi `target`, aspek frame dipertahankan."""
+    width, height = frame_size
+    scale = max(target[0] / width, target[1] / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def landmark_array(landmark_list):
+    """Landmark MediaPipe -> array (N, 3) x, y, visibility; tanpa visibility dianggap 1.0.
+
+    Array (N, 3) dikembalikan apa adanya (landmark dari shm_ring.decode_analysis).
+    """
+    if isinstance(landmark_list, np.ndarray):
+        return landmark_list
+    return np.array([(lm.x, lm.y, lm.visibility if lm.HasField('visibility') else 1.0)
+                     for lm in landmark_list.landmark], dtype=np.float32).reshape(-1, 3)
+
+
+class DisplayRenderer:
+    """Render frame BGR + hasil analisis ke buffer RGB ukuran tampilan (sudah di-mirror)."""
+
+    def __init__(self, target=DISPLAY_SIZE, buffers=4, mirror=True, history=240):
+        self.target = target
+        self.mirror = mirror
+        self._count = buffers
+        self._frame_size = None
+        self._size = None
+        self._interpolation = cv2.INTER_LINEAR
+        self._small = None
+        self._ring = []
+        self._index = 0
+        self.costs = collections.deque(maxlen=history)
+
+    def _allocate(self, frame_size):
+        self._frame_size = frame_size
+        self._size = display_size(frame_size, self.target)
+        width, height = self._size
+        # INTER_AREA punya jalur cepat untuk faktor tepat 2x (kamera 1280x720 -> 640x360);
+        # faktor lain (mis. 3x) jauh lebih lambat daripada INTER_LINEAR
+        exact_half = frame_size == (width * 2, height * 2)
+        self._interpolation = cv2.INTER_AREA if exact_half else cv2.INTER_LINEAR
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._ring = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self._count)]
+
+    def render(self, frame, analysis=None):
+        """Kembalikan buffer RGB (H, W, 3) C-contiguous milik ring; jangan diubah pemanggil."""
+        started = time.perf_counter()
+        height, width = frame.shape[:2]
+        if self._frame_size != (width, height):
+            self._allocate((width, height))
+        out = self._ring[self._index]
+        self._index = (self._index + 1) % len(self._ring)
+
+        cv2.resize(frame, self._size, dst=self._small, interpolation=self._interpolation)
+        if self.mirror:
+            cv2.flip(self._small, 1, dst=self._small)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2RGB, dst=out)
+        if analysis is not None:
+            self._draw(out, analysis, width, height)
+        self.costs.append(time.perf_counter() - started)
+        return out
+
+    # ---------- overlay di skala tampilan ----------
+    def _x(self, x, scale, width):
+        """Koordinat x frame kamera -> tampilan (mirror dilipat ke koordinat)."""
+        x = x * scale
+        return width - x if self.mirror else x
+
+    def _draw(self, image, analysis, frame_width, frame_height):
+        out_h, out_w = image.shape[:2]
+        scale = out_w / frame_width
+        font_scale = max(0.45, 0.9 * scale)
+        thickness = max(1, round(2 * scale))
+
+        for landmark_list, connections in analysis['landmarks']:
+            self._draw_landmarks(image, landmark_list, connections, out_w, out_h)
+
+        for face in analysis['face_log']:
+            x, y, w, h = face['bounding_box']
+            x1, x2 = sorted((int(self._x(x, scale, out_w)), int(self._x(x + w, scale, out_w))))
+            y1, y2 = int(y * scale), int((y + h) * scale)
+            color = TARGET_COLOR if face.get('target') else BOX_COLOR
+            cv2.rectangle(image, (x1, y1), (x2, y2), color, thickness)
+            # Nomor track stabil antar frame; tanpa track pakai urutan ukuran
+            cv2.putText(image, f"Face {face.get('track_id', face['index'])}", (x1, max(y1 - 5, 10)),
+                        cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
+
+        x1, y1, x2, y2 = analysis['detection_area']
+        x1, x2 = sorted((int(self._x(x1, scale, out_w)), int(self._x(x2, scale, out_w))))
+        cv2.rectangle(image, (x1, int(y1 * scale)), (x2, int(y2 * scale)), AREA_COLOR, thickness)
+
+        cv2.putText(image, f"Jumlah Wajah: {len(analysis['face_log'])}", (10, 25), cv2.FONT_HERSHEY_SIMPLEX,
+                    font_scale, COUNT_COLOR, thickness)
+
+    def _draw_landmarks(self, image, landmark_list, connections, width, height):
+        # Setara mp.drawing_utils.draw_landmarks (titik dengan visibility < 0.5 dilewati)
+        points = landmark_array(landmark_list)
+        visible = points[:, 2] >= 0.5
+        if not visible.any():
+            return
+        xs = (1.0 - points[:, 0] if self.mirror else points[:, 0]) * width
+        pixels = np.stack([xs, points[:, 1] * height], axis=1).astype(np.int32)
+        segments = [(pixels[a], pixels[b]) for a, b in connections
+                    if a < len(pixels) and b < len(pixels) and visible[a] and visible[b]]
+        if segments:
+            cv2.polylines(image, np.asarray(segments, dtype=np.int32), False, CONNECTION_COLOR, 1)
+        for x, y in pixels[visible]:
+            cv2.circle(image, (int(x), int(y)), 2, LANDMARK_COLOR, -1)
+
+    def report(self):
+        """Persentil biaya render per frame (ms)."""
+        if not self.costs:
+            return {}
+        values = np.asarray(self.costs) * 1000.0
+        return dict(render_p50_ms=float(np.percentile(values, 50)), render_p95_ms=float(np.percentile(values, 95)))
+
+
+def preview_image(frame, size):
+    """Frame BGR -> RGB ukuran `size` yang di-mirror (untuk label preview verifikasi)."""
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    cv2.flip(small, 1, dst=small)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=small)
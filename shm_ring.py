@@ -0,0 +1,425 @@
+"""Ring buffer frame di shared memory untuk capture -> inferensi lintas proses.
+
+Mengirim frame 1280x720x3 lewat multiprocessing.Queue berarti pickle + salin
+~2.7 MB per frame di kedua sisi. Di sini frame ditulis sekali ke slot
+preallocated (`multiprocessing.shared_memory`) dan konsumen mendapat view NumPy
+tanpa salinan:
+
+    ring = FrameRing.create(slots=8, max_shape=(720, 1280, 3))   # proses capture
+    ring.write(frame, time.perf_counter())
+
+    ring = FrameRing.attach(name)                                # proses inferensi
+    seq, frame, captured_at = ring.latest(after=last_seq)        # frame = view, bukan salinan
+    ...
+    if not ring.valid(seq): ...                                  # slot sudah ditimpa selama diproses
+
+Semantik "frame terbaru": konsumen selalu mengambil seq terbaru; frame di antaranya
+dilewati (dihitung di `skipped`). Beberapa worker dapat berbagi satu ring dengan
+membagi seq (`worker`/`workers`, seq % workers == worker).
+
+Hasil (face_log, landmark, timing per model) kembali lewat `ResultChannel`:
+array terstruktur RESULT_DTYPE (~2 KB per frame) di shared memory, satu ring per
+worker penulis, tanpa pickle. Sinkronisasi memakai nomor urut (seqlock): slot
+ditandai -1 selama ditulis, konsumen membaca ulang nomor urut setelah selesai.
+
+Benchmark overhead transport per frame (Queue+pickle vs shared memory):
+    python shm_ring.py --frames 300 --shape 720 1280
+"""
+import argparse
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from render import landmark_array
+
+SHM_CONFIG = dict(
+    inference_processes=0,      # >0: inferensi di proses terpisah lewat ring ini (0 = thread seperti biasa)
+    slots=8,                    # slot frame; harus > frame yang lewat selama satu inferensi + render
+    max_shape=(1080, 1920, 3),  # ukuran frame terbesar yang muat di satu slot
+    result_slots=16,            # slot hasil per worker inferensi
+    poll_interval=0.002,        # detik antar cek frame/hasil baru
+)
+
+_ALIGN = 64
+_HEADER_FIELDS = 8   # int64: slots, height, width, channels, write_seq, closed, -, -
+_WRITE_SEQ = 4
+_CLOSED = 5
+
+SLOT_DTYPE = np.dtype([('seq', '<i8'), ('shape', '<i4', 3), ('captured_at', '<f8')])
+
+
+def _aligned(size):
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _attach(name):
+    # Python >= 3.13: proses yang hanya menempel tidak ikut mendaftarkan segmen ke resource tracker
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _release(shm, owner):
+    try:
+        shm.close()
+    except BufferError:
+        pass  # masih ada view frame yang dipegang (mis. paket terakhir); mmap dilepas saat view dibuang
+    if owner:
+        shm.unlink()
+
+
+class FrameRing:
+    """Slot frame preallocated di shared memory; satu penulis, banyak pembaca."""
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.name = shm.name
+        self.owner = owner
+        self.header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        self.slots = int(self.header[0])
+        self.max_shape = tuple(int(v) for v in self.header[1:4])
+        offset = _aligned(self.header.nbytes)
+        self.meta = np.ndarray((self.slots,), dtype=SLOT_DTYPE, buffer=shm.buf, offset=offset)
+        offset = _aligned(offset + self.meta.nbytes)
+        self.data = np.ndarray((self.slots, int(np.prod(self.max_shape))), dtype=np.uint8,
+                               buffer=shm.buf, offset=offset)
+        self.skipped = 0
+
+    @classmethod
+    def create(cls, slots=SHM_CONFIG['slots'], max_shape=SHM_CONFIG['max_shape']):
+        slot_bytes = int(np.prod(max_shape))
+        size = (_aligned(_HEADER_FIELDS * 8) + _aligned(slots * SLOT_DTYPE.itemsize) + slots * slot_bytes)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[0] = slots
+        header[1:4] = max_shape
+        ring = cls(shm, owner=True)
+        ring.meta['seq'] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_attach(name), owner=False)
+
+    # ---------- penulis ----------
+    def write(self, frame, captured_at):
+        """Salin frame ke slot berikutnya; kembalikan seq (mulai dari 1)."""
+        if frame.nbytes > self.data.shape[1]:
+            raise ValueError(f"Frame {frame.shape} lebih besar dari slot {self.max_shape}")
+        seq = int(self.header[_WRITE_SEQ]) + 1
+        index = seq % self.slots
+        meta = self.meta[index]
+        meta['seq'] = -1   # slot sedang ditulis
+        self.data[index, :frame.nbytes].reshape(frame.shape)[...] = frame
+        meta['shape'] = frame.shape if frame.ndim == 3 else (frame.shape[0], frame.shape[1], 1)
+        meta['captured_at'] = captured_at
+        meta['seq'] = seq
+        self.header[_WRITE_SEQ] = seq
+        return seq
+
+    def close_writer(self):
+        self.header[_CLOSED] = 1
+
+    # ---------- pembaca ----------
+    @property
+    def write_seq(self):
+        return int(self.header[_WRITE_SEQ])
+
+    @property
+    def closed(self):
+        return bool(self.header[_CLOSED])
+
+    def read(self, seq):
+        """View frame untuk `seq`, atau None jika slot sudah ditimpa / sedang ditulis."""
+        if seq <= 0:
+            return None
+        index = seq % self.slots
+        meta = self.meta[index]
+        if int(meta['seq']) != seq:
+            return None
+        height, width, channels = (int(v) for v in meta['shape'])
+        frame = self.data[index, :height * width * channels].reshape(height, width, channels)
+        return frame, float(meta['captured_at'])
+
+    def valid(self, seq):
+        """True jika slot `seq` belum ditimpa (cek setelah selesai memakai view)."""
+        return int(self.meta[seq % self.slots]['seq']) == seq
+
+    def latest(self, after=0, worker=0, workers=1):
+        """(seq, view, captured_at) terbaru setelah `after` milik worker ini, atau None."""
+        newest = self.write_seq
+        seq = newest - (newest - worker) % workers
+        if seq <= after:
+            return None
+        result = self.read(seq)
+        if result is None:
+            return None
+        if after:
+            self.skipped += max((seq - after) // workers - 1, 0)
+        return seq, result[0], result[1]
+
+    def wait(self, after=0, worker=0, workers=1, timeout=None, poll_interval=SHM_CONFIG['poll_interval']):
+        """Seperti latest(), tetapi menunggu frame baru sampai timeout / writer ditutup."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            item = self.latest(after, worker, workers)
+            if item is not None or self.closed:
+                return item
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def close(self):
+        # Lepas view NumPy sebelum menutup mmap
+        self.header = self.meta = self.data = None
+        _release(self.shm, self.owner)
+
+
+# =============================================
+# Channel hasil inferensi (array terstruktur)
+# =============================================
+MAX_FACES = 8
+MAX_LANDMARK_SETS = 5      # pose + 2 tangan Holistic (+ 2 tangan graph Hands pada mode "separate")
+MAX_LANDMARK_POINTS = 33   # pose; tangan 21 titik
+TIMING_NAMES = ('face_detection', 'holistic', 'pose', 'hands', 'deepface', 'yunet', 'mediapipe_face',
+                'tracking', 'inference')
+
+FACE_DTYPE = np.dtype([('box', '<i4', 4), ('confidence', '<f4'), ('track_id', '<i4'),   # track_id -1 = tanpa track
+                       ('confirmed', '?')])
+RESULT_DTYPE = np.dtype([
+    ('seq', '<i8'),
+    ('captured_at', '<f8'),
+    ('frame_size', '<i4', 2),
+    ('detection_area', '<i4', 4),
+    ('face_detected', '?'),
+    ('body_detected', '?'),
+    ('hand_detected', '?'),
+    ('face_center_y', '<i4'),          # -1 = None
+    ('target_id', '<i4'),              # -1 = tanpa target
+    ('face_count', 'u1'),
+    ('faces', FACE_DTYPE, MAX_FACES),
+    ('landmark_count', 'u1'),
+    ('landmark_sizes', 'u1', MAX_LANDMARK_SETS),
+    ('landmarks', '<f4', (MAX_LANDMARK_SETS, MAX_LANDMARK_POINTS, 3)),  # x, y, visibility (relatif)
+    ('timings', '<f4', len(TIMING_NAMES)),  # detik, NaN = tahap tidak dijalankan
+])
+
+
+def encode_analysis(record, seq, captured_at, analysis, inference_seconds=None):
+    """Tulis dict hasil vision ke satu record RESULT_DTYPE (di tempat, tanpa alokasi besar)."""
+    record['frame_size'] = analysis['frame_size']
+    record['detection_area'] = analysis['detection_area']
+    record['face_detected'] = analysis['face_detected']
+    record['body_detected'] = analysis['body_detected']
+    record['hand_detected'] = analysis['hand_detected']
+    face_y = analysis['face_center_y']
+    record['face_center_y'] = -1 if face_y is None else face_y
+    faces = analysis['face_log'][:MAX_FACES]   # face_log sudah urut dari wajah terbesar
+    record['face_count'] = len(faces)
+    target_id = analysis.get('target_id')
+    record['target_id'] = -1 if target_id is None else target_id
+    for i, face in enumerate(faces):
+        record['faces'][i]['box'] = face['bounding_box']
+        record['faces'][i]['confidence'] = face['confidence']
+        record['faces'][i]['track_id'] = face.get('track_id', -1)
+        record['faces'][i]['confirmed'] = face.get('confirmed', True)
+    landmark_sets = analysis['landmarks'][:MAX_LANDMARK_SETS]
+    record['landmark_count'] = len(landmark_sets)
+    for i, (landmark_list, _) in enumerate(landmark_sets):
+        points = landmark_array(landmark_list)[:MAX_LANDMARK_POINTS]
+        record['landmark_sizes'][i] = len(points)
+        record['landmarks'][i, :len(points)] = points
+    timings = record['timings']
+    timings[:] = np.nan
+    for name, seconds in analysis['timings'].items():
+        if name in TIMING_NAMES:
+            timings[TIMING_NAMES.index(name)] = seconds
+    if inference_seconds is not None:
+        timings[TIMING_NAMES.index('inference')] = inference_seconds
+    record['captured_at'] = captured_at
+    record['seq'] = seq
+
+
+def _connections(points):
+    import vision
+    mp_holistic = vision.solutions().holistic
+    return mp_holistic.POSE_CONNECTIONS if points == MAX_LANDMARK_POINTS else mp_holistic.HAND_CONNECTIONS
+
+
+def decode_analysis(record):
+    """Record RESULT_DTYPE -> dict dengan format yang sama seperti vision.analyze_frame.
+
+    Landmark dikembalikan sebagai array (N, 3) yang dapat langsung digambar oleh
+    render.DisplayRenderer.
+    """
+    face_log = []
+    target_id = int(record['target_id'])
+    for i in range(int(record['face_count'])):
+        x, y, w, h = (int(v) for v in record['faces'][i]['box'])
+        face = {'bounding_box': (x, y, w, h), 'confidence': float(record['faces'][i]['confidence']),
+                'size': w * h, 'index': i + 1, 'confirmed': bool(record['faces'][i]['confirmed'])}
+        track_id = int(record['faces'][i]['track_id'])
+        if track_id >= 0:
+            face['track_id'] = track_id
+            face['target'] = track_id == target_id
+        face_log.append(face)
+    landmarks = []
+    for i in range(int(record['landmark_count'])):
+        size = int(record['landmark_sizes'][i])
+        landmarks.append((record['landmarks'][i, :size].copy(), _connections(size)))
+    timings = {name: float(seconds) for name, seconds in zip(TIMING_NAMES, record['timings'])
+               if not np.isnan(seconds)}
+    face_y = int(record['face_center_y'])
+    return {
+        'frame_size': tuple(int(v) for v in record['frame_size']),
+        'detection_area': tuple(int(v) for v in record['detection_area']),
+        'face_detected': bool(record['face_detected']),
+        'body_detected': bool(record['body_detected']),
+        'hand_detected': bool(record['hand_detected']),
+        'face_center_y': None if face_y < 0 else face_y,
+        'face_log': face_log,
+        'target_id': None if target_id < 0 else target_id,
+        'landmarks': landmarks,
+        'timings': timings,
+    }
+
+
+class ResultChannel:
+    """Ring RESULT_DTYPE per worker penulis; pembaca menggabungkan urut seq."""
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.name = shm.name
+        self.owner = owner
+        self.header = np.ndarray((2,), dtype=np.int64, buffer=shm.buf)
+        self.writers, self.slots = int(self.header[0]), int(self.header[1])
+        offset = _aligned(self.header.nbytes)
+        self.heads = np.ndarray((self.writers,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset = _aligned(offset + self.heads.nbytes)
+        self.records = np.ndarray((self.writers, self.slots), dtype=RESULT_DTYPE, buffer=shm.buf, offset=offset)
+        self._cursors = [0] * self.writers
+        self.lost = 0
+
+    @classmethod
+    def create(cls, writers=1, slots=SHM_CONFIG['result_slots']):
+        size = _aligned(16) + _aligned(writers * 8) + writers * slots * RESULT_DTYPE.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        np.ndarray((2,), dtype=np.int64, buffer=shm.buf)[:] = (writers, slots)
+        channel = cls(shm, owner=True)
+        channel.heads[:] = 0
+        channel.records['seq'] = -1
+        return channel
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_attach(name), owner=False)
+
+    def publish(self, writer, seq, captured_at, analysis, inference_seconds=None):
+        head = int(self.heads[writer])
+        record = self.records[writer, head % self.slots]
+        record['seq'] = -1
+        encode_analysis(record, seq, captured_at, analysis, inference_seconds)
+        self.heads[writer] = head + 1
+
+    def poll(self):
+        """Salinan record baru dari semua penulis, urut seq (record ditimpa dihitung di `lost`)."""
+        batch = []
+        for writer in range(self.writers):
+            head = int(self.heads[writer])
+            cursor = self._cursors[writer]
+            if head - cursor > self.slots:
+                self.lost += head - cursor - self.slots
+                cursor = head - self.slots
+            for position in range(cursor, head):
+                record = self.records[writer, position % self.slots].copy()
+                if record['seq'] >= 0:
+                    batch.append(record)
+            self._cursors[writer] = head
+        batch.sort(key=lambda record: int(record['seq']))
+        return batch
+
+    def close(self):
+        self.header = self.heads = self.records = None
+        _release(self.shm, self.owner)
+
+
+# =============================================
+# Benchmark transport: Queue (pickle) vs shared memory
+# =============================================
+def _queue_consumer(inbox, outbox):
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        seq, frame = item
+        outbox.put((seq, int(frame[0, 0, 0])))
+
+
+def _ring_consumer(ring_name, channel_name, count):
+    ring = FrameRing.attach(ring_name)
+    channel = ResultChannel.attach(channel_name)
+    analysis = {'frame_size': (0, 0), 'detection_area': (0, 0, 0, 0), 'face_detected': False,
+                'body_detected': False, 'hand_detected': False, 'face_center_y': None,
+                'face_log': [], 'landmarks': [], 'timings': {}}
+    last = 0
+    while last < count:
+        item = ring.wait(after=last, timeout=5.0, poll_interval=0.0001)
+        if item is None:
+            break
+        last, frame, captured_at = item
+        analysis['frame_size'] = (frame.shape[1], frame.shape[0])
+        channel.publish(0, last, captured_at, analysis)
+    ring.close()
+    channel.close()
+
+
+def _benchmark(frames, shape):
+    import multiprocessing
+    ctx = multiprocessing.get_context("spawn")
+    frame = np.random.randint(0, 255, shape, dtype=np.uint8)
+
+    inbox, outbox = ctx.Queue(maxsize=2), ctx.Queue()
+    process = ctx.Process(target=_queue_consumer, args=(inbox, outbox), daemon=True)
+    process.start()
+    inbox.put((0, frame))
+    outbox.get()   # proses siap
+    started = time.perf_counter()
+    for seq in range(1, frames + 1):
+        inbox.put((seq, frame))
+        outbox.get()
+    queue_ms = (time.perf_counter() - started) / frames * 1000.0
+    inbox.put(None)
+    process.join()
+
+    ring = FrameRing.create(slots=4, max_shape=shape)
+    channel = ResultChannel.create(writers=1, slots=4)
+    process = ctx.Process(target=_ring_consumer, args=(ring.name, channel.name, frames + 1), daemon=True)
+    process.start()
+    ring.write(frame, time.perf_counter())
+    while not channel.poll():
+        time.sleep(0.0001)
+    started = time.perf_counter()
+    for _ in range(frames):
+        ring.write(frame, time.perf_counter())
+        while not channel.poll():
+            time.sleep(0.0001)
+    ring_ms = (time.perf_counter() - started) / frames * 1000.0
+    process.join()
+    ring.close()
+    channel.close()
+    return queue_ms, ring_ms
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Overhead transport frame antar proses")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--shape", type=int, nargs=2, default=(720, 1280), metavar=("HEIGHT", "WIDTH"))
+    args = parser.parse_args()
+    shape = (args.shape[0], args.shape[1], 3)
+    queue_ms, ring_ms = _benchmark(args.frames, shape)
+    print(f"[INFO] Frame {shape[1]}x{shape[0]}, {args.frames} frame bolak-balik antar proses")
+    print(f"[INFO] Queue + pickle : {queue_ms:6.2f} ms/frame")
+    print(f"[INFO] Shared memory  : {ring_ms:6.2f} ms/frame (hasil lewat ResultChannel)")
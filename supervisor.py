@@ -0,0 +1,602 @@
+"""Supervisor multi-station: beberapa kamera/motor/fingerprint dari satu host.
+
+Tiap station berjalan di proses worker sendiri (pipeline inferensi, MotorLink,
+worker fingerprint) dengan CPU affinity dan jumlah thread BLAS/TFLite/OpenCV
+dibatasi ke core miliknya, sehingga instance TensorFlow/MediaPipe tidak saling
+berebut core. Supervisor:
+
+- menjalankan ulang worker yang crash, berhenti mengirim heartbeat, atau yang
+  pipeline-nya macet (jumlah frame `runtime.frames` tidak bertambah), dengan
+  backoff 1, 2, 4, ... detik, maksimal `max_backoff`;
+- mengumpulkan status tiap station (FPS, latensi, serial, restart) dan metrics
+  Prometheus semua worker (label station="...") di satu endpoint;
+- opsional menampilkan semua station dalam satu GUI (--gui).
+
+Format config (JSON), lihat stations.example.json:
+    [{"name": "pintu-1", "camera": 0, "port": "COM14", "reader": 0, "cpus": [0, 1]},
+     {"name": "uji", "camera": "man.mp4", "port": "emulator", "reader": "simulated"}]
+    camera : indeks kamera atau path video (diputar berulang sesuai FPS video)
+    port   : port serial, "emulator" (emulator pty, Linux/macOS), atau null
+    reader : indeks reader DigitalPersona, "simulated", atau null
+    cpus   : daftar core untuk worker (opsional)
+
+Contoh:
+    python supervisor.py stations.example.json
+    python supervisor.py stations.json --gui
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+import journal
+import metrics
+
+SUPERVISOR_CONFIG = dict(
+    heartbeat_interval=1.0,    # detik antar status dari worker
+    heartbeat_timeout=30.0,    # worker tanpa frame baru selama ini dianggap hang (setelah frame pertama)
+    startup_timeout=180.0,     # batas warm-up model + kamera sebelum frame pertama
+    max_backoff=30.0,
+    stable_after=60.0,         # backoff di-reset jika worker sudah jalan selama ini
+    preview_size=(320, 170),
+    preview_interval=0.2,      # detik antar preview JPEG ke GUI supervisor
+)
+
+# Variabel lingkungan jumlah thread; harus diset sebelum numpy/TensorFlow/MediaPipe diimport
+THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "TF_NUM_INTRAOP_THREADS",
+              "TF_NUM_INTEROP_THREADS")
+
+
+def load_stations(path):
+    with open(path) as f:
+        stations = json.load(f)
+    names = [s['name'] for s in stations]
+    if len(set(names)) != len(names):
+        raise ValueError("Nama station harus unik")
+    return stations
+
+
+def set_affinity(cpus):
+    """Kunci proses ini ke `cpus`; kembalikan True jika berhasil."""
+    if not cpus:
+        return False
+    if hasattr(os, 'sched_setaffinity'):
+        usable = set(cpus) & os.sched_getaffinity(0)
+        if not usable:
+            print(f"[ERROR] CPU {list(cpus)} tidak tersedia di host ini, affinity dilewati")
+            return False
+        os.sched_setaffinity(0, usable)
+        return True
+    try:
+        import psutil
+    except ImportError:
+        print("[INFO] psutil tidak terpasang, CPU affinity dilewati")
+        return False
+    psutil.Process().cpu_affinity(list(cpus))
+    return True
+
+
+class VideoFileCamera:
+    """Pengganti cv2.VideoCapture untuk file video: diputar berulang dengan laju FPS asli."""
+
+    def __init__(self, path):
+        import cv2
+        self._cv2 = cv2
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise IOError(f"Video '{path}' tidak dapat dibuka")
+        self.interval = 1.0 / (self.capture.get(cv2.CAP_PROP_FPS) or 30.0)
+        self._next = time.monotonic()
+
+    def read(self):
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next = max(self._next + self.interval, time.monotonic() - self.interval)
+        ret, frame = self.capture.read()
+        if not ret:
+            self.capture.set(self._cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        return ret, frame
+
+    def release(self):
+        self.capture.release()
+
+
+def open_camera(source):
+    import cv2
+    if isinstance(source, str) and not source.isdigit():
+        return VideoFileCamera(source)
+    camera = cv2.VideoCapture(int(source))
+    camera.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+    camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    return camera
+
+
+# =============================================
+# Proses worker (satu per station)
+# =============================================
+class StationRuntime:
+    """Satu station tanpa GUI: pipeline mode Automatic + MotorLink + fingerprint."""
+
+    def __init__(self, station):
+        import cv2
+        import fingerprint
+        from fingerprint_match import GALLERY_PATH, FingerprintIdentifier
+        from motor_link import MotorLink, open_port
+        from motor_protocol import create_protocol
+        from pipeline import VisionPipeline
+
+        self.station = station
+        self.name = station['name']
+        self._cv2 = cv2
+        self.frames = 0
+        self.motor_state = "STOP"
+        self._preview = None
+        self._preview_at = 0.0
+        self._preview_lock = threading.Lock()
+
+        self.emulator = None
+        self.motor_link = None
+        port = station.get('port')
+        if port == "emulator":
+            from arduino_emulator import ArduinoEmulator
+            self.emulator = ArduinoEmulator(protocol=station.get('motor_protocol', "text"))
+            self.emulator.start()
+            port = self.emulator.port_name
+        if port:
+            self.motor_link = MotorLink(open_port(port, station.get('baudrate', 115200)),
+                                        protocol=create_protocol(station.get('motor_protocol', "text")))
+            self.motor_link.start()
+
+        self.camera = open_camera(station['camera'])
+        self.pipeline = VisionPipeline(self.camera, on_frame=self.on_frame, on_decision=self.on_decision,
+                                       on_position=self.on_position)
+
+        self.reader = None
+        self.fingerprint_worker = None
+        reader = station.get('reader')
+        if reader == "simulated":
+            self.reader = fingerprint.SimulatedReader()
+        elif reader is not None:
+            self.reader = fingerprint.DpfpddReader(int(reader))
+        if self.reader is not None and self.reader.open() is not False:
+            identifier = FingerprintIdentifier(path=station.get('fingerprint_gallery', GALLERY_PATH))
+            self.fingerprint_worker = fingerprint.FingerprintWorker(self.reader, self.on_fingerprint_event,
+                                                                    identifier=identifier, gate=self.pipeline.gate)
+            self.fingerprint_worker.start()
+
+    def start(self):
+        self.pipeline.start()
+
+    def on_frame(self, packet):
+        self.frames += 1
+        now = time.monotonic()
+        if now - self._preview_at < SUPERVISOR_CONFIG['preview_interval']:
+            return
+        self._preview_at = now
+        cv2 = self._cv2
+        small = cv2.resize(packet.image, SUPERVISOR_CONFIG['preview_size'], interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode('.jpg', cv2.cvtColor(small, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 70])
+        if ok:
+            with self._preview_lock:
+                self._preview = jpeg.tobytes()
+
+    def on_decision(self, state):
+        # Station supervisor selalu mode Automatic
+        if state != self.motor_state:
+            self.motor_state = state
+            if self.motor_link is not None:
+                self.motor_link.send_motor(state)
+            journal.event("motor_command", state, "automatic")
+
+    def on_position(self, position):
+        if self.motor_link is not None:
+            self.motor_link.send_position(position)
+
+    def on_fingerprint_event(self, frame):
+        frame.release()
+        if frame.kind != "verified":
+            return
+        if frame.matches is not None and not frame.matches:
+            print(f"[INFO] {self.name}: sidik jari tidak terdaftar")
+            return
+        if frame.matches:
+            print(f"[INFO] {self.name}: sidik jari dikenali: {frame.matches[0][0]}")
+        if not self.pipeline.allow_verification():
+            print(f"[INFO] {self.name}: wajah tidak lolos liveness, verifikasi ditolak")
+            return
+        if self.motor_link is not None:
+            self.motor_link.send("fingerprint verified")
+
+    def status(self):
+        with self._preview_lock:
+            preview, self._preview = self._preview, None
+        return {
+            'name': self.name,
+            'pid': os.getpid(),
+            'time': time.time(),
+            'frames': self.frames,
+            'motor_state': self.motor_state,
+            'latency': self.pipeline.latency_report(),
+            'serial': self.motor_link.rtt_report() if self.motor_link is not None else None,
+            'stages': metrics.REGISTRY.summary(),
+            'metrics': metrics.REGISTRY.render_prometheus(),
+            'preview': preview,
+        }
+
+    def stop(self):
+        self.pipeline.stop()
+        if self.fingerprint_worker is not None:
+            self.fingerprint_worker.stop()
+        if self.reader is not None:
+            self.reader.close()
+        self.camera.release()
+        if self.motor_link is not None:
+            self.motor_link.send_motor("STOP")
+            self.motor_link.close()
+        if self.emulator is not None:
+            self.emulator.stop()
+
+
+def station_worker(station, status_queue, stop_event):
+    """Entry point proses worker."""
+    cpus = station.get('cpus')
+    threads = str(len(cpus)) if cpus else None
+    if threads:
+        for name in THREAD_ENV:
+            os.environ.setdefault(name, threads)
+    os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '0')
+    pinned = set_affinity(cpus)
+
+    import cv2
+    import vision
+    if threads:
+        cv2.setNumThreads(int(threads))
+
+    vision.registry.warm_up(vision.required_models(), background=False)
+    # Satu set file jurnal per station (prefix = nama station)
+    journal.start(station.get('journal_directory'), prefix=station['name'])
+    runtime = StationRuntime(station)
+    runtime.start()
+    print(f"[INFO] Station {station['name']} berjalan (pid {os.getpid()}, cpu {cpus if pinned else 'semua'})")
+    try:
+        while not stop_event.wait(SUPERVISOR_CONFIG['heartbeat_interval']):
+            try:
+                status_queue.put_nowait(runtime.status())
+            except queue.Full:
+                pass
+    finally:
+        runtime.stop()
+        journal.stop()
+
+
+# =============================================
+# Supervisor (proses utama)
+# =============================================
+class StationHandle:
+    def __init__(self, station):
+        self.station = station
+        self.name = station['name']
+        self.process = None
+        self.stop_event = None
+        self.started_at = None
+        self.restarts = 0
+        self.backoff = 1.0
+        self.restart_at = 0.0
+        self.last_status = None
+        self.last_heartbeat = None
+        self.last_progress = None   # waktu terakhir status['frames'] bertambah
+        self.progress_frames = 0    # status['frames'] saat last_progress (per proses worker)
+        self.last_exit = None
+
+
+class StationSupervisor:
+    def __init__(self, stations, config=None):
+        self.config = dict(SUPERVISOR_CONFIG, **(config or {}))
+        # spawn: perilaku sama di Windows dan Linux, worker tidak mewarisi state TensorFlow
+        self.context = multiprocessing.get_context("spawn")
+        self.status_queue = self.context.Queue(maxsize=len(stations) * 8)
+        self.handles = {s['name']: StationHandle(s) for s in stations}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._monitor = threading.Thread(target=self._run, name="supervisor", daemon=True)
+        metrics.collector(self._collect_metrics)
+
+    def start(self):
+        for handle in self.handles.values():
+            self._spawn(handle)
+        self._monitor.start()
+
+    def _spawn(self, handle):
+        handle.stop_event = self.context.Event()
+        handle.process = self.context.Process(target=station_worker, name=f"station-{handle.name}",
+                                              args=(handle.station, self.status_queue, handle.stop_event),
+                                              daemon=True)
+        handle.process.start()
+        handle.started_at = time.monotonic()
+        handle.last_heartbeat = None
+        handle.last_progress = None
+        handle.progress_frames = 0
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._drain(timeout=0.5)
+            now = time.monotonic()
+            with self._lock:
+                for handle in self.handles.values():
+                    self._check(handle, now)
+
+    def _drain(self, timeout):
+        try:
+            status = self.status_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while status is not None:
+            with self._lock:
+                handle = self.handles.get(status['name'])
+                if handle is not None:
+                    now = time.monotonic()
+                    previous = handle.last_status
+                    if status['preview'] is None and previous is not None:
+                        status['preview'] = previous['preview']
+                    # Heartbeat dari loop utama worker saja tidak cukup: pipeline bisa deadlock
+                    # sementara loop status tetap jalan, jadi yang dipantau adalah frame baru
+                    if status['frames'] > handle.progress_frames:
+                        handle.progress_frames = status['frames']
+                        handle.last_progress = now
+                    handle.last_status = status
+                    handle.last_heartbeat = now
+            try:
+                status = self.status_queue.get_nowait()
+            except queue.Empty:
+                status = None
+
+    def _check(self, handle, now):
+        process = handle.process
+        if process is not None and process.is_alive():
+            limit = (self.config['heartbeat_timeout'] if handle.last_progress is not None
+                     else self.config['startup_timeout'])
+            since = handle.last_progress if handle.last_progress is not None else handle.started_at
+            if now - since <= limit:
+                return
+            print(f"[ERROR] Station {handle.name} tanpa frame baru {now - since:.0f} s, dihentikan paksa")
+            process.terminate()
+            process.join(5)
+        if process is not None:
+            # Worker mati: jadwalkan restart dengan backoff
+            handle.last_exit = process.exitcode
+            handle.process = None
+            if now - handle.started_at >= self.config['stable_after']:
+                handle.backoff = 1.0
+            handle.restart_at = now + handle.backoff
+            print(f"[ERROR] Station {handle.name} berhenti (exit {handle.last_exit}), "
+                  f"restart dalam {handle.backoff:.0f} s")
+            handle.backoff = min(handle.backoff * 2, self.config['max_backoff'])
+            return
+        if now >= handle.restart_at:
+            handle.restarts += 1
+            self._spawn(handle)
+
+    def status(self):
+        """Ringkasan semua station untuk GUI / log."""
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for name, handle in self.handles.items():
+                status = handle.last_status or {}
+                alive = handle.process is not None and handle.process.is_alive()
+                result[name] = dict(
+                    alive=alive,
+                    pid=handle.process.pid if alive else None,
+                    restarts=handle.restarts,
+                    last_exit=handle.last_exit,
+                    heartbeat_age=None if handle.last_heartbeat is None else now - handle.last_heartbeat,
+                    frames=status.get('frames', 0),
+                    motor_state=status.get('motor_state'),
+                    latency=status.get('latency', {}),
+                    serial=status.get('serial'),
+                    stages=status.get('stages', {}),
+                    preview=status.get('preview'),
+                )
+        return result
+
+    def _collect_metrics(self):
+        with self._lock:
+            handles = list(self.handles.values())
+        for handle in handles:
+            labels = {"station": handle.name}
+            yield "station_up", "gauge", int(handle.process is not None and handle.process.is_alive()), labels
+            yield "station_restarts_total", "counter", handle.restarts, labels
+
+    def render_prometheus(self):
+        """Metrics supervisor + metrics tiap worker dengan label station."""
+        with self._lock:
+            texts = [(h.name, h.last_status['metrics']) for h in self.handles.values() if h.last_status]
+        return merge_prometheus([(None, metrics.REGISTRY.render_prometheus())] + texts)
+
+    def stop(self, timeout=10.0):
+        self._stopping.set()
+        if self._monitor.is_alive():
+            self._monitor.join(2.0)
+        with self._lock:
+            handles = [h for h in self.handles.values() if h.process is not None]
+        for handle in handles:
+            handle.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for handle in handles:
+            handle.process.join(max(deadline - time.monotonic(), 0.1))
+            if handle.process.is_alive():
+                handle.process.terminate()
+        metrics.REGISTRY.remove_collector(self._collect_metrics)
+
+
+def _add_label(sample, station):
+    metric, value = sample.rsplit(" ", 1)
+    if 'station="' in metric:
+        return sample
+    if "{" in metric:
+        metric = metric.replace("{", f'{{station="{station}",', 1)
+    else:
+        metric = f'{metric}{{station="{station}"}}'
+    return f"{metric} {value}"
+
+
+def merge_prometheus(texts):
+    """Gabungkan beberapa teks Prometheus [(station atau None, teks)] per keluarga metric.
+
+    Tiap keluarga hanya punya satu baris HELP/TYPE dan semua sampelnya (dari
+    supervisor dan setiap station) berurutan di bawahnya, seperti syarat format
+    teks Prometheus. Sampel worker mendapat label `station`.
+    """
+    families = {}   # nama keluarga -> [help, type, sampel]; dict menjaga urutan kemunculan
+    for station, text in texts:
+        current = None
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                _, kind, name, rest = (line.split(" ", 3) + [""])[:4]
+                family = families.setdefault(name, [None, None, []])
+                family[0 if kind == "HELP" else 1] = family[0 if kind == "HELP" else 1] or line
+                current = name
+                continue
+            if line.startswith("#"):
+                continue
+            name = line.split("{", 1)[0].split(" ", 1)[0]
+            # _bucket/_sum/_count milik keluarga histogram yang sedang dideklarasikan
+            if current is None or name not in (current, current + "_bucket", current + "_sum", current + "_count"):
+                current = name
+            family = families.setdefault(current, [None, None, []])
+            family[2].append(line if station is None else _add_label(line, station))
+    lines = []
+    for help_line, type_line, samples in families.values():
+        if not samples:
+            continue
+        lines.extend(line for line in (help_line, type_line) if line)
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+class _SupervisorRegistry:
+    """Adapter agar metrics.MetricsServer menyajikan metrics gabungan supervisor."""
+
+    def __init__(self, supervisor):
+        self.supervisor = supervisor
+
+    def render_prometheus(self):
+        return self.supervisor.render_prometheus()
+
+
+def format_status(name, status, fps):
+    latency = status['latency']
+    text = f"{name}: {'jalan' if status['alive'] else 'mati'}"
+    if status['pid']:
+        text += f" pid={status['pid']}"
+    text += f" fps={fps:.1f} motor={status['motor_state'] or '-'} restart={status['restarts']}"
+    if 'p50_ms' in latency:
+        text += f" latency p50={latency['p50_ms']:.0f} ms"
+    return text
+
+
+class FpsTracker:
+    def __init__(self):
+        self._last = {}
+
+    def update(self, statuses):
+        now = time.monotonic()
+        result = {}
+        for name, status in statuses.items():
+            frames, at, fps = self._last.get(name, (status['frames'], now, 0.0))
+            if now - at >= 1.0:
+                fps = max(status['frames'] - frames, 0) / (now - at)
+                frames, at = status['frames'], now
+            self._last[name] = (frames, at, fps)
+            result[name] = fps
+        return result
+
+
+def run_gui(supervisor):
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtGui import QImage, QPixmap
+    from PyQt6.QtWidgets import QApplication, QGridLayout, QLabel, QVBoxLayout, QWidget
+
+    app = QApplication(sys.argv)
+    window = QWidget()
+    window.setWindowTitle("Supervisor station")
+    grid = QGridLayout(window)
+    tiles = {}
+    width, height = SUPERVISOR_CONFIG['preview_size']
+    columns = 2 if len(supervisor.handles) > 1 else 1
+    for i, name in enumerate(supervisor.handles):
+        box = QVBoxLayout()
+        image = QLabel(f"Menunggu {name}...")
+        image.setFixedSize(width, height)
+        image.setStyleSheet("border: 1px solid black;")
+        text = QLabel(name)
+        box.addWidget(image)
+        box.addWidget(text)
+        grid.addLayout(box, i // columns, i % columns)
+        tiles[name] = (image, text)
+    fps = FpsTracker()
+
+    def refresh():
+        statuses = supervisor.status()
+        rates = fps.update(statuses)
+        for name, status in statuses.items():
+            image, text = tiles[name]
+            text.setText(format_status(name, status, rates[name]))
+            if status['preview']:
+                image.setPixmap(QPixmap.fromImage(QImage.fromData(status['preview'], "JPG")))
+
+    timer = QTimer()
+    timer.timeout.connect(refresh)
+    timer.start(200)
+    window.show()
+    return app.exec()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jalankan beberapa station (kamera/motor/fingerprint) dari satu host.")
+    parser.add_argument('config', help="File JSON daftar station")
+    parser.add_argument('--gui', action='store_true', help="Tampilkan semua station dalam satu jendela")
+    parser.add_argument('--duration', type=float, default=None, help="Berhenti setelah N detik (uji)")
+    args = parser.parse_args(argv)
+
+    supervisor = StationSupervisor(load_stations(args.config))
+    supervisor.start()
+    server = None
+    if metrics.METRICS_CONFIG['enabled']:
+        try:
+            server = metrics.MetricsServer(_SupervisorRegistry(supervisor), metrics.METRICS_CONFIG['host'],
+                                           metrics.METRICS_CONFIG['port']).start()
+            print(f"[INFO] Metrics semua station: http://{server.address[0]}:{server.address[1]}/metrics")
+        except OSError as e:
+            print(f"[ERROR] Endpoint metrics tidak dapat dibuka: {e}")
+    try:
+        if args.gui:
+            run_gui(supervisor)
+        else:
+            fps = FpsTracker()
+            started = time.monotonic()
+            while args.duration is None or time.monotonic() - started < args.duration:
+                time.sleep(min(10.0, args.duration or 10.0))
+                statuses = supervisor.status()
+                rates = fps.update(statuses)
+                for name, status in statuses.items():
+                    print(f"[INFO] {format_status(name, status, rates[name])}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+        if server is not None:
+            server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
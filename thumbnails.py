@@ -0,0 +1,157 @@
+"""Loader thumbnail di background dengan cache LRU untuk panel preview.
+
+Gambar di-decode langsung ke ukuran target lewat QImageReader.setScaledSize
+(untuk JPEG memakai scaling DCT libjpeg, jadi foto multi-megapixel tidak pernah
+di-decode penuh). Hasilnya QImage (aman dibuat di thread non-GUI); QPixmap
+tetap dibuat di thread GUI oleh pemanggil.
+"""
+import itertools
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from PyQt6.QtCore import QSize, Qt
+from PyQt6.QtGui import QImageReader
+
+PRIORITY_REQUEST = 0
+PRIORITY_PREFETCH = 1
+
+
+def file_key(path):
+    """(mtime_ns, size) file, atau None jika file tidak ada."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def decode_thumbnail(path, size):
+    """Decode `path` langsung ke ukuran yang muat di `size` (aspek dipertahankan)."""
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    source = reader.size()
+    if source.isValid():
+        reader.setScaledSize(source.scaled(size, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        print(f"[ERROR] Gagal decode '{path}': {reader.errorString()}")
+        return None
+    return image
+
+
+class ThumbnailCache:
+    """Cache LRU thumbnail + worker decode.
+
+    - `request(path, on_ready)`: kembalikan QImage dari cache jika ada (dan cek
+      ulang mtime/size di background); jika belum ada, decode di worker lalu
+      panggil `on_ready(path, image)` dari thread worker.
+    - `prefetch(paths)`: decode prioritas rendah untuk gambar yang mungkin
+      dibutuhkan berikutnya.
+    Entri yang file-nya berubah di disk di-decode ulang; file yang hilang dibuang.
+    """
+
+    def __init__(self, size=(320, 240), capacity=64, workers=2):
+        self.size = QSize(*size)
+        self.capacity = capacity
+        self._entries = OrderedDict()  # path -> (file_key, QImage)
+        self._pending = {}  # path -> prioritas terendah yang sedang antre
+        self._callbacks = {}  # path -> list (on_ready, pemanggil sudah dapat gambar dari cache)
+        self._lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self.hits = 0
+        self.misses = 0
+        self._workers = [threading.Thread(target=self._run, name=f"thumbnail-{i}", daemon=True)
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def get(self, path):
+        """QImage dari cache tanpa I/O (aman dipanggil dari thread GUI), atau None."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            self._entries.move_to_end(path)
+            return entry[1]
+
+    def request(self, path, on_ready=None):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                self.hits += 1
+            else:
+                self.misses += 1
+            if on_ready is not None:
+                self._callbacks.setdefault(path, []).append((on_ready, entry is not None))
+        # Entri cache tetap divalidasi ulang di worker (stat di network share bisa lambat)
+        self._submit(path, PRIORITY_REQUEST)
+        return entry[1] if entry is not None else None
+
+    def prefetch(self, paths):
+        with self._lock:
+            paths = [p for p in paths if p not in self._entries]
+        for path in paths[:self.capacity]:
+            self._submit(path, PRIORITY_PREFETCH)
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def stop(self):
+        for _ in self._workers:
+            self._queue.put((-1, next(self._order), None))
+
+    def _submit(self, path, priority):
+        with self._lock:
+            queued = self._pending.get(path)
+            if queued is not None and queued <= priority:
+                return
+            self._pending[path] = priority
+        self._queue.put((priority, next(self._order), path))
+
+    def _run(self):
+        while True:
+            priority, _, path = self._queue.get()
+            if path is None:
+                return
+            with self._lock:
+                if self._pending.get(path) != priority:
+                    continue  # sudah diproses lewat antrean berprioritas lebih tinggi
+                del self._pending[path]
+            try:
+                self._load(path)
+            except Exception as e:
+                print(f"[ERROR] Thumbnail '{path}': {e}")
+
+    def _load(self, path):
+        key = file_key(path)
+        with self._lock:
+            entry = self._entries.get(path)
+        changed = entry is None or entry[0] != key
+        if key is None:
+            image = None
+            self.invalidate(path)
+        elif changed:
+            image = decode_thumbnail(path, self.size)
+            if image is not None:
+                with self._lock:
+                    self._entries[path] = (key, image)
+                    self._entries.move_to_end(path)
+                    while len(self._entries) > self.capacity:
+                        self._entries.popitem(last=False)
+        else:
+            image = entry[1]
+
+        with self._lock:
+            callbacks = self._callbacks.pop(path, [])
+        # Pemanggil yang sudah menerima gambar dari cache hanya dikabari jika gambar berubah
+        for on_ready, had_image in callbacks:
+            if changed or not had_image or image is None:
+                on_ready(path, image)
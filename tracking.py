@@ -0,0 +1,85 @@
+import cv2
+import numpy as np
+
+# Initialize Optical Flow parameters
+feature_params = dict(maxCorners=100, qualityLevel=0.3, minDistance=7, blockSize=7)
+lk_params = dict(winSize=(15, 15), maxLevel=2, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+
+class FaceTracker:
+    """Lacak bounding box wajah antar frame dengan optical flow Lucas-Kanade.
+
+    Titik fitur (goodFeaturesToTrack) diambil di dalam box hasil deteksi terakhir,
+    lalu dipropagasi dengan calcOpticalFlowPyrLK. Box digeser dengan median
+    perpindahan titik dan diskalakan dengan median rasio jarak antar titik.
+    Confidence adalah rasio titik yang lolos cek forward-backward.
+    """
+
+    def __init__(self, min_points=6, max_fb_error=1.5):
+        self.min_points = min_points
+        self.max_fb_error = max_fb_error
+        self.prev_gray = None
+        self.prev_points = None
+        self.box = None
+        self.confidence = 0.0
+        self.age = 0  # jumlah frame sejak deteksi terakhir
+
+    def reset(self, gray, box):
+        """Mulai pelacakan dari box (x, y, w, h) hasil deteksi penuh."""
+        self.box = None
+        self.prev_points = None
+        self.confidence = 0.0
+        self.age = 0
+        if box is None:
+            return False
+        frame_h, frame_w = gray.shape[:2]
+        x, y, w, h = box
+        x1, y1 = max(int(x), 0), max(int(y), 0)
+        x2, y2 = min(int(x + w), frame_w), min(int(y + h), frame_h)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return False
+        mask = np.zeros_like(gray)
+        mask[y1:y2, x1:x2] = 255
+        points = cv2.goodFeaturesToTrack(gray, mask=mask, **feature_params)
+        if points is None or len(points) < self.min_points:
+            return False
+        self.prev_gray = gray
+        self.prev_points = points
+        self.box = (float(x), float(y), float(w), float(h))
+        self.confidence = 1.0
+        return True
+
+    def update(self, gray):
+        """Propagasi box ke frame baru. Mengembalikan box atau None jika pelacakan gagal."""
+        if self.box is None or self.prev_points is None:
+            return None
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.prev_points, None, **lk_params)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, next_points, None, **lk_params)
+
+        old = self.prev_points.reshape(-1, 2)
+        new = next_points.reshape(-1, 2)
+        fb_error = np.linalg.norm(old - back_points.reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+
+        self.confidence = float(good.mean()) if len(good) else 0.0
+        if good.sum() < self.min_points:
+            self.box = None
+            self.prev_points = None
+            return None
+
+        old, new = old[good], new[good]
+        dx, dy = np.median(new - old, axis=0)
+        # Skala dari median rasio jarak antar pasangan titik
+        old_dist = np.linalg.norm(old[:, None] - old[None, :], axis=2)
+        new_dist = np.linalg.norm(new[:, None] - new[None, :], axis=2)
+        valid = old_dist > 1e-3
+        scale = float(np.median(new_dist[valid] / old_dist[valid])) if valid.any() else 1.0
+
+        x, y, w, h = self.box
+        cx, cy = x + w / 2 + dx, y + h / 2 + dy
+        w, h = w * scale, h * scale
+        self.box = (cx - w / 2, cy - h / 2, w, h)
+        self.prev_gray = gray
+        self.prev_points = new.reshape(-1, 1, 2)
+        self.age += 1
+        return self.box
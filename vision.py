@@ -0,0 +1,574 @@
+import importlib
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import journal
+from face_tracks import FaceTracks, confirmed_faces, detection_boxes, fuse_boxes, nearest_box
+from models import ModelRegistry, startup_timer
+from tracking import FaceTracker
+
+# Mode inferensi landmark:
+#   "consolidated" : pose, tangan dan fallback posisi wajah diambil dari satu hasil Holistic
+#   "separate"     : Holistic, Hands dan Pose dijalankan terpisah (perilaku lama)
+INFERENCE_MODE = "consolidated"
+
+# =============================================
+# Registry model: MediaPipe dan DeepFace (TensorFlow) diimport dan dibangun
+# saat pertama dipakai atau oleh warm-up di background, bukan saat import modul.
+# Di mode "consolidated" graph Hands dan Pose tidak pernah dibuat.
+# =============================================
+registry = ModelRegistry(startup_timer)
+
+
+def solutions():
+    return registry.get('mediapipe')
+
+
+def _warm_graph(graph):
+    graph.process(np.zeros((360, 640, 3), dtype=np.uint8))
+
+
+# DeepFace menyimpan detektor (YuNet) sebagai objek global; panggilan dari thread
+# inferensi dan thread galeri wajah diserialkan dengan lock ini
+deepface_lock = threading.Lock()
+
+
+def _warm_deepface(deepface):
+    # Memuat YuNet dan model anti-spoofing (dipakai liveness.py) dengan satu inferensi dummy
+    deepface.extract_faces(img_path=np.zeros((360, 640, 3), dtype=np.uint8), detector_backend='yunet',
+                           enforce_detection=False, anti_spoofing=True)
+
+
+def _build_face_backend():
+    face_backends = importlib.import_module('face_backends')
+    try:
+        return face_backends.create_face_backend()
+    except Exception as e:
+        print(f"[ERROR] Backend wajah '{face_backends.FACE_BACKEND_CONFIG['backend']}' gagal dimuat ({e}), "
+              f"memakai DeepFace")
+        return face_backends.create_face_backend('deepface')
+
+
+registry.register('mediapipe', lambda: importlib.import_module('mediapipe').solutions)
+registry.register('deepface', lambda: importlib.import_module('deepface').DeepFace, _warm_deepface)
+registry.register('holistic', lambda: solutions().holistic.Holistic(min_detection_confidence=0.5, min_tracking_confidence=0.5, enable_segmentation=False, refine_face_landmarks=False), _warm_graph)
+registry.register('hands', lambda: solutions().hands.Hands(min_detection_confidence=0.5, min_tracking_confidence=0.5), _warm_graph)
+registry.register('pose', lambda: solutions().pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5), _warm_graph)
+registry.register('face_detection', lambda: solutions().face_detection.FaceDetection(min_detection_confidence=0.5), _warm_graph)
+# Detektor untuk face_log (face_backends.py); dibangun setelah deepface agar bobot YuNet sudah terunduh
+registry.register('face_backend', _build_face_backend, lambda backend: backend.detect(np.zeros((360, 640, 3), dtype=np.uint8)))
+
+
+def get_graph(name):
+    return registry.get(name)
+
+
+def required_models():
+    """Model yang dipakai oleh konfigurasi saat ini, untuk warm-up."""
+    names = ['mediapipe', 'face_detection', 'holistic']
+    if INFERENCE_MODE != "consolidated":
+        names += ['pose', 'hands']
+    return names + ['deepface', 'face_backend']
+
+
+def warm_up(on_done=None):
+    """Mulai warm-up semua model di background; GUI sudah bisa tampil selama proses ini."""
+    return registry.warm_up(required_models(), background=True, on_done=on_done)
+
+
+def models_ready():
+    return registry.ready.is_set()
+
+# Margin area deteksi (15% dari tiap sisi frame)
+DETECTION_MARGIN = 0.15
+# Threshold untuk validitas wajah dari DeepFace
+FACE_CONFIDENCE_THRESHOLD = 0.5
+
+# Konfigurasi cascade detektor: FaceDetection (murah) jalan tiap frame, Pose hanya
+# jika wajah tidak ditemukan, DeepFace/Holistic di-refresh sesuai jadwal atau jika
+# hasil detektor murah berubah.
+CASCADE_CONFIG = dict(
+    enabled=True,
+    deepface_interval=5,     # refresh face_log DeepFace paling lambat setiap N frame
+    holistic_interval=10,    # refresh landmark holistic/hands setiap N frame
+    center_change_px=40,     # paksa refresh jika pusat wajah bergeser lebih dari ini
+    tracking=True,           # lacak box wajah dengan optical flow di antara deteksi
+    track_refresh_interval=10,   # deteksi penuh paling lambat setiap N frame pelacakan
+    track_min_confidence=0.6,    # deteksi ulang jika rasio titik yang terlacak di bawah ini
+)
+
+
+# Resolusi inferensi: model menerima frame/ROI yang diperkecil, hasilnya dipetakan
+# kembali ke koordinat frame penuh.
+#   roi = "full"           : seluruh frame
+#   roi = "detection_area" : hanya kotak margin 15% (wajah di luar kotak diabaikan)
+#   roi = "face"           : kotak di sekitar wajah terakhir (+padding), kembali ke
+#                            "detection_area" jika belum ada wajah
+INFERENCE_CONFIG = dict(
+    max_width=640,          # lebar maksimum gambar yang masuk ke model (None = tanpa resize)
+    roi="full",
+    face_roi_padding=1.0,   # padding di tiap sisi, relatif terhadap ukuran box wajah
+)
+
+
+class InferenceView:
+    """Potongan (ROI) frame yang diperkecil untuk inferensi, beserta transformasinya.
+
+    `image` adalah view/resize dari frame BGR asli. Koordinat hasil model dipetakan
+    kembali ke frame penuh: box piksel lewat `to_frame_box`, sedangkan hasil
+    MediaPipe (koordinat ternormalisasi) diubah langsung di tempat lewat `remap_*`,
+    sehingga kode setelahnya tetap bekerja dalam koordinat frame penuh.
+
+    `timings` mengumpulkan durasi (detik) tiap model yang dijalankan pada view ini.
+    """
+
+    def __init__(self, frame, roi_box=None, max_width=None):
+        self.frame_height, self.frame_width = frame.shape[:2]
+        if roi_box is None:
+            roi_box = (0, 0, self.frame_width, self.frame_height)
+        x1, y1, x2, y2 = roi_box
+        self.x0 = max(int(x1), 0)
+        self.y0 = max(int(y1), 0)
+        x2 = min(int(x2), self.frame_width)
+        y2 = min(int(y2), self.frame_height)
+        self.crop_width = x2 - self.x0
+        self.crop_height = y2 - self.y0
+        crop = frame[self.y0:y2, self.x0:x2]
+
+        self.scale = 1.0
+        if max_width and self.crop_width > max_width:
+            self.scale = max_width / self.crop_width
+            size = (max_width, max(int(round(self.crop_height * self.scale)), 1))
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        self.image = crop
+        self.is_identity = (self.scale == 1.0 and self.crop_width == self.frame_width
+                            and self.crop_height == self.frame_height)
+        self._rgb = None
+        self.timings = {}
+
+    def add_timing(self, name, started):
+        self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+
+    @property
+    def rgb(self):
+        if self._rgb is None:
+            self._rgb = cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
+        return self._rgb
+
+    def to_frame_box(self, x, y, w, h):
+        """Box piksel pada `image` → box piksel pada frame penuh."""
+        return (int(x / self.scale) + self.x0, int(y / self.scale) + self.y0,
+                int(w / self.scale), int(h / self.scale))
+
+    def to_frame_boxes(self, boxes):
+        """Versi array dari to_frame_box untuk box (N, 4) x, y, w, h."""
+        if self.scale == 1.0 and not self.x0 and not self.y0:
+            return boxes
+        frame_boxes = (boxes / self.scale).astype(np.int32)
+        frame_boxes[:, 0] += self.x0
+        frame_boxes[:, 1] += self.y0
+        return frame_boxes
+
+    def _remap_x(self, x):
+        return (x * self.crop_width + self.x0) / self.frame_width
+
+    def _remap_y(self, y):
+        return (y * self.crop_height + self.y0) / self.frame_height
+
+    def remap_landmarks(self, landmark_list):
+        if landmark_list is None or self.is_identity:
+            return
+        for lm in landmark_list.landmark:
+            lm.x = self._remap_x(lm.x)
+            lm.y = self._remap_y(lm.y)
+
+    def remap_detections(self, detections):
+        if not detections or self.is_identity:
+            return
+        sx = self.crop_width / self.frame_width
+        sy = self.crop_height / self.frame_height
+        for detection in detections:
+            bboxC = detection.location_data.relative_bounding_box
+            bboxC.xmin = self._remap_x(bboxC.xmin)
+            bboxC.ymin = self._remap_y(bboxC.ymin)
+            bboxC.width *= sx
+            bboxC.height *= sy
+            for kp in detection.location_data.relative_keypoints:
+                kp.x = self._remap_x(kp.x)
+                kp.y = self._remap_y(kp.y)
+
+
+def run_graph(name, view):
+    """Jalankan graph MediaPipe pada view dan petakan hasilnya ke koordinat frame penuh."""
+    graph = get_graph(name)
+    started = time.perf_counter()
+    results = graph.process(view.rgb)
+    view.add_timing(name, started)
+    if name == 'face_detection':
+        view.remap_detections(results.detections)
+    elif name == 'hands':
+        for hand_landmarks in results.multi_hand_landmarks or []:
+            view.remap_landmarks(hand_landmarks)
+    else:
+        view.remap_landmarks(results.pose_landmarks)
+        if name == 'holistic':
+            view.remap_landmarks(results.left_hand_landmarks)
+            view.remap_landmarks(results.right_hand_landmarks)
+    return results
+
+
+def inference_roi(frame_width, frame_height, face_box=None):
+    """Kotak ROI (x1, y1, x2, y2) sesuai INFERENCE_CONFIG['roi'], atau None untuk frame penuh."""
+    roi = INFERENCE_CONFIG['roi']
+    if roi == "face" and face_box is not None:
+        x, y, w, h = face_box
+        pad = INFERENCE_CONFIG['face_roi_padding']
+        return (x - w * pad, y - h * pad, x + w * (1 + pad), y + h * (1 + pad))
+    if roi in ("detection_area", "face"):
+        return get_detection_area(frame_width, frame_height)
+    return None
+
+
+def get_detection_area(frame_width, frame_height):
+    margin_x = int(frame_width * DETECTION_MARGIN)
+    margin_y = int(frame_height * DETECTION_MARGIN)
+    return (margin_x, margin_y, frame_width - margin_x, frame_height - margin_y)
+
+
+def build_face_log(boxes, scores, detection_area, confirmed=None):
+    """Filter box wajah (frame penuh) ke dalam area deteksi dan urutkan dari wajah terbesar.
+
+    `confirmed` (mask bool, default semua True) menandai box yang ditemukan backend wajah.
+    """
+    if confirmed is None:
+        confirmed = np.ones(len(boxes), dtype=bool)
+    x, y, w, h = boxes.T
+    # Filter wajah yang cukup yakin dan berada dalam area deteksi
+    keep = ((scores > FACE_CONFIDENCE_THRESHOLD)
+            & (x > detection_area[0]) & (y > detection_area[1])
+            & (x + w < detection_area[2]) & (y + h < detection_area[3]))
+    face_log = [{
+        'bounding_box': (int(bx), int(by), int(bw), int(bh)),
+        'confidence': float(score),
+        'size': int(bw) * int(bh),
+        'confirmed': bool(found),
+    } for (bx, by, bw, bh), score, found in zip(boxes[keep], scores[keep], confirmed[keep])]
+
+    # Urutkan wajah berdasarkan ukuran bounding box (dari besar ke kecil)
+    face_log.sort(key=lambda x: x['size'], reverse=True)
+    for idx, face in enumerate(face_log):
+        face['index'] = idx + 1  # Indeks dimulai dari 1
+    return face_log
+
+
+def face_box_from_detection(detection, frame_width, frame_height):
+    bboxC = detection.location_data.relative_bounding_box
+    return (int(bboxC.xmin * frame_width), int(bboxC.ymin * frame_height),
+            int(bboxC.width * frame_width), int(bboxC.height * frame_height))
+
+
+def select_detection(detections, frame_width, frame_height, target_box=None):
+    """Deteksi FaceDetection milik target motor (pusat terdekat ke box target),
+    atau deteksi terakhir seperti logika lama jika belum ada target."""
+    boxes, _ = detection_boxes(detections, frame_width, frame_height)
+    index = nearest_box(boxes, target_box)
+    return detections[-1 if index is None else index]
+
+
+def estimate_face_center_y(face_results, pose_results, frame_height, detection=None):
+    """Posisi vertikal wajah: dari FaceDetection (`detection`, default deteksi terakhir),
+    atau dari landmark pose jika wajah jauh."""
+    face_center_y = None
+    if face_results is not None and face_results.detections:
+        detection = detection or face_results.detections[-1]
+        bboxC = detection.location_data.relative_bounding_box
+        y = int(bboxC.ymin * frame_height)
+        h = int(bboxC.height * frame_height)
+        face_center_y = y + h // 2  # Posisi tengah wajah
+        journal.event("face_position", "face", face_center_y)
+
+    elif pose_results is not None and pose_results.pose_landmarks:
+        landmark = pose_results.pose_landmarks.landmark
+        PoseLandmark = solutions().pose.PoseLandmark
+        keypoints = [
+            landmark[PoseLandmark.NOSE],
+            landmark[PoseLandmark.LEFT_EYE],
+            landmark[PoseLandmark.RIGHT_EYE],
+            landmark[PoseLandmark.MOUTH_LEFT],
+            landmark[PoseLandmark.LEFT_EAR],
+            landmark[PoseLandmark.RIGHT_EAR],
+        ]
+        # Konversi ke koordinat gambar
+        y_positions = [kp.y * frame_height for kp in keypoints if kp.visibility > 0.5]
+        if y_positions:
+            face_center_y = int(sum(y_positions) / len(y_positions))  # Rata-rata posisi vertikal wajah
+            journal.event("face_position", "pose", face_center_y)
+    return face_center_y
+
+
+def collect_landmarks(results, hand_results):
+    """Kumpulkan landmark holistic/hands untuk digambar di tahap render.
+
+    `hand_results` boleh None (mode "consolidated"), tangan cukup dari Holistic.
+    """
+    mp_holistic = solutions().holistic
+    landmarks = []
+    hand_detected = False
+    if results.pose_landmarks:
+        landmarks.append((results.pose_landmarks, mp_holistic.POSE_CONNECTIONS))
+    if results.left_hand_landmarks:
+        hand_detected = True
+        landmarks.append((results.left_hand_landmarks, mp_holistic.HAND_CONNECTIONS))
+    if results.right_hand_landmarks:
+        hand_detected = True
+        landmarks.append((results.right_hand_landmarks, mp_holistic.HAND_CONNECTIONS))
+    if hand_results is not None and hand_results.multi_hand_landmarks:
+        hand_detected = True
+        for hand_landmarks in hand_results.multi_hand_landmarks:
+            landmarks.append((hand_landmarks, solutions().hands.HAND_CONNECTIONS))
+    return landmarks, hand_detected
+
+
+def detect_face_log(view, detection_area, extra=None):
+    """face_log dari backend FACE_BACKEND_CONFIG (default YuNet langsung lewat OpenCV).
+
+    `extra` = (boxes, scores) detektor lain di koordinat frame (mis. MediaPipe
+    FaceDetection frame ini) yang difusi dengan hasil backend sebelum difilter.
+    Wajah hasil fusi yang tidak memuat box backend ditandai face['confirmed'] = False.
+    """
+    backend = registry.get('face_backend')
+    started = time.perf_counter()
+    boxes, scores = backend.detect(view.image, view.rgb if view._rgb is not None else None)
+    view.add_timing(backend.name, started)
+    # Kembalikan koordinat box ke frame penuh sebelum difilter terhadap area deteksi
+    boxes = view.to_frame_boxes(boxes)
+    confirmed = None
+    if extra is not None and len(extra[0]) and backend.name != 'mediapipe_face':
+        boxes, scores, confirmed = fuse_boxes([(boxes, scores), extra], with_primary=True)
+    return build_face_log(boxes, scores, detection_area, confirmed)
+
+
+def analyze_frame(frame, tracks=None):
+    """Jalankan semua model pada satu frame BGR dan kembalikan hasil deteksi dalam dict.
+
+    `tracks` (FaceTracks) opsional: memberi track ID stabil pada face_log dan
+    mengunci posisi wajah untuk motor ke satu target.
+    """
+    frame_height, frame_width = frame.shape[:2]
+    detection_area = get_detection_area(frame_width, frame_height)
+    view = InferenceView(frame, inference_roi(frame_width, frame_height), INFERENCE_CONFIG['max_width'])
+
+    results = run_graph('holistic', view)
+    if INFERENCE_MODE == "consolidated":
+        # Hasil Holistic sudah memuat pose_landmarks dengan indeks PoseLandmark yang sama
+        hand_results = None
+        pose_results = results
+    else:
+        hand_results = run_graph('hands', view)
+        pose_results = run_graph('pose', view)
+    face_results = run_graph('face_detection', view)
+    landmarks, hand_detected = collect_landmarks(results, hand_results)
+    face_log = detect_face_log(view, detection_area,
+                               detection_boxes(face_results.detections, frame_width, frame_height))
+    target_id, detection = None, None
+    if tracks is not None:
+        target_id = tracks.update(face_log)
+        if face_results.detections:
+            detection = select_detection(face_results.detections, frame_width, frame_height, tracks.target_box())
+
+    return {
+        'frame_size': (frame_width, frame_height),
+        'detection_area': detection_area,
+        'face_detected': face_results.detections is not None,
+        'body_detected': pose_results.pose_landmarks is not None,
+        'hand_detected': hand_detected,
+        'face_center_y': estimate_face_center_y(face_results, pose_results, frame_height, detection),
+        'face_log': face_log,
+        'target_id': target_id,
+        'landmarks': landmarks,
+        'timings': view.timings,
+    }
+
+
+class DetectorCascade:
+    """Penjadwal detektor bertingkat sebagai pengganti `analyze_frame` per frame.
+
+    Hanya FaceDetection yang dijalankan setiap frame. Pose dijalankan jika tidak ada
+    wajah (fallback posisi dari landmark), sedangkan DeepFace dan Holistic/Hands
+    memakai hasil cache dan di-refresh setiap N frame atau saat hasil detektor murah
+    berubah (jumlah wajah berbeda atau pusat wajah bergeser jauh).
+
+    Jika `tracking` aktif, box wajah dilacak dengan optical flow di antara deteksi
+    sehingga FaceDetection juga dilewati selama pelacakan masih meyakinkan.
+    """
+
+    def __init__(self, config=None):
+        self.config = dict(CASCADE_CONFIG, **(config or {}))
+        self.face_log = []
+        self.landmarks = []
+        self.hand_detected = False
+        self._deepface_age = None
+        self._holistic_age = None
+        self._signature = None
+        self.tracker = FaceTracker() if self.config['tracking'] else None
+        self.tracks = FaceTracks()
+        self._gray = None
+        self._last_face_box = None
+        self._num_faces = 0
+        self.stats = dict(frames=0, tracked=0, face_detection=0, pose=0, deepface=0, holistic=0)
+
+    def _cheap_result_changed(self, signature):
+        """Bandingkan hasil FaceDetection dengan kondisi saat refresh terakhir."""
+        previous = self._signature
+        if previous is None or previous[0] != signature[0]:
+            return True
+        if (previous[1] is None) != (signature[1] is None):
+            return True
+        return (signature[1] is not None
+                and abs(signature[1] - previous[1]) > self.config['center_change_px'])
+
+    def _track(self, frame):
+        """Propagasi box wajah dengan optical flow; None berarti perlu deteksi penuh."""
+        if self.tracker is None:
+            return None
+        self._gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.tracker.age >= self.config['track_refresh_interval']:
+            return None
+        box = self.tracker.update(self._gray)
+        if box is None or self.tracker.confidence < self.config['track_min_confidence']:
+            return None
+        return box
+
+    def analyze(self, frame):
+        frame_height, frame_width = frame.shape[:2]
+        detection_area = get_detection_area(frame_width, frame_height)
+        self.stats['frames'] += 1
+
+        consolidated = INFERENCE_MODE == "consolidated"
+        face_results = None
+        pose_results = None
+        holistic_results = None
+        started = time.perf_counter()
+        tracked_box = self._track(frame)
+        tracking_time = time.perf_counter() - started
+        face_box = tracked_box if tracked_box is not None else self._last_face_box
+        view = InferenceView(frame, inference_roi(frame_width, frame_height, face_box), INFERENCE_CONFIG['max_width'])
+        if self.tracker is not None:
+            view.timings['tracking'] = tracking_time
+        if tracked_box is not None:
+            # Wajah masih terlacak: lewati FaceDetection, jumlah wajah dianggap tetap
+            face_detected = True
+            face_center_y = int(tracked_box[1] + tracked_box[3] / 2)
+            self.stats['tracked'] += 1
+        else:
+            face_results = run_graph('face_detection', view)
+            self.stats['face_detection'] += 1
+            face_detected = face_results.detections is not None
+            # Deteksi milik target motor (box target dari frame sebelumnya)
+            detection = None
+            if face_results.detections:
+                detection = select_detection(face_results.detections, frame_width, frame_height,
+                                             self.tracks.target_box())
+            if not face_results.detections:
+                if consolidated:
+                    # Fallback pose diambil dari Holistic, sekaligus menyegarkan landmark
+                    holistic_results = pose_results = run_graph('holistic', view)
+                    self.stats['holistic'] += 1
+                else:
+                    pose_results = run_graph('pose', view)
+                    self.stats['pose'] += 1
+            face_center_y = estimate_face_center_y(face_results, pose_results, frame_height, detection)
+            self._num_faces = len(face_results.detections) if face_results.detections else 0
+            # Wajah sumber face_center_y (target motor) menjadi seed tracker dan ROI berikutnya
+            self._last_face_box = None
+            if detection is not None:
+                self._last_face_box = face_box_from_detection(detection, frame_width, frame_height)
+            if self.tracker is not None:
+                self.tracker.reset(self._gray, self._last_face_box)
+
+        signature = (self._num_faces, face_center_y)
+        changed = self._cheap_result_changed(signature)
+        if changed:
+            self._signature = signature
+        if (changed or self._deepface_age is None
+                or self._deepface_age >= self.config['deepface_interval']):
+            extra = None
+            if face_results is not None:
+                extra = detection_boxes(face_results.detections, frame_width, frame_height)
+            self.face_log = detect_face_log(view, detection_area, extra)
+            self._deepface_age = 0
+            self.stats['deepface'] += 1
+        if holistic_results is not None:
+            self.landmarks, self.hand_detected = collect_landmarks(holistic_results, None)
+            self._holistic_age = 0
+        elif (changed or self._holistic_age is None
+                or self._holistic_age >= self.config['holistic_interval']):
+            holistic_results = run_graph('holistic', view)
+            hand_results = None if consolidated else run_graph('hands', view)
+            self.landmarks, self.hand_detected = collect_landmarks(holistic_results, hand_results)
+            self._holistic_age = 0
+            self.stats['holistic'] += 1
+        self._deepface_age += 1
+        self._holistic_age += 1
+        target_id = self.tracks.update(self.face_log)
+
+        return {
+            'frame_size': (frame_width, frame_height),
+            'detection_area': detection_area,
+            'face_detected': face_detected,
+            'body_detected': pose_results is not None and pose_results.pose_landmarks is not None,
+            'hand_detected': self.hand_detected,
+            'face_center_y': face_center_y,
+            'face_log': self.face_log,
+            'target_id': target_id,
+            'landmarks': self.landmarks,
+            'timings': view.timings,
+        }
+
+
+def empty_analysis(frame):
+    """Hasil kosong untuk frame yang lewat sebelum warm-up model selesai."""
+    frame_height, frame_width = frame.shape[:2]
+    return {
+        'frame_size': (frame_width, frame_height),
+        'detection_area': get_detection_area(frame_width, frame_height),
+        'face_detected': False,
+        'body_detected': False,
+        'hand_detected': False,
+        'face_center_y': None,
+        'face_log': [],
+        'target_id': None,
+        'landmarks': [],
+        'timings': {},
+    }
+
+
+def decide_motor_state(analysis):
+    """Tentukan pergerakan motor berdasarkan posisi wajah."""
+    face_center_y = analysis['face_center_y']
+    # Hanya wajah yang dikonfirmasi backend wajah (face_log sebelum fusi dengan MediaPipe)
+    confirmed = confirmed_faces(analysis['face_log'])
+    new_motor_state = "STOP"
+    threshold = analysis['frame_size'][1] // 3
+
+    if face_center_y is not None:
+        if face_center_y < threshold:
+            new_motor_state = "UP"
+            journal.event("motor_decision", "UP", "face_high")
+        elif face_center_y > 2 * threshold:
+            new_motor_state = "DOWN"
+            journal.event("motor_decision", "DOWN", "face_low")
+        else:
+            if face_center_y < 320 and not confirmed:
+                new_motor_state = "UP"
+                journal.event("motor_decision", "UP", "face_high")
+            elif face_center_y >= 320 and confirmed:
+                new_motor_state = "STOP"
+                journal.event("motor_decision", "STOP", "face_center")
+    elif analysis['body_detected']:
+        new_motor_state = "UP"  # Motor naik sampai menemukan wajah
+        journal.event("motor_decision", "UP", "body_only")
+    return new_motor_state